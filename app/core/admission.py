@@ -0,0 +1,229 @@
+import math
+import threading
+import time
+from typing import Protocol
+from starlette.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.database import PoolMonitor, pool_monitor
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+
+CHEAP_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Never shed or rate limit these, so operators can still see what's going on
+EXEMPT_PATHS = frozenset({"/metrics", "/health/live", "/health/ready"})
+
+
+class AdmissionController:
+    """Decides whether to take on a request given current load
+
+    Reads are admitted up to `max_in_flight` concurrent requests, writes only
+    up to `write_share` of that. When DB pool checkouts start to wait,
+    writes are shed first; past twice the threshold everything is.
+    """
+
+    def __init__(self, max_in_flight: int, write_share: float, pool_wait_threshold: float, monitor: PoolMonitor):
+        self.max_in_flight = max_in_flight
+        self.write_share = write_share
+        self.pool_wait_threshold = pool_wait_threshold
+        self.monitor = monitor
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.shed = {"in_flight": 0, "pool_wait": 0, "rate_limit": 0}
+
+    def try_admit(self, method: str) -> str | None:
+        """Admit a request, or return the reason it should be shed"""
+        cheap = method in CHEAP_METHODS
+        limit = self.max_in_flight if cheap else max(
+            1, int(self.max_in_flight * self.write_share))
+
+        wait = self.monitor.wait
+        with self._lock:
+            reason = None
+            if wait >= 2 * self.pool_wait_threshold or (not cheap and wait >= self.pool_wait_threshold):
+                reason = "pool_wait"
+            elif self.in_flight >= limit:
+                reason = "in_flight"
+
+            if reason:
+                self.shed[reason] += 1
+                return reason
+            self.in_flight += 1
+            self.admitted += 1
+            return None
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def record_rate_limited(self):
+        with self._lock:
+            self.shed["rate_limit"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "pool_wait_seconds": self.monitor.wait,
+        }
+
+
+class RateLimiter(Protocol):
+    async def acquire(self, key: str) -> float | None:
+        """None if allowed, else seconds until a token is available"""
+        ...
+
+
+class InMemoryRateLimiter:
+    """Per-key token buckets, local to this process"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    async def acquire(self, key: str) -> float | None:
+        now = self._clock()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            retry_after = None
+        else:
+            self._buckets[key] = (tokens, now)
+            retry_after = (1 - tokens) / self.rate
+
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return retry_after
+
+    def _prune(self, now: float):
+        # Buckets that would have refilled completely carry no state
+        refill_time = self.burst / self.rate
+        self._buckets = {key: bucket for key, bucket in self._buckets.items()
+                         if now - bucket[1] < refill_time}
+
+
+# Same token bucket as InMemoryRateLimiter, atomically in Redis
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry_after = -1
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class RedisRateLimiter:
+    """Token buckets shared by every worker through Redis"""
+
+    def __init__(self, url: str, rate: float, burst: int, prefix: str = "ratelimit:"):
+        if aioredis is None:
+            raise RuntimeError("redis must be installed to use RATE_LIMIT_REDIS_URL")
+        self.rate = rate
+        self.burst = burst
+        self.prefix = prefix
+        self._redis = aioredis.Redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def acquire(self, key: str) -> float | None:
+        result = await self._script(keys=[self.prefix + key],
+                                    args=[self.rate, self.burst, time.time()])
+        retry_after = float(result)
+        return None if retry_after < 0 else retry_after
+
+
+def _overloaded(retry_after: float, detail: str, status_code: int = 503) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code,
+                        headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+class AdmissionMiddleware:
+    """Sheds load with 503 + Retry-After and rate limits clients with 429"""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, limiter: RateLimiter | None = None, retry_after: float = 1.0):
+        self.app = app
+        self.controller = controller
+        self.limiter = limiter
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        if self.limiter is not None:
+            client = scope.get("client")
+            key = client[0] if client else "unknown"
+            retry_after = await self.limiter.acquire(key)
+            if retry_after is not None:
+                self.controller.record_rate_limited()
+                response = _overloaded(
+                    retry_after, "Too many requests", status_code=429)
+                await response(scope, receive, send)
+                return
+
+        if self.controller.try_admit(scope["method"]) is not None:
+            response = _overloaded(
+                self.retry_after, "Server is overloaded, try again later")
+            await response(scope, receive, send)
+            return
+
+        released = False
+
+        async def send_wrapper(message: Message):
+            nonlocal released
+            # Long-lived event streams stop counting as in flight once they
+            # start, or a few idle listeners would fill the limit
+            if message["type"] == "http.response.start" and not released:
+                headers = Headers(raw=message["headers"])
+                if headers.get("content-type", "").startswith("text/event-stream"):
+                    released = True
+                    self.controller.release()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not released:
+                self.controller.release()
+
+
+def make_rate_limiter() -> RateLimiter | None:
+    if settings.RATE_LIMIT_PER_SECOND <= 0:
+        return None
+    if settings.RATE_LIMIT_REDIS_URL:
+        return RedisRateLimiter(settings.RATE_LIMIT_REDIS_URL,
+                                settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST)
+    return InMemoryRateLimiter(settings.RATE_LIMIT_PER_SECOND, settings.RATE_LIMIT_BURST)
+
+
+def make_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+        write_share=settings.ADMISSION_WRITE_SHARE,
+        pool_wait_threshold=settings.ADMISSION_POOL_WAIT_THRESHOLD,
+        monitor=pool_monitor,
+    )
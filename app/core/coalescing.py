@@ -0,0 +1,114 @@
+import asyncio
+import re
+from typing import Iterable
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Idempotent routes worth sharing work on; streaming routes must not match
+DEFAULT_PATTERNS = (
+    r"/hobbies",
+    r"/hobbies/popular",
+    r"/hobbies/[^/]+",
+    r"/hobbies/[^/]+/(stats|similar|users)",
+    r"/users",
+    r"/users/[^/]+",
+    r"/users/[^/]+/hobbies",
+    r"/users/[^/]+/hobbies/suggestions",
+)
+
+# Request headers that can change the response, and so belong in the key
+KEY_HEADERS = (b"accept", b"accept-encoding", b"authorization")
+
+
+class _Response:
+    def __init__(self):
+        self.start: Message | None = None
+        self.body: list[bytes] = []
+        self.complete = False
+
+
+class RequestCoalescer:
+    """Single-flight state for identical concurrent GETs
+
+    The first request for a key runs normally while its response is recorded.
+    Identical requests arriving meanwhile wait up to `max_wait` seconds and
+    are answered from that recording. Waiters that time out, or whose leader
+    fails, run the request themselves.
+    """
+
+    def __init__(self, patterns: Iterable[str] = DEFAULT_PATTERNS, max_wait: float = 5.0):
+        self.pattern = re.compile("|".join(f"(?:{p})" for p in patterns))
+        self.max_wait = max_wait
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def applies_to(self, scope: Scope) -> bool:
+        return (scope["type"] == "http" and scope["method"] == "GET"
+                and self.pattern.fullmatch(scope["path"]) is not None)
+
+    def key(self, scope: Scope) -> tuple:
+        headers = tuple((name, value) for name, value in scope["headers"]
+                        if name in KEY_HEADERS)
+        return (scope["path"], scope["query_string"], tuple(sorted(headers)))
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+        }
+
+
+class CoalescingMiddleware:
+    def __init__(self, app: ASGIApp, coalescer: RequestCoalescer):
+        self.app = app
+        self.coalescer = coalescer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        coalescer = self.coalescer
+        if not coalescer.applies_to(scope):
+            await self.app(scope, receive, send)
+            return
+
+        key = coalescer.key(scope)
+        leader = coalescer._in_flight.get(key)
+        if leader is not None:
+            await self._follow(leader, scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        coalescer._in_flight[key] = future
+        coalescer.leaders += 1
+        recorded = _Response()
+
+        async def record(message: Message):
+            if message["type"] == "http.response.start":
+                recorded.start = {**message, "headers": list(message["headers"])}
+            elif message["type"] == "http.response.body":
+                recorded.body.append(message.get("body", b""))
+                recorded.complete = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, record)
+        finally:
+            del coalescer._in_flight[key]
+            future.set_result(recorded if recorded.complete else None)
+
+    async def _follow(self, leader: asyncio.Future, scope: Scope, receive: Receive, send: Send):
+        coalescer = self.coalescer
+        try:
+            recorded = await asyncio.wait_for(asyncio.shield(leader), coalescer.max_wait)
+        except asyncio.TimeoutError:
+            coalescer.timeouts += 1
+            recorded = None
+
+        if recorded is None:
+            await self.app(scope, receive, send)
+            return
+
+        coalescer.coalesced += 1
+        await send(recorded.start)
+        await send({"type": "http.response.body", "body": b"".join(recorded.body), "more_body": False})
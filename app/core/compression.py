@@ -0,0 +1,207 @@
+import zlib
+from typing import Callable, Protocol
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    from compression import zstd  # type: ignore  # Python 3.14+
+except ImportError:  # pragma: no cover
+    try:
+        import zstandard as zstd  # type: ignore
+    except ImportError:
+        zstd = None
+
+# Streaming bodies where buffering up to the size threshold would delay delivery
+UNCOMPRESSED_CONTENT_TYPES = ("text/event-stream",)
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int = 6):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        # Sync flush so each streamed chunk can be decoded as it arrives
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int = 4):
+        self._obj = brotli.Compressor(quality=quality)  # type: ignore
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int = 3):
+        if hasattr(zstd, "ZstdCompressor") and hasattr(zstd.ZstdCompressor, "compressobj"):
+            self._obj = zstd.ZstdCompressor(  # type: ignore
+                level=level).compressobj()
+            self._flush_block = zstd.COMPRESSOBJ_FLUSH_BLOCK  # type: ignore
+        else:
+            self._obj = zstd.ZstdCompressor(level=level)  # type: ignore
+            self._flush_block = zstd.ZstdCompressor.FLUSH_BLOCK  # type: ignore
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+def available_encodings() -> dict[str, Callable[[], Compressor]]:
+    """Supported encodings, most preferred first"""
+    encodings: dict[str, Callable[[], Compressor]] = {}
+    if zstd is not None:
+        encodings["zstd"] = ZstdCompressor
+    if brotli is not None:
+        encodings["br"] = BrotliCompressor
+    encodings["gzip"] = GzipCompressor
+    return encodings
+
+
+def choose_encoding(accept_encoding: str, supported: list[str]) -> str | None:
+    """Pick the client's highest-q encoding, breaking ties by our preference"""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in supported:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """Negotiated zstd/brotli/gzip compression for HTTP responses
+
+    Bodies are buffered until `minimum_size` bytes are seen; responses that
+    end before then go out uncompressed. Larger and streaming responses are
+    compressed chunk by chunk with a flush after each, so streams stay live.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        encoding = choose_encoding(accept, list(self.encodings))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            send, encoding, self.encodings[encoding], self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, make_compressor: Callable[[], Compressor], minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.make_compressor = make_compressor
+        self.minimum_size = minimum_size
+        self.start_message: Message | None = None
+        self.buffer: list[bytes] = []
+        self.buffered = 0
+        self.compressor: Compressor | None = None
+        self.passthrough = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if ("content-encoding" in headers
+                    or content_type.startswith(UNCOMPRESSED_CONTENT_TYPES)):
+                self.passthrough = True
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if self.buffered < self.minimum_size:
+                if more_body:
+                    return
+                await self._flush_uncompressed()
+                return
+            self.compressor = self.make_compressor()
+            body = b"".join(self.buffer)
+            self.buffer = []
+            if not more_body:
+                chunk = self.compressor.compress(body) + self.compressor.finish()
+                await self._send_start(len(chunk))
+                await self._send({"type": "http.response.body", "body": chunk, "more_body": False})
+                return
+            await self._send_start(None)
+
+        assert self.compressor is not None
+        if more_body:
+            chunk = self.compressor.compress(body)
+            if chunk:
+                await self._send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            chunk = self.compressor.compress(body) + self.compressor.finish()
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": False})
+
+    async def _flush_uncompressed(self):
+        assert self.start_message is not None
+        self.passthrough = True
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": b"".join(self.buffer), "more_body": False})
+
+    async def _send_start(self, content_length: int | None):
+        assert self.start_message is not None
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        await self._send(self.start_message)
@@ -1,3 +1,4 @@
+from functools import cache
 from pydantic import computed_field, PostgresDsn
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -14,6 +15,112 @@ class Settings(BaseSettings):
     POSTGRES_TEST_DB: str = ""
     POSTGRES_PORT: int = 5432
 
+    # Where the hobby TF-IDF index is persisted; empty disables persistence
+    HOBBY_INDEX_PATH: str = "data/hobby_index.json"
+
+    # Per-user suggestion cache; refresh-ahead of 0 disables early refresh
+    SUGGESTION_CACHE_SIZE: int = 10_000
+    SUGGESTION_CACHE_TTL: float = 300.0
+    SUGGESTION_CACHE_REFRESH_AHEAD: float = 0.0
+
+    # Deletes of users/hobbies with at least this many links run as
+    # background jobs, purging links in throttled batches. A running job
+    # that records no progress for DELETE_JOB_LEASE seconds is taken to be
+    # abandoned and may be resumed by `python -m app.jobs`, so keep it well
+    # above the time one batch takes
+    BACKGROUND_DELETE_MIN_LINKS: int = 10_000
+    DELETE_BATCH_SIZE: int = 5_000
+    DELETE_BATCH_PAUSE: float = 0.05
+    DELETE_JOB_LEASE: float = 300.0
+
+    # "psycopg2", or "psycopg" for psycopg 3 with server-side prepared
+    # statements and pipelined batch writes. Turn prepared statements off
+    # behind a transaction-mode pooler such as PgBouncer
+    DATABASE_DRIVER: str = "psycopg2"
+    DATABASE_PREPARED_STATEMENTS: bool = True
+
+    # Serialize flat public models straight from ORM objects with orjson,
+    # skipping response_model validation
+    FAST_JSON_RESPONSES: bool = False
+
+    # Most ids accepted by the GET /hobbies?ids= and GET /users?ids= batch routes
+    MULTI_GET_MAX_IDS: int = 100
+
+    # Negotiated zstd/brotli/gzip compression for bodies of at least this size
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+
+    # Load shedding: writes get ADMISSION_WRITE_SHARE of the in-flight limit
+    # and are shed first once DB pool checkouts wait this many seconds
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 100
+    ADMISSION_WRITE_SHARE: float = 0.5
+    ADMISSION_POOL_WAIT_THRESHOLD: float = 0.25
+
+    # Per-client token bucket; 0 disables. A Redis URL shares buckets
+    # across workers
+    RATE_LIMIT_PER_SECOND: float = 0.0
+    RATE_LIMIT_BURST: int = 20
+    RATE_LIMIT_REDIS_URL: str = ""
+
+    # Share one in-flight computation between identical concurrent GETs,
+    # waiting at most this long for it
+    COALESCE_ENABLED: bool = True
+    COALESCE_MAX_WAIT: float = 5.0
+
+    # Acknowledge rating-only link PATCHes at once and write them in batches
+    # every WRITE_BEHIND_INTERVAL seconds, or once WRITE_BEHIND_MAX_PENDING
+    # links are waiting. Flushed on shutdown, but a crashed worker loses up
+    # to one interval of ratings
+    WRITE_BEHIND_ENABLED: bool = False
+    WRITE_BEHIND_INTERVAL: float = 1.0
+    WRITE_BEHIND_MAX_PENDING: int = 1000
+
+    # Deliver outbox events (link changes, user and hobby deletes) to this
+    # worker's caches and to GET /events streams. Each worker LISTENs on one
+    # connection, polling every OUTBOX_POLL_INTERVAL seconds should a
+    # notification be missed. Events are kept for OUTBOX_RETENTION seconds
+    OUTBOX_DISPATCHER_ENABLED: bool = True
+    OUTBOX_POLL_INTERVAL: float = 5.0
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_RETENTION: float = 7 * 24 * 3600
+
+    # Event stream keep-alive comments, and how many undelivered events a
+    # client may fall behind before it is disconnected to catch up
+    SSE_HEARTBEAT_INTERVAL: float = 15.0
+    SSE_QUEUE_SIZE: int = 1000
+
+    # Load the hobby index and open a DB connection at startup, before the
+    # app reports ready, rather than on the first requests
+    WARM_UP_ON_STARTUP: bool = True
+
+    # Hold every user-hobby link in memory, loaded during warm-up, and read
+    # users' links from it when ranking suggestions. About 15 bytes per
+    # link in each worker
+    LINK_GRAPH_ENABLED: bool = True
+
+    # `python -m app.server`: worker processes (0 for one per CPU), how long
+    # to keep serving while failing readiness after SIGTERM, and how long to
+    # then wait for in-flight requests
+    WEB_CONCURRENCY: int = 0
+    DRAIN_SECONDS: float = 5.0
+    GRACEFUL_SHUTDOWN_TIMEOUT: float = 30.0
+
+    # HMAC key for signing access tokens; when unset a random per-process key
+    # is used, so tokens don't survive restarts. `python -m app.server`
+    # won't start several workers without one
+    AUTH_SECRET_KEY: str = ""
+    ACCESS_TOKEN_TTL: int = 3600
+
+    # Scheme for new password hashes ("bcrypt" or "argon2id") and its costs,
+    # as picked by `python -m app.core.hashers`. Hashes made with another
+    # scheme or older costs are upgraded on the user's next login
+    PASSWORD_HASHER: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+
     # SQLALCHEMY_DATABASE_URI
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -40,4 +147,23 @@ class Settings(BaseSettings):
         )
 
 
-settings = Settings()  # type: ignore
+@cache
+def get_settings() -> Settings:
+    return Settings()  # type: ignore
+
+
+class LazySettings:
+    """Stands in for Settings, reading the environment on first attribute access
+
+    Lets modules import `settings` without configuration being required (or
+    read) until something actually needs a value.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(get_settings(), name, value)
+
+
+settings: Settings = LazySettings()  # type: ignore
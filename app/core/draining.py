@@ -0,0 +1,34 @@
+import logging
+import signal
+import threading
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+
+def install_drain_handler(app: FastAPI, drain_seconds: float):
+    """Fail readiness for `drain_seconds` after SIGTERM before shutting down
+
+    Wraps the server's own SIGTERM handler, so load balancers see the
+    instance go unready and stop routing to it while it is still serving.
+    The server's graceful shutdown then finishes any in-flight requests.
+    Signal handlers can only be set from the main thread; elsewhere (as
+    under TestClient) this does nothing.
+    """
+    if drain_seconds <= 0 or threading.current_thread() is not threading.main_thread():
+        return
+    previous = signal.getsignal(signal.SIGTERM)
+    if not callable(previous):
+        return
+
+    def handle_sigterm(sig, frame):
+        if app.state.draining:
+            previous(sig, frame)
+            return
+        logger.info("SIGTERM received, draining for %.1fs", drain_seconds)
+        app.state.draining = True
+        timer = threading.Timer(drain_seconds, previous, (sig, frame))
+        timer.daemon = True
+        timer.start()
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
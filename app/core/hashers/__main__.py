@@ -0,0 +1,35 @@
+import argparse
+
+from .helpers import calibrate_argon2, calibrate_bcrypt
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m app.core.hashers",
+        description="Pick password hashing costs for a target hashing time on this machine")
+    parser.add_argument("--hasher", choices=["bcrypt", "argon2id"], default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--memory-kib", type=int, default=65536,
+                        help="argon2id memory cost")
+    parser.add_argument("--parallelism", type=int, default=4,
+                        help="argon2id lanes")
+    args = parser.parse_args()
+
+    target = args.target_ms / 1000
+    if args.hasher == "bcrypt":
+        params, elapsed = calibrate_bcrypt(target)
+        settings_lines = [f"BCRYPT_ROUNDS={params['rounds']}"]
+    else:
+        params, elapsed = calibrate_argon2(
+            target, args.memory_kib, args.parallelism)
+        settings_lines = [f"ARGON2_{name.upper()}={value}"
+                          for name, value in params.items()]
+
+    print(f"# {args.hasher}: {elapsed * 1000:.0f} ms per hash "
+          f"(target {args.target_ms:.0f} ms)")
+    print(f"PASSWORD_HASHER={args.hasher}")
+    for line in settings_lines:
+        print(line)
+
+
+main()
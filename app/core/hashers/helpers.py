@@ -0,0 +1,132 @@
+import statistics
+import time
+from typing import Callable, Protocol
+import bcrypt
+
+try:
+    import argon2
+except ImportError:  # pragma: no cover
+    argon2 = None
+
+
+class PasswordHasher(Protocol):
+    name: str
+
+    def hash(self, password: str) -> str: ...
+
+    def verify(self, password: str, password_hash: str) -> bool: ...
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether a hash of this scheme was made with other cost parameters"""
+        ...
+
+
+class BcryptHasher:
+    name = "bcrypt"
+    prefixes = ("$2a$", "$2b$", "$2y$")
+
+    def __init__(self, rounds: int = 12):
+        self.rounds = rounds
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        except ValueError:
+            return False
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        # $2b$12$<salt+hash>
+        try:
+            return int(password_hash.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+class Argon2Hasher:
+    name = "argon2id"
+    prefixes = ("$argon2id$",)
+
+    def __init__(self, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 4):
+        if argon2 is None:
+            raise RuntimeError(
+                "argon2-cffi must be installed to use the argon2id hasher")
+        self.time_cost = time_cost
+        self.memory_cost = memory_cost
+        self.parallelism = parallelism
+        self._hasher = argon2.PasswordHasher(
+            time_cost=time_cost, memory_cost=memory_cost,
+            parallelism=parallelism, type=argon2.Type.ID)
+
+    def hash(self, password: str) -> str:
+        return self._hasher.hash(password)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        try:
+            return self._hasher.verify(password_hash, password)
+        except argon2.exceptions.VerificationError:
+            return False
+        except argon2.exceptions.InvalidHashError:
+            return False
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        try:
+            return self._hasher.check_needs_rehash(password_hash)
+        except argon2.exceptions.InvalidHashError:
+            return True
+
+
+HASHERS: dict[str, Callable[..., PasswordHasher]] = {
+    BcryptHasher.name: BcryptHasher,
+    Argon2Hasher.name: Argon2Hasher,
+}
+
+
+def identify_hasher(password_hash: str) -> str | None:
+    """Name of the scheme that produced a hash, from its prefix"""
+    for hasher in (BcryptHasher, Argon2Hasher):
+        if password_hash.startswith(hasher.prefixes):
+            return hasher.name
+    return None
+
+
+def _median_seconds(hasher: PasswordHasher, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hasher.hash("calibration password")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target: float, repeat: int = 3, max_rounds: int = 20) -> tuple[dict, float]:
+    """Most bcrypt rounds that hash within `target` seconds on this machine"""
+    best = {"rounds": 4}
+    best_time = _median_seconds(BcryptHasher(rounds=4), repeat)
+    for rounds in range(5, max_rounds + 1):
+        elapsed = _median_seconds(BcryptHasher(rounds=rounds), repeat)
+        if elapsed > target:
+            break
+        best, best_time = {"rounds": rounds}, elapsed
+    return best, best_time
+
+
+def calibrate_argon2(target: float, memory_cost: int = 65536, parallelism: int = 4, repeat: int = 3, max_time_cost: int = 50) -> tuple[dict, float]:
+    """Most argon2id passes over `memory_cost` KiB that hash within `target` seconds
+
+    Memory is the cost that hurts attackers most, so it's fixed up front and
+    only the number of passes is tuned.
+    """
+    params = {"time_cost": 1, "memory_cost": memory_cost,
+              "parallelism": parallelism}
+    best, best_time = params, _median_seconds(Argon2Hasher(**params), repeat)
+    for time_cost in range(2, max_time_cost + 1):
+        params = {**params, "time_cost": time_cost}
+        elapsed = _median_seconds(Argon2Hasher(**params), repeat)
+        if elapsed > target:
+            break
+        best, best_time = params, elapsed
+    return best, best_time
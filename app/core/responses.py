@@ -0,0 +1,42 @@
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+from sqlmodel import SQLModel
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it's installed
+
+    Falls back to the stdlib encoder, stringifying UUIDs and datetimes.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=str, ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+
+
+def project(model: type[SQLModel], obj: Any) -> dict[str, Any]:
+    """Copy the fields of a public model straight off an ORM object"""
+    return {field: getattr(obj, field) for field in model.model_fields}
+
+
+def fast_json(model: type[SQLModel], data: Any) -> Any:
+    """Skip response_model validation for flat public models when enabled
+
+    With FAST_JSON_RESPONSES off this returns `data` unchanged, so the route's
+    response_model validates and serializes it as usual.
+    """
+    if not settings.FAST_JSON_RESPONSES:
+        return data
+    if isinstance(data, list):
+        return FastJSONResponse([project(model, obj) for obj in data])
+    return FastJSONResponse(project(model, data))
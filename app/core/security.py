@@ -1,14 +1,189 @@
-import bcrypt
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+import uuid
+from typing import NamedTuple
+
+from app.core.config import settings
+from app.core.hashers import HASHERS, PasswordHasher, identify_hasher
+
+
+def get_password_hasher(name: str | None = None) -> PasswordHasher:
+    """The configured hasher, or the named one with its configured costs"""
+    name = name or settings.PASSWORD_HASHER
+    if name == "argon2id":
+        return HASHERS[name](time_cost=settings.ARGON2_TIME_COST,
+                             memory_cost=settings.ARGON2_MEMORY_COST,
+                             parallelism=settings.ARGON2_PARALLELISM)
+    if name == "bcrypt":
+        return HASHERS[name](rounds=settings.BCRYPT_ROUNDS)
+    raise ValueError(f"Unknown password hasher {name!r}")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    pw_bytes = plain_password.encode('utf-8')
-    hash_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(pw_bytes, hash_bytes)
+    name = identify_hasher(hashed_password)
+    if name is None:
+        return False
+    return get_password_hasher(name).verify(plain_password, hashed_password)
 
 
 def hash_password(password: str) -> str:
-    bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hash = bcrypt.hashpw(bytes, salt)
-    return hash.decode('utf-8')
+    return get_password_hasher().hash(password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a hash uses another scheme or other costs than configured"""
+    if identify_hasher(hashed_password) != settings.PASSWORD_HASHER:
+        return True
+    return get_password_hasher().needs_rehash(hashed_password)
+
+
+# Access tokens are HS256 JWTs, signed and checked with the stdlib so that
+# authenticating a request costs one HMAC and no database round trip
+
+class InvalidTokenError(ValueError):
+    pass
+
+
+class TokenClaims(NamedTuple):
+    sub: uuid.UUID
+    iat: float
+    exp: float
+    jti: bytes
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+_TOKEN_HEADER = _b64encode(b'{"alg":"HS256","typ":"JWT"}')
+
+# Used when AUTH_SECRET_KEY is unset; such tokens die with the process
+_process_key = secrets.token_bytes(32)
+
+
+def _signing_key() -> bytes:
+    if settings.AUTH_SECRET_KEY:
+        return settings.AUTH_SECRET_KEY.encode('utf-8')
+    return _process_key
+
+
+def _sign(signing_input: bytes) -> bytes:
+    return _b64encode(hmac.digest(_signing_key(), signing_input, hashlib.sha256))
+
+
+def create_access_token(user_id: uuid.UUID, ttl: float | None = None, now: float | None = None) -> str:
+    now = time.time() if now is None else now
+    ttl = settings.ACCESS_TOKEN_TTL if ttl is None else ttl
+    payload = {
+        "sub": str(user_id),
+        # Millisecond precision so a revocation and a fresh login in the
+        # same second can be told apart
+        "iat": round(now, 3),
+        "exp": int(now + ttl),
+        "jti": _b64encode(uuid.uuid4().bytes).decode(),
+    }
+    signing_input = _TOKEN_HEADER + b"." + \
+        _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return (signing_input + b"." + _sign(signing_input)).decode()
+
+
+def decode_access_token(token: str, now: float | None = None) -> TokenClaims:
+    """Check a token's signature and expiry and return its claims"""
+    try:
+        signing_input, _, signature = token.encode("ascii").rpartition(b".")
+        header, _, payload = signing_input.partition(b".")
+    except UnicodeEncodeError:
+        raise InvalidTokenError("Malformed token")
+    if header != _TOKEN_HEADER or not hmac.compare_digest(signature, _sign(signing_input)):
+        raise InvalidTokenError("Bad signature")
+
+    try:
+        data = json.loads(_b64decode(payload))
+        claims = TokenClaims(sub=uuid.UUID(data["sub"]), iat=float(data["iat"]),
+                             exp=float(data["exp"]), jti=_b64decode(data["jti"].encode()))
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise InvalidTokenError("Malformed token")
+
+    now = time.time() if now is None else now
+    if claims.exp <= now:
+        raise InvalidTokenError("Token expired")
+    return claims
+
+
+class TokenDenylist:
+    """Revoked access tokens, remembered only until they would expire anyway
+
+    A single token is keyed by its 16-byte id. Revoking all of a user's
+    tokens (on password change, say) stores one cutoff per user instead of
+    a row per token. Expired entries are pruned periodically, so memory is
+    bounded by what was revoked within one token lifetime.
+
+    State is per process. Revocations are shared between workers as outbox
+    events (see app.crud.revoke_token), which each worker applies here.
+    """
+
+    def __init__(self, prune_interval: float = 60.0, clock=time.time):
+        self.prune_interval = prune_interval
+        self._clock = clock
+        self._tokens: dict[bytes, float] = {}
+        # user id -> (tokens issued at or before this time are revoked, entry expiry)
+        self._users: dict[uuid.UUID, tuple[float, float]] = {}
+        self._next_prune = clock() + prune_interval
+
+    def revoke(self, claims: TokenClaims):
+        self.revoke_id(claims.jti, claims.exp)
+
+    def revoke_id(self, jti: bytes, exp: float):
+        self._tokens[jti] = exp
+        self._maybe_prune()
+
+    def revoke_user(self, user_id: uuid.UUID, ttl: float | None = None, issued_before: float | None = None):
+        """Revoke a user's tokens issued at or before `issued_before` (now)"""
+        cutoff = self._clock() if issued_before is None else issued_before
+        ttl = settings.ACCESS_TOKEN_TTL if ttl is None else ttl
+        previous = self._users.get(user_id)
+        if previous is None or previous[0] < cutoff:
+            self._users[user_id] = (cutoff, cutoff + ttl)
+        self._maybe_prune()
+
+    def is_revoked(self, claims: TokenClaims) -> bool:
+        if claims.jti in self._tokens:
+            return True
+        cutoff = self._users.get(claims.sub)
+        return cutoff is not None and claims.iat <= cutoff[0]
+
+    def _maybe_prune(self):
+        now = self._clock()
+        if now < self._next_prune:
+            return
+        self._tokens = {jti: exp for jti, exp in self._tokens.items()
+                        if exp > now}
+        self._users = {user_id: cutoff for user_id, cutoff in self._users.items()
+                       if cutoff[1] > now}
+        self._next_prune = now + self.prune_interval
+
+    def clear(self):
+        self._tokens.clear()
+        self._users.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"tokens": len(self._tokens), "users": len(self._users)}
+
+
+token_denylist = TokenDenylist()
+
+
+def verify_access_token(token: str) -> TokenClaims:
+    """Claims of a valid, unrevoked token, or InvalidTokenError"""
+    claims = decode_access_token(token)
+    if token_denylist.is_revoked(claims):
+        raise InvalidTokenError("Token revoked")
+    return claims
@@ -1,3 +1,6 @@
+from .loaders import *
+from .outbox import *
 from .users import *
 from .hobbies import *
 from .user_hobbies import *
+from .deletion_jobs import *
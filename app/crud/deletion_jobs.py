@@ -0,0 +1,86 @@
+from datetime import datetime
+from sqlalchemy import and_, or_, update
+from sqlmodel import func, select, Session
+from uuid import UUID
+
+from app.crud.outbox import HOBBY_DELETED, USER_DELETED, record_event
+from app.ml import suggestion_cache, unindex_hobby, graph_remove_hobby, graph_remove_user
+from app.models import DeletionJob, Hobby, HobbyStats, User, UserHobbyLink, utcnow
+
+
+def count_user_links(session: Session, user_id: UUID) -> int:
+    statement = select(func.count()).select_from(
+        UserHobbyLink).where(UserHobbyLink.user_id == user_id)
+    return session.exec(statement).one()
+
+
+def count_hobby_links(session: Session, hobby_id: UUID) -> int:
+    stats = session.get(HobbyStats, hobby_id)
+    return stats.link_count if stats else 0
+
+
+def mark_user_deleted(session: Session, db_user: User) -> DeletionJob:
+    """Hide a user and queue the purge of their links"""
+    db_user.deleted_at = utcnow()
+    job = DeletionJob(target_table=User.__tablename__, target_id=db_user.id,
+                      links_total=count_user_links(session, db_user.id))
+    session.add_all([db_user, job])
+    record_event(session, USER_DELETED, user_id=db_user.id)
+    session.commit()
+    session.refresh(job)
+    suggestion_cache.invalidate(db_user.id)
+    graph_remove_user(db_user.id)
+    return job
+
+
+def mark_hobby_deleted(session: Session, db_hobby: Hobby) -> DeletionJob:
+    """Hide a hobby and queue the purge of its links"""
+    db_hobby.deleted_at = utcnow()
+    job = DeletionJob(target_table=Hobby.__tablename__, target_id=db_hobby.id,
+                      links_total=count_hobby_links(session, db_hobby.id))
+    session.add_all([db_hobby, job])
+    record_event(session, HOBBY_DELETED, hobby_id=db_hobby.id)
+    session.commit()
+    session.refresh(job)
+    unindex_hobby(db_hobby.id)
+    graph_remove_hobby(db_hobby.id)
+    return job
+
+
+def get_deletion_job(session: Session, job_id: UUID) -> DeletionJob | None:
+    return session.get(DeletionJob, job_id)
+
+
+def _claimable(stale_before: datetime):
+    # Running jobs record progress after every batch, so one that has not
+    # since `stale_before` is taken to have been abandoned
+    return or_(
+        DeletionJob.status.in_(["pending", "failed"]),  # type: ignore
+        and_(DeletionJob.status == "running",
+             DeletionJob.updated_at < stale_before),  # type: ignore
+    )
+
+
+def get_unfinished_deletion_jobs(session: Session, stale_before: datetime) -> list[DeletionJob]:
+    """Jobs no process is working on: pending, failed or abandoned"""
+    statement = select(DeletionJob).where(
+        _claimable(stale_before)
+    ).order_by(DeletionJob.created_at)  # type: ignore
+    return list(session.exec(statement).all())
+
+
+def claim_deletion_job(session: Session, job_id: UUID, stale_before: datetime) -> DeletionJob | None:
+    """Mark a job running, unless another process is working on it
+
+    The update only matches a claimable job, and of two processes claiming
+    the same one the second waits on the first's row lock and then no
+    longer matches.
+    """
+    statement = update(DeletionJob).where(
+        DeletionJob.id == job_id, _claimable(stale_before)  # type: ignore
+    ).values(status="running", updated_at=utcnow())
+    claimed = session.execute(statement).rowcount  # type: ignore
+    session.commit()
+    if not claimed:
+        return None
+    return session.get(DeletionJob, job_id, populate_existing=True)
@@ -1,27 +1,75 @@
 from sqlmodel import select, Session
+from typing import Any
 from uuid import UUID
 
-from app.models import Hobby, HobbyCreate
+from app.crud.loaders import hobby_loader
+from app.crud.outbox import HOBBY_CREATED, HOBBY_DELETED, record_event
+from app.ml import index_hobby, unindex_hobby, graph_remove_hobby
+from app.models import Hobby, HobbyCreate, HobbyStats
 
 
 def create_hobby(session: Session, hobby_in: HobbyCreate) -> Hobby:
     db_hobby = Hobby.model_validate(hobby_in)
     session.add(db_hobby)
+    record_event(session, HOBBY_CREATED, hobby_id=db_hobby.id, payload={
+        "name": db_hobby.name, "description": db_hobby.description})
     session.commit()
     session.refresh(db_hobby)
+    index_hobby(db_hobby)
     return db_hobby
 
 
 def get_hobby_by_uuid(session: Session, hobby_id: UUID) -> Hobby | None:
-    return session.get(Hobby, hobby_id)
+    return hobby_loader(session).load(hobby_id)
+
+
+def get_hobby_fields(session: Session, hobby_id: UUID, fields: list[str]) -> dict[str, Any] | None:
+    """Only `fields` of a live hobby, selected in SQL rather than projected"""
+    statement = select(*(getattr(Hobby, field) for field in fields)).where(
+        Hobby.id == hobby_id, Hobby.deleted_at == None)  # type: ignore
+    row = session.execute(statement).first()
+    return row._asdict() if row else None
+
+
+def get_hobbies_by_uuids(session: Session, hobby_ids: list[UUID]) -> list[Hobby]:
+    """Fetch several hobbies in one query, in the order of `hobby_ids`"""
+    hobbies = hobby_loader(session).load_many(hobby_ids)
+    return [hobby for hobby in hobbies if hobby is not None]
 
 
 def get_hobby_by_name(session: Session, hobby_name: str) -> Hobby | None:
-    statement = select(Hobby).where(Hobby.name == hobby_name)
+    statement = select(Hobby).where(
+        Hobby.name == hobby_name).execution_options(prepare=True)
     hobby = session.exec(statement).first()
     return hobby
 
 
+def get_hobby_stats(session: Session, hobby_id: UUID) -> HobbyStats | None:
+    """Stats of a live hobby; a soft-deleted one has none, as it has no page"""
+    statement = (
+        select(HobbyStats)
+        .join(Hobby, HobbyStats.hobby_id == Hobby.id)  # type: ignore
+        .where(HobbyStats.hobby_id == hobby_id, Hobby.deleted_at == None)  # type: ignore
+    )
+    return session.exec(statement).first()
+
+
+def get_popular_hobbies(session: Session, limit: int) -> list[tuple[Hobby, HobbyStats]]:
+    """Hobbies with the most interested users, read off the stats index"""
+    statement = (
+        select(Hobby, HobbyStats)
+        .join(HobbyStats, HobbyStats.hobby_id == Hobby.id)  # type: ignore
+        .where(Hobby.deleted_at == None)  # type: ignore
+        # Ties broken by name, and by id, so pages are stable between calls
+        .order_by(HobbyStats.interested_count.desc(), Hobby.name, Hobby.id)  # type: ignore
+        .limit(limit)
+    )
+    return list(session.exec(statement).all())
+
+
 def delete_hobby(session: Session, db_hobby: Hobby):
+    record_event(session, HOBBY_DELETED, hobby_id=db_hobby.id)
     session.delete(db_hobby)
     session.commit()
+    unindex_hobby(db_hobby.id)
+    graph_remove_hobby(db_hobby.id)
@@ -0,0 +1,85 @@
+from typing import Generic, Iterable, TypeVar
+from sqlalchemy import any_, bindparam, event
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import Session, Uuid, select
+from uuid import UUID
+
+from app.models import Hobby, User
+
+T = TypeVar("T", Hobby, User)
+
+_LOADERS_KEY = "loaders"
+
+
+class Loader(Generic[T]):
+    """Batches and memoizes live-row lookups by id for one session
+
+    Ids can be queued with `prime` as they are discovered; the next `load` or
+    `load_many` fetches every queued id not yet known in one
+    `WHERE id = ANY(:ids)` query, prepared server-side on psycopg 3. Results,
+    including misses, are memoized until the session commits or rolls back.
+    """
+
+    def __init__(self, session: Session, model: type[T]):
+        self.session = session
+        self.model = model
+        self._known: dict[UUID, T | None] = {}
+        self._pending: set[UUID] = set()
+        self.queries = 0
+
+    def prime(self, ids: Iterable[UUID]):
+        self._pending.update(i for i in ids if i not in self._known)
+
+    def load(self, id: UUID) -> T | None:
+        return self.load_many([id])[0]
+
+    def load_many(self, ids: Iterable[UUID]) -> list[T | None]:
+        """Rows in the order of `ids`, None for missing or deleted ones"""
+        ids = list(ids)
+        self.prime(ids)
+        if self._pending:
+            self._fetch()
+        return [self._known[i] for i in ids]
+
+    def _fetch(self):
+        pending = list(self._pending)
+        self._pending.clear()
+        model = self.model
+        statement = select(model).where(
+            model.id == any_(bindparam("ids", pending, type_=ARRAY(Uuid))),  # type: ignore
+            model.deleted_at == None  # type: ignore
+        ).execution_options(prepare=True)
+        self.queries += 1
+        found = {row.id: row for row in self.session.exec(statement)}
+        for i in pending:
+            self._known[i] = found.get(i)
+
+    def clear(self):
+        self._known.clear()
+        self._pending.clear()
+
+
+def _get_loader(session: Session, model: type[T]) -> Loader[T]:
+    loaders = session.info.setdefault(_LOADERS_KEY, {})
+    loader = loaders.get(model)
+    if loader is None:
+        loader = loaders[model] = Loader(session, model)
+    return loader
+
+
+def hobby_loader(session: Session) -> Loader[Hobby]:
+    """The session's (so the request's) hobby loader"""
+    return _get_loader(session, Hobby)
+
+
+def user_loader(session: Session) -> Loader[User]:
+    """The session's (so the request's) user loader"""
+    return _get_loader(session, User)
+
+
+# Writes may create or delete rows, so memoized results only hold until then
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _clear_loaders(session: Session):
+    for loader in session.info.get(_LOADERS_KEY, {}).values():
+        loader.clear()
@@ -0,0 +1,132 @@
+from datetime import datetime
+from sqlalchemy import delete, literal_column, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+from typing import Any
+from uuid import UUID
+
+from app.models import OutboxEvent, OutboxOffset, UserHobbyLink, utcnow
+
+LINK_CREATED = "link.created"
+LINK_UPDATED = "link.updated"
+LINK_DELETED = "link.deleted"
+USER_DELETED = "user.deleted"
+HOBBY_CREATED = "hobby.created"
+HOBBY_DELETED = "hobby.deleted"
+# Events that concern every user rather than the one they name
+BROADCAST_TYPES = frozenset({HOBBY_DELETED})
+# Carry no user_id, so they stay out of users' event streams
+TOKEN_REVOKED = "token.revoked"
+USER_TOKENS_REVOKED = "user.tokens_revoked"
+TOKEN_REVOCATION_TYPES = (TOKEN_REVOKED, USER_TOKENS_REVOKED)
+
+# Oldest transaction still running anywhere in the cluster. Events of
+# transactions before it can no longer be joined by earlier ones
+_HORIZON = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+def record_event(session: Session, type: str, user_id: UUID | None = None, hobby_id: UUID | None = None, payload: dict[str, Any] | None = None) -> OutboxEvent:
+    """Append an event to the outbox, committed or rolled back with the session"""
+    event = OutboxEvent(type=type, user_id=user_id, hobby_id=hobby_id,
+                        payload=payload or {})
+    session.add(event)
+    return event
+
+
+def record_link_event(session: Session, type: str, link: UserHobbyLink) -> OutboxEvent:
+    return record_event(session, type, link.user_id, link.hobby_id,
+                        {"interested": link.interested, "rating": link.rating})
+
+
+def read_events(session: Session, after: tuple[int, int], limit: int, user_id: UUID | None = None) -> list[OutboxEvent]:
+    """Committed events after the (txid, id) position `after`, in that order
+
+    Ids are taken when rows are inserted, not when they commit, so a
+    transaction still running could yet commit an event with a lower id.
+    Events are therefore ordered by transaction id, and only read from
+    transactions older than every one still running. Nothing can then
+    appear behind a position once it has been read past.
+
+    With `user_id`, only that user's events and broadcasts are read, off
+    their own indexes rather than by scanning everyone's.
+    """
+    statement = (
+        select(OutboxEvent)
+        .where(tuple_(OutboxEvent.txid, OutboxEvent.id) > tuple_(*after),
+               OutboxEvent.txid < _HORIZON)  # type: ignore
+        .order_by(OutboxEvent.txid, OutboxEvent.id)  # type: ignore
+        .limit(limit)
+    )
+    if user_id is not None:
+        statement = statement.where(or_(
+            OutboxEvent.user_id == user_id,
+            OutboxEvent.type.in_(BROADCAST_TYPES)))  # type: ignore
+    return list(session.exec(statement).all())
+
+
+def has_unreadable_events(session: Session, after: tuple[int, int]) -> bool:
+    """Whether committed events after `after` wait on an older transaction"""
+    statement = (
+        select(OutboxEvent.id)
+        .where(tuple_(OutboxEvent.txid, OutboxEvent.id) > tuple_(*after),
+               OutboxEvent.txid >= _HORIZON)  # type: ignore
+        .limit(1)
+    )
+    return session.exec(statement).first() is not None
+
+
+def get_outbox_head(session: Session) -> tuple[int, int]:
+    """Position of the newest event `read_events` can return, or (0, 0)"""
+    statement = (
+        select(OutboxEvent.txid, OutboxEvent.id)
+        .where(OutboxEvent.txid < _HORIZON)  # type: ignore
+        .order_by(OutboxEvent.txid.desc(), OutboxEvent.id.desc())  # type: ignore
+        .limit(1)
+    )
+    row = session.exec(statement).first()
+    return (row[0], row[1]) if row else (0, 0)  # type: ignore
+
+
+def get_outbox_tail(session: Session) -> tuple[int, int] | None:
+    """Position of the oldest event still kept, or None if there are none"""
+    statement = (
+        select(OutboxEvent.txid, OutboxEvent.id)
+        .order_by(OutboxEvent.txid, OutboxEvent.id)  # type: ignore
+        .limit(1)
+    )
+    row = session.exec(statement).first()
+    return (row[0], row[1]) if row else None  # type: ignore
+
+
+def get_token_revocations(session: Session, since: datetime) -> list[OutboxEvent]:
+    """Token revocation events recorded since `since`, oldest first"""
+    statement = (
+        select(OutboxEvent)
+        .where(OutboxEvent.type.in_(TOKEN_REVOCATION_TYPES),  # type: ignore
+               OutboxEvent.created_at >= since)  # type: ignore
+        .order_by(OutboxEvent.txid, OutboxEvent.id)  # type: ignore
+    )
+    return list(session.exec(statement).all())
+
+
+def get_outbox_offset(session: Session, consumer: str) -> tuple[int, int]:
+    offset = session.get(OutboxOffset, consumer)
+    return (offset.txid, offset.event_id) if offset else (0, 0)
+
+
+def save_outbox_offset(session: Session, consumer: str, position: tuple[int, int]):
+    values = {"consumer": consumer, "txid": position[0],
+              "event_id": position[1], "updated_at": utcnow()}
+    statement = insert(OutboxOffset).values(values).on_conflict_do_update(
+        index_elements=[OutboxOffset.consumer], set_=values)
+    session.execute(statement)
+    session.commit()
+
+
+def prune_outbox(session: Session, before: datetime) -> int:
+    """Drop events created before `before`; returns how many"""
+    statement = delete(OutboxEvent).where(
+        OutboxEvent.created_at < before)  # type: ignore
+    deleted = session.execute(statement).rowcount  # type: ignore
+    session.commit()
+    return deleted
@@ -1,32 +1,150 @@
-from sqlmodel import select, Session
+from sqlalchemy import Integer, any_, bindparam, cast, column, update, values
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import Session, Uuid, select
+from typing import Any
 from uuid import UUID
 
-from app.models import UserHobbyLink, UserHobbyCreate, UserHobbyUpdate
+from app.crud.outbox import LINK_CREATED, LINK_DELETED, LINK_UPDATED, record_event, record_link_event
+from app.db.database import pipeline
+from app.ml import suggestion_cache, graph_upsert_link, graph_remove_link
+from app.models import Hobby, User, UserHobbyLink, UserHobbyCreate, UserHobbyUpdate
 
 
 def create_user_hobby_link(session: Session, user_id: UUID, user_hobby_in: UserHobbyCreate) -> UserHobbyLink:
     db_user_hobby = UserHobbyLink.model_validate(
         user_hobby_in, update={"user_id": user_id})
     session.add(db_user_hobby)
+    record_link_event(session, LINK_CREATED, db_user_hobby)
     session.commit()
     session.refresh(db_user_hobby)
+    suggestion_cache.invalidate(user_id)
+    graph_upsert_link(db_user_hobby)
     return db_user_hobby
 
 
+def create_user_hobby_links(session: Session, user_id: UUID, links_in: list[UserHobbyCreate]) -> list[UserHobbyLink]:
+    """Link a user to several hobbies at once, pipelined on psycopg 3"""
+    db_links = [UserHobbyLink.model_validate(link_in, update={"user_id": user_id})
+                for link_in in links_in]
+    with pipeline(session):
+        session.add_all(db_links)
+        session.flush()
+    # Outbox ids come back from the database, so these flush with the commit
+    for db_link in db_links:
+        record_link_event(session, LINK_CREATED, db_link)
+    session.commit()
+    suggestion_cache.invalidate(user_id)
+    for db_link in db_links:
+        graph_upsert_link(db_link)
+    return db_links
+
+
 def get_user_hobby_link(session: Session, user_id: UUID, hobby_id: UUID) -> UserHobbyLink | None:
-    db_link = session.get(UserHobbyLink, (user_id, hobby_id))
+    db_link = session.get(UserHobbyLink, (user_id, hobby_id),
+                          execution_options={"prepare": True})
     return db_link
 
 
+def get_user_hobby_link_fields(session: Session, user_id: UUID, hobby_id: UUID, fields: list[str]) -> dict[str, Any] | None:
+    """Only `fields` of a user-hobby link, selected in SQL rather than projected"""
+    statement = select(*(getattr(UserHobbyLink, field) for field in fields)).where(
+        UserHobbyLink.user_id == user_id, UserHobbyLink.hobby_id == hobby_id)
+    row = session.execute(statement).first()
+    return row._asdict() if row else None
+
+
+def _user_hobbies_page(statement: Any, user_id: UUID, limit: int, offset: int) -> Any:
+    # Shared by both paths so that a page holds the same hobbies whether or
+    # not fields= is given; names are unique, so the order is total
+    return (
+        statement
+        .join(UserHobbyLink, UserHobbyLink.hobby_id == Hobby.id)  # type: ignore
+        .where(UserHobbyLink.user_id == user_id, Hobby.deleted_at == None)  # type: ignore
+        .order_by(Hobby.name)
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def get_user_hobbies(session: Session, user_id: UUID, limit: int, offset: int = 0) -> list[Hobby]:
+    """A page of a user's live hobbies by name, paged in SQL"""
+    statement = _user_hobbies_page(select(Hobby), user_id, limit, offset)
+    return list(session.exec(statement).all())
+
+
+def get_user_hobby_fields(session: Session, user_id: UUID, fields: list[str], limit: int, offset: int = 0) -> list[dict[str, Any]]:
+    """Only `fields` of a page of a user's live hobbies, as get_user_hobbies pages them"""
+    statement = _user_hobbies_page(
+        select(*(getattr(Hobby, field) for field in fields)), user_id, limit, offset)
+    return [row._asdict() for row in session.execute(statement)]
+
+
+def get_hobby_user_links(session: Session, hobby_id: UUID, limit: int, after: UUID | None = None, interested: bool | None = None) -> list[tuple[User, UserHobbyLink]]:
+    """Users linked to a hobby, ordered by user id for keyset pagination"""
+    statement = (
+        select(User, UserHobbyLink)
+        .join(UserHobbyLink, UserHobbyLink.user_id == User.id)  # type: ignore
+        .where(UserHobbyLink.hobby_id == hobby_id, User.deleted_at == None)  # type: ignore
+    )
+    if after is not None:
+        statement = statement.where(UserHobbyLink.user_id > after)
+    if interested is not None:
+        statement = statement.where(UserHobbyLink.interested == interested)
+    statement = statement.order_by(
+        UserHobbyLink.user_id).limit(limit)  # type: ignore
+    return list(session.exec(statement).all())
+
+
 def update_user_hobby_link(session: Session, db_link: UserHobbyLink, user_hobby_in: UserHobbyUpdate) -> UserHobbyLink:
     update_data = user_hobby_in.model_dump(exclude_unset=True)
     db_link.sqlmodel_update(update_data)
     session.add(db_link)
+    record_link_event(session, LINK_UPDATED, db_link)
     session.commit()
     session.refresh(db_link)
+    suggestion_cache.invalidate(db_link.user_id)
+    graph_upsert_link(db_link)
     return db_link
 
 
+def update_user_hobby_ratings(session: Session, ratings: dict[tuple[UUID, UUID], int | None]) -> int:
+    """Set the ratings of many (user_id, hobby_id) links in one statement
+
+    Runs a single UPDATE ... FROM (VALUES ...); links that no longer exist
+    are skipped. Returns the number of links updated. The join alone can't
+    prune user_hobbies partitions, so the user ids are also given as an
+    array the planner can prune with.
+    """
+    if not ratings:
+        return 0
+    rows = values(column("user_id", Uuid), column("hobby_id", Uuid),
+                  column("rating", Integer), name="ratings").data(
+        [(user_id, hobby_id, rating) for (user_id, hobby_id), rating in ratings.items()])
+    statement = (
+        update(UserHobbyLink)
+        .where(UserHobbyLink.user_id == rows.c.user_id,
+               UserHobbyLink.hobby_id == rows.c.hobby_id,
+               UserHobbyLink.user_id == any_(bindparam(  # type: ignore
+                   "user_ids", list({user_id for user_id, _ in ratings}), type_=ARRAY(Uuid))))
+        .values(rating=cast(rows.c.rating, Integer))
+        .returning(UserHobbyLink.user_id, UserHobbyLink.hobby_id,
+                   UserHobbyLink.interested, UserHobbyLink.rating)
+    )
+    updated = session.execute(statement).all()
+    for row in updated:
+        record_event(session, LINK_UPDATED, row.user_id, row.hobby_id,
+                     {"interested": row.interested, "rating": row.rating})
+    session.commit()
+    for user_id in {row.user_id for row in updated}:
+        suggestion_cache.invalidate(user_id)
+    for row in updated:
+        graph_upsert_link(UserHobbyLink(**row._asdict()))
+    return len(updated)
+
+
 def delete_user_hobby_link(session: Session, db_link: UserHobbyLink):
+    record_link_event(session, LINK_DELETED, db_link)
     session.delete(db_link)
     session.commit()
+    suggestion_cache.invalidate(db_link.user_id)
+    graph_remove_link(db_link.user_id, db_link.hobby_id)
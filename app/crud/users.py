@@ -1,8 +1,16 @@
+import time
+from functools import cache
+from typing import Any
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlmodel import select, Session
 from uuid import UUID
 
-from app.core.security import hash_password
-from app.models import User, UserCreate, UserUpdate
+from app.core.security import TokenClaims, hash_password, password_needs_rehash, verify_password, token_denylist
+from app.crud.loaders import user_loader
+from app.crud.outbox import TOKEN_REVOKED, USER_DELETED, USER_TOKENS_REVOKED, record_event
+from app.ml import suggestion_cache, graph_remove_user
+from app.models import Hobby, HobbyPublic, User, UserCreate, UserHobbyLink, UserUpdate
 
 
 def create_user(session: Session, user_in: UserCreate) -> User:
@@ -15,7 +23,54 @@ def create_user(session: Session, user_in: UserCreate) -> User:
 
 
 def get_user_by_uuid(session: Session, user_id: UUID) -> User | None:
-    return session.get(User, user_id)
+    return user_loader(session).load(user_id)
+
+
+def get_user_fields(session: Session, user_id: UUID, fields: list[str]) -> dict[str, Any] | None:
+    """Only `fields` of a live user, selected in SQL rather than projected"""
+    statement = select(*(getattr(User, field) for field in fields)).where(
+        User.id == user_id, User.deleted_at == None)  # type: ignore
+    row = session.execute(statement).first()
+    return row._asdict() if row else None
+
+
+def get_users_by_uuids(session: Session, user_ids: list[UUID]) -> list[User]:
+    """Fetch several users in one query, in the order of `user_ids`"""
+    users = user_loader(session).load_many(user_ids)
+    return [user for user in users if user is not None]
+
+
+def get_user_with_hobbies(session: Session, user_id: UUID, limit: int, offset: int = 0) -> tuple[User, list[HobbyPublic]] | None:
+    """A user and a page of their hobbies by name, in a single query
+
+    The page is built by a subquery and aggregated into one JSON array
+    column, so there's no second round trip or per-link load. It filters on
+    the user_id parameter rather than correlating with users, so the
+    planner can prune user_hobbies down to the one partition.
+    """
+    page = (
+        select(Hobby.id, Hobby.name, Hobby.description)
+        .join(UserHobbyLink, UserHobbyLink.hobby_id == Hobby.id)  # type: ignore
+        .where(UserHobbyLink.user_id == user_id, Hobby.deleted_at == None)  # type: ignore
+        .order_by(Hobby.name)
+        .limit(limit)
+        .offset(offset)
+        .subquery("page")
+    )
+    hobby_json = func.json_build_object(
+        "id", page.c.id, "name", page.c.name, "description", page.c.description)
+    hobbies = select(func.coalesce(
+        func.json_agg(aggregate_order_by(hobby_json, page.c.name)),
+        literal_column("'[]'::json"),
+    )).scalar_subquery()
+
+    statement = select(User, hobbies).where(
+        User.id == user_id, User.deleted_at == None)  # type: ignore
+    row = session.exec(statement).first()
+    if row is None:
+        return None
+    user, hobby_rows = row
+    return user, [HobbyPublic.model_validate(hobby) for hobby in hobby_rows]
 
 
 def get_user_by_username(session: Session, username: str) -> User | None:
@@ -30,6 +85,29 @@ def get_user_by_email(session: Session, email: str) -> User | None:
     return user
 
 
+@cache
+def _dummy_password_hash() -> str:
+    return hash_password("not a real password")
+
+
+def authenticate_user(session: Session, username: str, password: str) -> User | None:
+    user = get_user_by_username(session, username)
+    if not user or user.deleted_at is not None:
+        # Spend the same bcrypt time so response times don't reveal usernames
+        verify_password(password, _dummy_password_hash())
+        return None
+    if not verify_password(password, user.password_hash):
+        return None
+
+    # The plaintext is only ever at hand here, so upgrade outdated hashes now
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = hash_password(password)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+    return user
+
+
 def update_user(session: Session, db_user: User, user_in: UserUpdate) -> User:
     user_data = user_in.model_dump(exclude_unset=True)
     if "password" in user_data:
@@ -37,11 +115,42 @@ def update_user(session: Session, db_user: User, user_in: UserUpdate) -> User:
 
     db_user.sqlmodel_update(user_data)
     session.add(db_user)
+    if "password" in user_data:
+        cutoff = _record_user_tokens_revoked(session, db_user.id)
     session.commit()
     session.refresh(db_user)
+    if "password" in user_data:
+        token_denylist.revoke_user(db_user.id, issued_before=cutoff)
     return db_user
 
 
+# Revocations are applied here at once, and by the other workers once the
+# outbox dispatcher delivers the event
+
+def revoke_token(session: Session, claims: TokenClaims):
+    record_event(session, TOKEN_REVOKED, payload={
+                 "jti": claims.jti.hex(), "exp": claims.exp})
+    session.commit()
+    token_denylist.revoke(claims)
+
+
+def _record_user_tokens_revoked(session: Session, user_id: UUID) -> float:
+    cutoff = time.time()
+    record_event(session, USER_TOKENS_REVOKED, payload={
+                 "sub": str(user_id), "issued_before": cutoff})
+    return cutoff
+
+
+def revoke_user_tokens(session: Session, user_id: UUID):
+    """Revoke every token issued to a user so far"""
+    cutoff = _record_user_tokens_revoked(session, user_id)
+    session.commit()
+    token_denylist.revoke_user(user_id, issued_before=cutoff)
+
+
 def delete_user(session: Session, db_user: User):
+    record_event(session, USER_DELETED, user_id=db_user.id)
     session.delete(db_user)
     session.commit()
+    suggestion_cache.invalidate(db_user.id)
+    graph_remove_user(db_user.id)
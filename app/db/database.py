@@ -1,10 +1,138 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+from sqlalchemy import URL, event, make_url
+from sqlalchemy.engine import Engine
 from sqlmodel import Session, create_engine
 
 from app.core.config import settings
 
-engine = create_engine(str(settings.DATABASE_URL))
+try:
+    import psycopg
+except ImportError:  # pragma: no cover
+    psycopg = None
+
+DRIVERS = {"psycopg2": "postgresql+psycopg2", "psycopg": "postgresql+psycopg"}
+
+# psycopg 3 prepares a statement after this many runs on a connection
+PREPARE_THRESHOLD = 5
+
+_engine: Engine | None = None
+
+
+def _execute_prepared(cursor, statement, parameters, context) -> bool:
+    # Statements marked with the `prepare` execution option are prepared on
+    # first use rather than once they reach PREPARE_THRESHOLD
+    if context.execution_options.get("prepare"):
+        cursor.execute(statement, parameters, prepare=True)
+        return True
+    return False
+
+
+def make_engine(url: str | URL, driver: str | None = None, **kwargs: Any) -> Engine:
+    """Engine for `url` on the given or configured driver"""
+    driver = driver or settings.DATABASE_DRIVER
+    if driver not in DRIVERS:
+        raise ValueError(f"Unknown database driver: {driver}")
+    url = make_url(url).set(drivername=DRIVERS[driver])
+    if driver != "psycopg":
+        return create_engine(url, **kwargs)
+
+    if psycopg is None:
+        raise RuntimeError("psycopg must be installed to use DATABASE_DRIVER=psycopg")
+    prepared = settings.DATABASE_PREPARED_STATEMENTS
+    kwargs["connect_args"] = {
+        "prepare_threshold": PREPARE_THRESHOLD if prepared else None,
+        # Text comes back as str even from SQL_ASCII databases, as on psycopg2
+        "client_encoding": "utf8",
+        **kwargs.get("connect_args", {}),
+    }
+    engine = create_engine(url, **kwargs)
+    if prepared:
+        event.listen(engine, "do_execute", _execute_prepared)
+    return engine
+
+
+def get_engine() -> Engine:
+    """Process-wide engine, created on first use so each worker builds its own"""
+    global _engine
+    if _engine is None:
+        _engine = make_engine(str(settings.DATABASE_URL))
+    return _engine
+
+
+def dispose_engine():
+    global _engine
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+
+
+def _dispose_engine_after_fork():
+    # Pooled connections belong to the parent; drop them without closing so
+    # the parent's sockets are left alone
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_engine_after_fork)
+
+
+class PoolMonitor:
+    """Exponentially weighted average of connection pool checkout waits
+
+    The average decays towards zero while no samples arrive, so a burst of
+    waits doesn't keep reporting saturation after traffic has been shed.
+    """
+
+    def __init__(self, half_life: float = 1.0, clock=time.monotonic):
+        self.half_life = half_life
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wait = 0.0
+        self._updated = clock()
+
+    def _decayed(self, now: float) -> float:
+        age = now - self._updated
+        return self._wait * math.pow(0.5, age / self.half_life)
+
+    def record(self, wait: float):
+        with self._lock:
+            now = self._clock()
+            self._wait = 0.8 * self._decayed(now) + 0.2 * wait
+            self._updated = now
+
+    @property
+    def wait(self) -> float:
+        with self._lock:
+            return self._decayed(self._clock())
+
+
+pool_monitor = PoolMonitor()
 
 
 def get_session():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
+        # Check out the connection up front to measure pool pressure
+        start = time.perf_counter()
+        session.connection()
+        pool_monitor.record(time.perf_counter() - start)
         yield session
+
+
+@contextmanager
+def pipeline(session: Session) -> Iterator[None]:
+    """Send the statements run in the block without waiting on each, on psycopg 3
+
+    Only for writes whose results aren't read inside the block; rows and
+    rowcounts arrive when it exits. On psycopg2 this does nothing.
+    """
+    dbapi_connection = session.connection().connection.dbapi_connection
+    if psycopg is not None and isinstance(dbapi_connection, psycopg.Connection):
+        with dbapi_connection.pipeline():
+            yield
+    else:
+        yield
@@ -5,8 +5,12 @@ from pydantic import ValidationError
 from sqlmodel import Session
 from sqlalchemy.dialects.postgresql import insert
 
+from app.db.database import pipeline
 from app.models import Hobby
 
+# Rows per INSERT statement; batches are pipelined on psycopg 3
+SEED_BATCH_SIZE = 1000
+
 
 def get_hobbies_data(file: IO) -> list[dict[str, Any]]:
     reader = csv.DictReader(file)
@@ -21,8 +25,11 @@ def get_hobbies_data(file: IO) -> list[dict[str, Any]]:
     return hobbies
 
 
-def seed_hobbies_data(file: IO, session: Session):
+def seed_hobbies_data(file: IO, session: Session, batch_size: int = SEED_BATCH_SIZE):
     hobbies = get_hobbies_data(file)
-    statement = insert(Hobby).values(hobbies).on_conflict_do_nothing()
-    session.execute(statement)
+    with pipeline(session):
+        for start in range(0, len(hobbies), batch_size):
+            statement = insert(Hobby).values(
+                hobbies[start:start + batch_size]).on_conflict_do_nothing()
+            session.execute(statement)
     session.commit()
@@ -1,7 +1,84 @@
-from fastapi import Depends
-from sqlmodel import Session
-from typing import Annotated
+from fastapi import Depends, HTTPException, Query
+from fastapi.security import OAuth2PasswordBearer
+from sqlmodel import Session, SQLModel
+from typing import Annotated, Callable
+from uuid import UUID
 
+from app.core.config import settings
+from app.core.security import InvalidTokenError, TokenClaims, verify_access_token
 from app.db.database import get_session
+from app.ml import HobbyIndex, get_hobby_index
+from app.models import HobbyPublic, UserHobbyPublic, UserPublic
 
 SessionDep = Annotated[Session, Depends(get_session)]
+
+
+def get_hobby_index_dep(session: SessionDep) -> HobbyIndex:
+    return get_hobby_index(session)
+
+
+HobbyIndexDep = Annotated[HobbyIndex, Depends(get_hobby_index_dep)]
+
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
+
+
+def get_token_claims(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenClaims:
+    try:
+        return verify_access_token(token)
+    except InvalidTokenError:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"})
+
+
+TokenClaimsDep = Annotated[TokenClaims, Depends(get_token_claims)]
+
+
+def require_user_token(claims: TokenClaimsDep, user_id: UUID):
+    """Only let a user's own token through to their /users/{user_id} routes"""
+    if claims.sub != user_id:
+        raise HTTPException(
+            status_code=403, detail="Not allowed to access this user")
+
+
+def get_batch_ids(ids: Annotated[str, Query(description="Comma-separated ids")]) -> list[UUID]:
+    """Parse the ids of a batch GET, deduplicated in request order"""
+    try:
+        parsed = [UUID(i.strip()) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid id in ids")
+    parsed = list(dict.fromkeys(parsed))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if len(parsed) > settings.MULTI_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.MULTI_GET_MAX_IDS} ids are allowed")
+    return parsed
+
+
+BatchIdsDep = Annotated[list[UUID], Depends(get_batch_ids)]
+
+
+def sparse_fields(model: type[SQLModel]) -> Callable[..., list[str] | None]:
+    """Dependency parsing `fields=` into a subset of `model`'s fields"""
+    def get_fields(fields: Annotated[str | None, Query(description="Comma-separated fields to return")] = None) -> list[str] | None:
+        if fields is None:
+            return None
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested - model.model_fields.keys()
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown field: {', '.join(sorted(unknown))}")
+        if not requested:
+            raise HTTPException(status_code=400, detail="No fields given")
+        return [name for name in model.model_fields if name in requested]
+    return get_fields
+
+
+UserFieldsDep = Annotated[list[str] | None, Depends(sparse_fields(UserPublic))]
+HobbyFieldsDep = Annotated[list[str] | None, Depends(sparse_fields(HobbyPublic))]
+UserHobbyFieldsDep = Annotated[list[str] | None, Depends(sparse_fields(UserHobbyPublic))]
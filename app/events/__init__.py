@@ -0,0 +1,4 @@
+from .dispatcher import *
+from .handlers import *
+from .hub import *
+from .streams import *
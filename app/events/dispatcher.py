@@ -0,0 +1,299 @@
+import itertools
+import logging
+import select
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, NamedTuple
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from uuid import UUID
+
+from app import crud
+from app.db.database import get_engine, psycopg
+from app.models import OutboxEvent, utcnow
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "outbox_events"
+
+# How often the dispatcher thread checks whether it should stop
+_WAIT_SLICE = 0.5
+
+
+class Position(NamedTuple):
+    """Place in the outbox: events are delivered in (txid, event_id) order"""
+    txid: int
+    event_id: int
+
+    def __str__(self) -> str:
+        return f"{self.txid}.{self.event_id}"
+
+    @classmethod
+    def parse(cls, value: str) -> "Position":
+        txid, _, event_id = value.partition(".")
+        position = cls(int(txid), int(event_id))
+        if position.txid < 0 or position.event_id < 0:
+            raise ValueError(f"Invalid outbox position: {value}")
+        return position
+
+
+class Event(NamedTuple):
+    position: Position
+    type: str
+    user_id: UUID | None
+    hobby_id: UUID | None
+    payload: dict[str, Any]
+    created_at: datetime
+
+    @classmethod
+    def from_row(cls, row: OutboxEvent) -> "Event":
+        return cls(Position(row.txid, row.id), row.type, row.user_id,  # type: ignore
+                   row.hobby_id, row.payload, row.created_at)
+
+
+Subscriber = Callable[[list[Event]], None]
+
+
+class _Consumer:
+    def __init__(self, name: str, callback: Subscriber):
+        self.name = name
+        self.callback = callback
+        self.position: Position | None = None
+        self.locked = False
+
+
+class EventDispatcher:
+    """Delivers committed outbox events to this worker's subscribers
+
+    One thread per worker LISTENs for the outbox trigger's notifications on
+    a connection of its own, then reads everything new in batches of
+    `batch_size` and hands each batch to every subscriber. Notifications
+    only say that something was written, so a missed one costs at most
+    `poll_interval` seconds of latency. Events that can't be read yet, as
+    an older transaction is still running, are retried every half second
+    rather than at the next poll; their notification has come and gone.
+    Subscribers are called on the dispatcher thread and must not block;
+    they see events from the moment they subscribe.
+
+    Durable consumers added with `add_consumer` instead resume from an
+    offset stored in the database, so they see every event at least once
+    across restarts. Each runs in one worker at a time, whichever holds its
+    advisory lock. Events older than `retention` are pruned.
+    """
+
+    def __init__(self, bind: Engine | None = None, batch_size: int = 500, poll_interval: float = 5.0, retention: timedelta | None = None):
+        self.bind = bind
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.head = Position(0, 0)
+        self._subscribers: dict[int, Subscriber] = {}
+        self._ids = itertools.count()
+        self._consumers: dict[str, _Consumer] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._listener: Any = None
+        self._pruned = 0.0
+        self._held_back = False
+        self.notifications = 0
+        self.batches = 0
+        self.delivered = 0
+        self.errors = 0
+
+    @property
+    def engine(self) -> Engine:
+        return self.bind or get_engine()
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Call `callback` with each new batch of events; returns the unsubscribe"""
+        key = next(self._ids)
+        with self._lock:
+            self._subscribers[key] = callback
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers.pop(key, None)
+        return unsubscribe
+
+    def add_consumer(self, name: str, callback: Subscriber):
+        """Deliver every event to `callback` from `name`'s stored offset on"""
+        with self._lock:
+            self._consumers[name] = _Consumer(name, callback)
+
+    def read(self, after: Position, limit: int | None = None, user_id: UUID | None = None) -> list[Event]:
+        """Committed events after `after`, as delivered to subscribers
+
+        With `user_id`, only the events a stream of that user's would get.
+        """
+        with Session(self.engine) as session:
+            rows = crud.read_events(session, after, limit or self.batch_size, user_id)
+            return [Event.from_row(row) for row in rows]
+
+    def retains(self, after: Position) -> bool:
+        """Whether every event after `after` is still in the outbox, unpruned"""
+        with Session(self.engine) as session:
+            tail = crud.get_outbox_tail(session)
+        return tail is None or after >= tail
+
+    # Listening
+
+    def _listen(self):
+        connection = self.engine.raw_connection()
+        # Kept out of the pool: it stays in LISTEN mode and holds our locks
+        connection.detach()
+        connection.dbapi_connection.autocommit = True  # type: ignore
+        cursor = connection.cursor()
+        cursor.execute(f"LISTEN {CHANNEL}")
+        cursor.close()
+        self._listener = connection.dbapi_connection
+
+    def _close_listener(self):
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except Exception:  # pragma: no cover
+                pass
+            self._listener = None
+        for consumer in self._consumers.values():
+            consumer.locked = False
+
+    def _wait(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a notification"""
+        connection = self._listener
+        if psycopg is not None and isinstance(connection, psycopg.Connection):
+            notified = any(True for _ in connection.notifies(timeout=timeout, stop_after=1))
+        else:
+            if select.select([connection], [], [], timeout)[0]:
+                connection.poll()
+            notified = bool(connection.notifies)
+            connection.notifies.clear()
+        if notified:
+            self.notifications += 1
+        return notified
+
+    def _try_lock(self, name: str) -> bool:
+        cursor = self._listener.cursor()
+        try:
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))",
+                           (f"outbox:{name}",))
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    # Delivery
+
+    def _deliver(self):
+        while not self._stopping.is_set():
+            events = self.read(self.head)
+            if not events:
+                break
+            self.head = events[-1].position
+            self.batches += 1
+            self.delivered += len(events)
+            with self._lock:
+                subscribers = list(self._subscribers.values())
+            for callback in subscribers:
+                try:
+                    callback(events)
+                except Exception:
+                    self.errors += 1
+                    logger.exception("outbox subscriber failed")
+            if len(events) < self.batch_size:
+                break
+        with Session(self.engine) as session:
+            self._held_back = crud.has_unreadable_events(session, self.head)
+
+    def _consume(self, consumer: _Consumer):
+        if not consumer.locked:
+            consumer.locked = self._try_lock(consumer.name)
+            if not consumer.locked:
+                return
+            with Session(self.engine) as session:
+                consumer.position = Position(
+                    *crud.get_outbox_offset(session, consumer.name))
+        while not self._stopping.is_set():
+            events = self.read(consumer.position)  # type: ignore
+            if not events:
+                return
+            # Nothing is saved unless the callback succeeds, so a failed
+            # batch is retried
+            consumer.callback(events)
+            consumer.position = events[-1].position
+            with Session(self.engine) as session:
+                crud.save_outbox_offset(session, consumer.name, consumer.position)
+            if len(events) < self.batch_size:
+                return
+
+    def _prune(self):
+        if self.retention is None or time.monotonic() - self._pruned < 3600:
+            return
+        self._pruned = time.monotonic()
+        with Session(self.engine) as session:
+            pruned = crud.prune_outbox(session, utcnow() - self.retention)
+        logger.info("pruned %d outbox events", pruned)
+
+    def poll(self):
+        """Deliver whatever has been committed since the last call"""
+        self._deliver()
+        for consumer in list(self._consumers.values()):
+            try:
+                self._consume(consumer)
+            except Exception:
+                self.errors += 1
+                logger.exception("outbox consumer %s failed", consumer.name)
+        self._prune()
+
+    def _run(self):
+        waited = 0.0
+        while not self._stopping.is_set():
+            try:
+                if self._listener is None:
+                    self._listen()
+                    waited = self.poll_interval
+                elif not self._wait(_WAIT_SLICE):
+                    waited += _WAIT_SLICE
+                    if waited < self.poll_interval:
+                        continue
+                self.poll()
+                # Due again after one more slice if events were held back
+                waited = self.poll_interval - _WAIT_SLICE if self._held_back else 0.0
+            except Exception:
+                self.errors += 1
+                logger.exception("outbox dispatcher failed; reconnecting")
+                self._close_listener()
+                self._stopping.wait(self.poll_interval)
+        self._close_listener()
+
+    def current_head(self) -> Position:
+        with Session(self.engine) as session:
+            return Position(*crud.get_outbox_head(session))
+
+    def start(self, after: Position | None = None):
+        """Deliver events from `after` on, by default from the current head"""
+        if self._thread is None:
+            self._stopping.clear()
+            self.head = self.current_head() if after is None else after
+            self._thread = threading.Thread(
+                target=self._run, name="outbox-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "head": str(self.head),
+            "listening": self._listener is not None,
+            "subscribers": len(self._subscribers),
+            "consumers": {name: str(c.position) if c.locked else None
+                          for name, c in self._consumers.items()},
+            "notifications": self.notifications,
+            "batches": self.batches,
+            "delivered": self.delivered,
+            "errors": self.errors,
+        }
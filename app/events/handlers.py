@@ -0,0 +1,56 @@
+from datetime import timedelta
+from sqlmodel import Session
+from uuid import UUID
+
+from app import crud, ml
+from app.core.config import settings
+from app.core.security import token_denylist
+from app.crud.outbox import (HOBBY_CREATED, HOBBY_DELETED, LINK_CREATED, LINK_DELETED, LINK_UPDATED, TOKEN_REVOKED,
+                             USER_DELETED, USER_TOKENS_REVOKED)
+from app.db.database import get_engine
+from app.models import Hobby, UserHobbyLink, utcnow
+
+from .dispatcher import Event
+
+
+def apply_to_caches(events: list[Event]):
+    """Bring this worker's suggestion cache, link graph, hobby index and token
+    denylist up to date
+
+    Every worker sees every event, its own writes included. Those were
+    applied when they were made, and applying them again is harmless.
+    """
+    for event in events:
+        if event.type in (LINK_CREATED, LINK_UPDATED):
+            ml.graph_upsert_link(UserHobbyLink(
+                user_id=event.user_id, hobby_id=event.hobby_id, **event.payload))
+            ml.suggestion_cache.invalidate(event.user_id)  # type: ignore
+        elif event.type == LINK_DELETED:
+            ml.graph_remove_link(event.user_id, event.hobby_id)  # type: ignore
+            ml.suggestion_cache.invalidate(event.user_id)  # type: ignore
+        elif event.type == USER_DELETED:
+            ml.graph_remove_user(event.user_id)  # type: ignore
+            ml.suggestion_cache.invalidate(event.user_id)  # type: ignore
+        elif event.type == HOBBY_CREATED:
+            ml.index_hobby(Hobby(id=event.hobby_id, **event.payload))
+        elif event.type == HOBBY_DELETED:
+            ml.unindex_hobby(event.hobby_id)  # type: ignore
+            ml.graph_remove_hobby(event.hobby_id)  # type: ignore
+        elif event.type == TOKEN_REVOKED:
+            token_denylist.revoke_id(bytes.fromhex(event.payload["jti"]),
+                                     event.payload["exp"])
+        elif event.type == USER_TOKENS_REVOKED:
+            token_denylist.revoke_user(UUID(event.payload["sub"]),
+                                       issued_before=event.payload["issued_before"])
+
+
+def restore_token_denylist():
+    """Re-apply revocations of tokens that could still be unexpired
+
+    The denylist only lives in memory, so a worker that starts after a
+    revocation reads it back from the outbox.
+    """
+    since = utcnow() - timedelta(seconds=settings.ACCESS_TOKEN_TTL)
+    with Session(get_engine()) as session:
+        rows = crud.get_token_revocations(session, since)
+    apply_to_caches([Event.from_row(row) for row in rows])
@@ -0,0 +1,72 @@
+import itertools
+import threading
+from collections import defaultdict
+from typing import Callable
+from uuid import UUID
+
+from app.crud.outbox import BROADCAST_TYPES
+
+from .dispatcher import Event, EventDispatcher, Subscriber
+
+
+class UserEventHub:
+    """Routes the dispatcher's events to listeners by the user they concern
+
+    The hub is the worker's one dispatcher subscriber for all of its user
+    streams, so they share its single LISTEN connection. Each batch is
+    grouped by user and handed only to that user's listeners, so a batch
+    costs the same whether ten or tens of thousands of users are
+    listening; only broadcast events (hobby deletes) reach everyone.
+    Listeners are called on the dispatcher thread and must not block.
+    """
+
+    def __init__(self, dispatcher: EventDispatcher):
+        self.dispatcher = dispatcher
+        self._listeners: dict[UUID, dict[int, Subscriber]] = defaultdict(dict)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.unsubscribe = dispatcher.subscribe(self.publish)
+
+    def listen(self, user_id: UUID, callback: Subscriber) -> Callable[[], None]:
+        """Call `callback` with each batch of events for `user_id`; returns the unlisten"""
+        key = next(self._ids)
+        with self._lock:
+            self._listeners[user_id][key] = callback
+
+        def unlisten():
+            with self._lock:
+                listeners = self._listeners.get(user_id)
+                if listeners is not None:
+                    listeners.pop(key, None)
+                    if not listeners:
+                        del self._listeners[user_id]
+        return unlisten
+
+    def publish(self, events: list[Event]):
+        by_user: dict[UUID, list[Event]] = defaultdict(list)
+        broadcast = []
+        for event in events:
+            if event.type in BROADCAST_TYPES:
+                broadcast.append(event)
+            elif event.user_id is not None:
+                by_user[event.user_id].append(event)
+
+        with self._lock:
+            if broadcast:
+                targets = [(listeners, by_user.get(user_id, []) + broadcast)
+                           for user_id, listeners in self._listeners.items()]
+            else:
+                targets = [(self._listeners[user_id], batch)
+                           for user_id, batch in by_user.items()
+                           if user_id in self._listeners]
+            targets = [(list(listeners.values()), batch) for listeners, batch in targets]
+
+        for listeners, batch in targets:
+            for callback in listeners:
+                callback(batch)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "users": len(self._listeners),
+            "listeners": sum(len(l) for l in self._listeners.values()),
+        }
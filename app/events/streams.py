@@ -0,0 +1,254 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Callable
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from uuid import UUID
+
+from app import crud, ml
+from app.crud.outbox import BROADCAST_TYPES, HOBBY_DELETED, USER_DELETED
+from app.db.database import get_engine
+from app.models import HobbySuggestionsPublic
+
+from .dispatcher import Event, EventDispatcher, Position
+from .hub import UserEventHub
+
+Subscribe = Callable[[Callable[[list[Event]], None]], Callable[[], None]]
+
+
+def _frame(event: str, data: Any, id: str | None = None) -> bytes:
+    data = json.dumps(data, default=str, separators=(",", ":"))
+    head = f"id: {id}\n" if id is not None else ""
+    return f"{head}event: {event}\ndata: {data}\n\n".encode()
+
+
+def format_event(event: Event) -> bytes:
+    """Server-sent event frame; its id is the position to resume after"""
+    return _frame(event.type, {
+        "type": event.type,
+        "user_id": event.user_id,
+        "hobby_id": event.hobby_id,
+        "payload": event.payload,
+        "created_at": event.created_at.isoformat(),
+    }, id=str(event.position))
+
+
+HEARTBEAT = b": keep-alive\n\n"
+
+# No caching, and no buffering by nginx-style proxies
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def _backlog(dispatcher: EventDispatcher, after: Position, user_id: UUID | None = None) -> AsyncIterator[list[Event]]:
+    """Batches of the events committed after `after`, read off the outbox
+
+    Only `user_id`'s events and broadcasts if given, filtered in SQL.
+    """
+    while True:
+        events = await run_in_threadpool(dispatcher.read, after, None, user_id)
+        if events:
+            yield events
+            after = events[-1].position
+        if len(events) < dispatcher.batch_size:
+            return
+
+
+class _Stream:
+    """Queues events from the dispatcher thread onto one client's event loop
+
+    A client that falls `queue_size` events behind is disconnected rather
+    than buffered for without bound. Waiting clients cost no wake-ups but
+    a comment every `heartbeat` seconds, which keeps proxies from closing
+    the connection; that is also when the stream checks `closed()`.
+    """
+
+    def __init__(self, subscribe: Subscribe, heartbeat: float = 15.0, queue_size: int = 1000, closed: Callable[[], bool] = lambda: False):
+        self.subscribe = subscribe
+        self.heartbeat = heartbeat
+        self.queue_size = queue_size
+        self.closed = closed
+        self.overflowed = False
+        self.ended = False
+
+    def accept(self, event: Event) -> bool:
+        return True
+
+    def _enqueue(self, queue: asyncio.Queue, events: list[Event]):
+        for event in events:
+            if not self.accept(event):
+                continue
+            if queue.full():
+                self.overflowed = True
+                return
+            queue.put_nowait(event)
+
+    async def _start(self) -> AsyncIterator[bytes]:
+        return
+        yield
+
+    async def _deliver(self, events: list[Event]) -> AsyncIterator[bytes]:
+        for event in events:
+            yield format_event(event)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[Event] = asyncio.Queue(self.queue_size)
+
+        def on_events(events: list[Event]):
+            loop.call_soon_threadsafe(self._enqueue, queue, events)
+
+        # Subscribed before anything is read, so nothing falls in between
+        unsubscribe = self.subscribe(on_events)
+        try:
+            async for frame in self._start():
+                yield frame
+            while not (self.ended or self.closed()):
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                if self.overflowed:
+                    return
+                # Whatever else has arrived goes out with it
+                events = [event]
+                while not queue.empty():
+                    events.append(queue.get_nowait())
+                async for frame in self._deliver(events):
+                    yield frame
+        finally:
+            unsubscribe()
+
+
+class EventStream(_Stream):
+    """One SSE client's view of the dispatcher
+
+    Clients that resume with an `after` position are first sent what they
+    missed, and one that was disconnected for falling behind reconnects
+    with its Last-Event-ID to catch up from the outbox. Given a `user_id`,
+    the backlog is only that user's events and broadcasts; `accept` still
+    filters the live ones.
+    """
+
+    def __init__(self, dispatcher: EventDispatcher, after: Position | None = None, accept: Callable[[Event], bool] | None = None, user_id: UUID | None = None, **kwargs: Any):
+        super().__init__(dispatcher.subscribe, **kwargs)
+        self.dispatcher = dispatcher
+        self.last = after
+        self.user_id = user_id
+        self._accept = accept or (lambda event: True)
+
+    def accept(self, event: Event) -> bool:
+        return self._accept(event)
+
+    async def _start(self) -> AsyncIterator[bytes]:
+        if self.last is None:
+            return
+        async for events in _backlog(self.dispatcher, self.last, self.user_id):
+            async for frame in self._deliver(events):
+                yield frame
+
+    async def _deliver(self, events: list[Event]) -> AsyncIterator[bytes]:
+        for event in events:
+            # Events seen in both the backlog and live are sent once
+            if self.last is not None and event.position <= self.last:
+                continue
+            self.last = event.position
+            if self.accept(event):
+                yield format_event(event)
+
+
+def load_user_suggestions(user_id: UUID, limit: int) -> dict[str, Any] | None:
+    """A user's suggestions as GET /users/{user_id}/hobbies/suggestions has them"""
+    with Session(get_engine()) as session:
+        user = crud.get_user_by_uuid(session, user_id)
+        if user is None:
+            return None
+        index = ml.get_hobby_index(session)
+        hobby_ids = ml.get_cached_suggestion_ids(index, user, limit)
+        suggestions = HobbySuggestionsPublic(
+            user_id=user.id, suggestions=crud.get_hobbies_by_uuids(session, hobby_ids))  # type: ignore
+        return suggestions.model_dump(mode="json")
+
+
+class UserStream(_Stream):
+    """A user's link changes, and their suggestions whenever those change
+
+    Starts with the user's current suggestions (`initial`, if already
+    loaded). Each burst of the user's link events is followed by one
+    refreshed `suggestions` frame, as is the deletion of a hobby they were
+    being suggested. The stream ends once the user is deleted.
+
+    A client resuming `after` a position is sent the events it missed
+    from the outbox next, as EventStream does. The suggestions it was just
+    sent are already current, so those aren't followed by a refresh. One
+    resuming from before the oldest event kept gets those suggestions alone,
+    as a fresh snapshot, rather than a replay with gaps.
+    """
+
+    def __init__(self, hub: UserEventHub, user_id: UUID, limit: int = 10, initial: dict[str, Any] | None = None, load: Callable[[UUID, int], dict[str, Any] | None] = load_user_suggestions, after: Position | None = None, **kwargs: Any):
+        super().__init__(lambda callback: hub.listen(user_id, callback), **kwargs)
+        self.hub = hub
+        self.last = after
+        self.user_id = user_id
+        self.limit = limit
+        self.load = load
+        self.suggestions = initial
+        self._suggested: set[str] = set()
+
+    async def _suggestions(self) -> AsyncIterator[bytes]:
+        suggestions = await run_in_threadpool(self.load, self.user_id, self.limit)
+        if suggestions is None:
+            self.ended = True
+            return
+        self.suggestions = suggestions
+        yield self._suggestions_frame()
+
+    def _suggestions_frame(self) -> bytes:
+        self._suggested = {h["id"] for h in self.suggestions["suggestions"]}  # type: ignore
+        return _frame("suggestions", self.suggestions)
+
+    def accept(self, event: Event) -> bool:
+        return event.user_id == self.user_id or event.type in BROADCAST_TYPES
+
+    def _unseen(self, events: list[Event]) -> list[Event]:
+        # Events seen in both the backlog and live are sent once
+        unseen = []
+        for event in events:
+            if self.last is None or event.position > self.last:
+                self.last = event.position
+                unseen.append(event)
+        return unseen
+
+    async def _start(self) -> AsyncIterator[bytes]:
+        if self.suggestions is not None:
+            yield self._suggestions_frame()
+        else:
+            async for frame in self._suggestions():
+                yield frame
+        if self.last is None or self.ended:
+            return
+        dispatcher = self.hub.dispatcher
+        if not await run_in_threadpool(dispatcher.retains, self.last):
+            self.last = None
+            return
+        async for events in _backlog(dispatcher, self.last, self.user_id):
+            for event in self._unseen(events):
+                if not self.accept(event):
+                    continue
+                yield format_event(event)
+                if event.type == USER_DELETED:
+                    self.ended = True
+                    return
+
+    async def _deliver(self, events: list[Event]) -> AsyncIterator[bytes]:
+        refresh = False
+        for event in self._unseen(events):
+            yield format_event(event)
+            if event.type == USER_DELETED:
+                self.ended = True
+                return
+            if event.type != HOBBY_DELETED or str(event.hobby_id) in self._suggested:
+                refresh = True
+        if refresh:
+            async for frame in self._suggestions():
+                yield frame
@@ -0,0 +1,2 @@
+from .deletion import *
+from .ratings import *
@@ -0,0 +1,24 @@
+import logging
+from datetime import timedelta
+
+from app import crud
+from app.core.config import settings
+from app.db.database import get_engine, get_session
+from app.models import utcnow
+from .deletion import run_deletion_job
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    session = next(get_session())
+    lease = timedelta(seconds=settings.DELETE_JOB_LEASE)
+    jobs = crud.get_unfinished_deletion_jobs(session, utcnow() - lease)
+    print(f"resuming {len(jobs)} deletion jobs")
+    for job in jobs:
+        run_deletion_job(get_engine(), job.id)
+
+    print("deletion jobs complete")
+
+
+main()
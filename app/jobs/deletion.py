@@ -0,0 +1,83 @@
+import logging
+import time
+from datetime import timedelta
+from sqlalchemy import delete, tuple_
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, select
+from uuid import UUID
+
+from app import crud
+from app.core.config import settings
+from app.models import DeletionJob, Hobby, User, UserHobbyLink, utcnow
+
+logger = logging.getLogger(__name__)
+
+TARGET_MODELS: dict[str, type[User] | type[Hobby]] = {
+    User.__tablename__: User,  # type: ignore
+    Hobby.__tablename__: Hobby,  # type: ignore
+}
+
+
+def _delete_link_batch(session: Session, job: DeletionJob, batch_size: int) -> int:
+    if job.target_table == User.__tablename__:
+        column = UserHobbyLink.user_id
+    else:
+        column = UserHobbyLink.hobby_id
+    batch = (
+        select(UserHobbyLink.user_id, UserHobbyLink.hobby_id)
+        .where(column == job.target_id)
+        .limit(batch_size)
+    )
+    statement = delete(UserHobbyLink).where(
+        tuple_(UserHobbyLink.user_id, UserHobbyLink.hobby_id).in_(batch))
+    if job.target_table == User.__tablename__:
+        # Lets the planner skip every user_hobbies partition but the user's
+        statement = statement.where(UserHobbyLink.user_id == job.target_id)
+    return session.execute(statement).rowcount  # type: ignore
+
+
+def run_deletion_job(bind: Engine | Connection, job_id: UUID, batch_size: int | None = None, pause: float | None = None):
+    """Purge a soft-deleted user's or hobby's links in batches, then the row
+
+    Each batch commits on its own and records progress on the job, so locks
+    are short-lived and an interrupted job can be resumed from where it
+    stopped. Does nothing if the job is done or another process is running
+    it.
+    """
+    batch_size = batch_size or settings.DELETE_BATCH_SIZE
+    pause = settings.DELETE_BATCH_PAUSE if pause is None else pause
+    lease = timedelta(seconds=settings.DELETE_JOB_LEASE)
+
+    with Session(bind) as session:
+        job = crud.claim_deletion_job(session, job_id, utcnow() - lease)
+        if job is None:
+            return
+
+        try:
+            while True:
+                deleted = _delete_link_batch(session, job, batch_size)
+                job.links_deleted += deleted
+                job.updated_at = utcnow()
+                session.add(job)
+                session.commit()
+                logger.info("deletion job %s: %d/%d links deleted",
+                            job.id, job.links_deleted, job.links_total)
+                if deleted < batch_size:
+                    break
+                time.sleep(pause)
+
+            model = TARGET_MODELS[job.target_table]
+            session.execute(delete(model).where(
+                model.id == job.target_id))  # type: ignore
+            job.status = "done"
+            job.updated_at = utcnow()
+            session.add(job)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.exception("deletion job %s failed", job_id)
+            job.status = "failed"
+            job.error = str(e)
+            job.updated_at = utcnow()
+            session.add(job)
+            session.commit()
@@ -0,0 +1,150 @@
+import logging
+import threading
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session
+from uuid import UUID
+
+from app import crud
+from app.db.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+LinkKey = tuple[UUID, UUID]
+
+
+class RatingBuffer:
+    """Write-behind buffer for rating-only link updates
+
+    `put` records a rating in memory and returns at once; repeated ratings
+    for the same (user_id, hobby_id) link replace each other, so only the
+    latest is written. Pending ratings go to the database in one batched
+    UPDATE every `interval` seconds, or as soon as `max_pending` links are
+    waiting.
+
+    Durability: a rating is durable once a flush has committed it. `stop`
+    flushes whatever is left, so a graceful shutdown loses nothing, but a
+    crashed or killed process loses up to `interval` seconds of ratings. A
+    failed flush keeps its ratings (unless newer ones arrived) for the next
+    attempt. Only this process sees pending ratings; other workers read the
+    last flushed value.
+
+    Writers that update a link themselves take its rating with `pop`, which
+    also waits out a flush already writing that link. A buffered rating
+    therefore never lands after, and overwrites, a synchronous write.
+    """
+
+    def __init__(self, interval: float = 1.0, max_pending: int = 1000, bind: Engine | Connection | None = None):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.bind = bind
+        self._pending: dict[LinkKey, int | None] = {}
+        # The batch being flushed, and those of its links popped meanwhile
+        self._in_flight: dict[LinkKey, int | None] = {}
+        self._superseded: set[LinkKey] = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self.accepted = 0
+        self.flushes = 0
+        self.flushed = 0
+        self.failures = 0
+
+    def put(self, user_id: UUID, hobby_id: UUID, rating: int | None):
+        with self._lock:
+            self._pending[(user_id, hobby_id)] = rating
+            self.accepted += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def get(self, user_id: UUID, hobby_id: UUID) -> tuple[bool, int | None]:
+        """Whether a rating is pending for the link, and what it is"""
+        with self._lock:
+            key = (user_id, hobby_id)
+            return key in self._pending, self._pending.get(key)
+
+    def pop(self, user_id: UUID, hobby_id: UUID) -> tuple[bool, int | None]:
+        """Take a link's pending rating, for writers that apply it themselves
+
+        A rating that is being flushed counts as pending too. The pop then
+        waits until that flush has committed, so it can't be written after
+        the caller's update, and a failed flush won't put it back.
+        """
+        key = (user_id, hobby_id)
+        with self._lock:
+            in_flight = key in self._in_flight
+            if in_flight:
+                self._superseded.add(key)
+            pending = key in self._pending or in_flight
+            rating = self._pending.pop(key, self._in_flight.get(key))
+        if in_flight:
+            with self._flush_lock:
+                pass
+        return pending, rating
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Write every pending rating now; returns the number of links updated"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._in_flight = batch
+            if not batch:
+                return 0
+            try:
+                with Session(self.bind or get_engine()) as session:
+                    updated = crud.update_user_hobby_ratings(session, batch)
+            except Exception:
+                self.failures += 1
+                with self._lock:
+                    # Anything rated since the batch was taken is newer, and
+                    # popped links have been written by their writers
+                    retry = {key: rating for key, rating in batch.items()
+                             if key not in self._superseded}
+                    self._pending = {**retry, **self._pending}
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight = {}
+                    self._superseded = set()
+            self.flushes += 1
+            self.flushed += updated
+            return updated
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("rating flush failed; will retry")
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="rating-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flusher thread and write out anything still pending"""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "accepted": self.accepted,
+            "flushes": self.flushes,
+            "flushed": self.flushed,
+            "failures": self.failures,
+        }
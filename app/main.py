@@ -1,10 +1,122 @@
+import logging
+from contextlib import asynccontextmanager
+from datetime import timedelta
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlmodel import Session
 
-from app.routers import users, hobbies, user_hobbies
+from app.core.admission import AdmissionMiddleware, make_admission_controller, make_rate_limiter
+from app.core.coalescing import CoalescingMiddleware, RequestCoalescer
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.draining import install_drain_handler
+from app.core.responses import FastJSONResponse
+from app.db.database import dispose_engine, get_engine
+from app.events import EventDispatcher, UserEventHub, apply_to_caches, restore_token_denylist
+from app.jobs import RatingBuffer
+from app.ml import get_hobby_index, get_link_graph, save_hobby_index, suggestion_cache
+from app.routers import auth, health, users, hobbies, user_hobbies, deletion_jobs, events, metrics
 
-app = FastAPI(title="Hobby Explorer", version="0.1.0")
+logger = logging.getLogger(__name__)
 
 
-app.include_router(users.router)
-app.include_router(hobbies.router)
-app.include_router(user_hobbies.router)
+def warm_up():
+    """Open a DB connection and load the hobby index and link graph ahead of
+    the first request"""
+    with Session(get_engine()) as session:
+        session.execute(text("SELECT 1"))
+        index = get_hobby_index(session)
+        links = len(get_link_graph(session)) if settings.LINK_GRAPH_ENABLED else 0
+    logger.info("warmed up with %d hobbies indexed and %d links in the graph",
+                len(index), links)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker, after any fork, so nothing below is shared with
+    # the parent process
+    dispatcher = app.state.event_dispatcher
+    # Taken before the link graph loads, so that writes other workers make
+    # meanwhile still reach it once the dispatcher starts
+    after = dispatcher.current_head() if dispatcher is not None else None
+    if dispatcher is not None:
+        restore_token_denylist()
+    if settings.WARM_UP_ON_STARTUP:
+        warm_up()
+    install_drain_handler(app, settings.DRAIN_SECONDS)
+    if app.state.rating_buffer is not None:
+        app.state.rating_buffer.start()
+    if dispatcher is not None:
+        dispatcher.start(after)
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    try:
+        # A failed final flush is raised, but only after the rest shuts down
+        if app.state.rating_buffer is not None:
+            app.state.rating_buffer.stop()
+    finally:
+        if dispatcher is not None:
+            dispatcher.stop()
+        save_hobby_index()
+        dispose_engine()
+
+
+def create_app() -> FastAPI:
+    suggestion_cache.configure(
+        maxsize=settings.SUGGESTION_CACHE_SIZE,
+        ttl=settings.SUGGESTION_CACHE_TTL,
+        refresh_ahead=settings.SUGGESTION_CACHE_REFRESH_AHEAD,
+    )
+
+    app = FastAPI(title="Hobby Explorer", version="0.1.0", lifespan=lifespan,
+                  default_response_class=FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse)
+    app.state.ready = False
+    app.state.draining = False
+    app.state.admission_controller = make_admission_controller()
+    app.state.request_coalescer = RequestCoalescer(
+        max_wait=settings.COALESCE_MAX_WAIT)
+    app.state.rating_buffer = RatingBuffer(
+        interval=settings.WRITE_BEHIND_INTERVAL,
+        max_pending=settings.WRITE_BEHIND_MAX_PENDING,
+    ) if settings.WRITE_BEHIND_ENABLED else None
+    app.state.event_dispatcher = app.state.user_event_hub = None
+    if settings.OUTBOX_DISPATCHER_ENABLED:
+        app.state.event_dispatcher = EventDispatcher(
+            batch_size=settings.OUTBOX_BATCH_SIZE,
+            poll_interval=settings.OUTBOX_POLL_INTERVAL,
+            retention=timedelta(seconds=settings.OUTBOX_RETENTION),
+        )
+        # Keeps this worker's caches in step with writes made by the others
+        app.state.event_dispatcher.subscribe(apply_to_caches)
+        # After the caches, so user streams read refreshed suggestions
+        app.state.user_event_hub = UserEventHub(app.state.event_dispatcher)
+
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware,
+                           minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+    if settings.COALESCE_ENABLED:
+        app.add_middleware(CoalescingMiddleware,
+                           coalescer=app.state.request_coalescer)
+
+    # Added last so it runs first, before any work is done for shed requests
+    if settings.ADMISSION_CONTROL_ENABLED:
+        app.add_middleware(AdmissionMiddleware, controller=app.state.admission_controller,
+                           limiter=make_rate_limiter())
+
+    app.include_router(auth.router)
+    app.include_router(users.router)
+    app.include_router(hobbies.router)
+    app.include_router(user_hobbies.router)
+    app.include_router(deletion_jobs.router)
+    app.include_router(events.router)
+    app.include_router(metrics.router)
+    app.include_router(health.router)
+    return app
+
+
+# For `fastapi dev app/main.py`; `python -m app.server` runs workers that
+# each call the factory instead
+app = create_app()
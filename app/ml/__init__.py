@@ -0,0 +1,4 @@
+from .hobby_index import *
+from .suggestions import *
+from .suggestion_cache import *
+from .link_graph import *
@@ -0,0 +1,44 @@
+import argparse
+import json
+import sys
+
+from sqlmodel import select
+
+from app.db.database import get_session
+from app.ml.hobby_index import HobbyIndex
+from app.models import Hobby, UserHobbyLink
+from .helpers import LinkRow, evaluate, split_links
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m app.ml.evaluate",
+        description="Offline evaluation of hobby suggestions")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    session = next(get_session())
+    index = HobbyIndex.build(session.exec(select(Hobby)))
+
+    statement = select(UserHobbyLink.user_id, UserHobbyLink.hobby_id,
+                       UserHobbyLink.interested, UserHobbyLink.rating)
+    rows = session.execute(statement.execution_options(yield_per=10_000))
+    splits = split_links((LinkRow(*row) for row in rows),
+                         args.holdout, args.seed)
+
+    report = evaluate(index, splits, args.k)
+    report.update({"split": "random", "holdout": args.holdout,
+                   "seed": args.seed})
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+main()
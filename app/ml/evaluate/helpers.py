@@ -0,0 +1,119 @@
+import math
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Iterable, NamedTuple
+from uuid import UUID
+
+from app.ml.hobby_index import HobbyIndex
+from app.ml.suggestions import interest_weight, rank_hobby_ids
+
+
+class LinkRow(NamedTuple):
+    user_id: UUID
+    hobby_id: UUID
+    interested: bool
+    rating: int | None
+
+
+class UserSplit(NamedTuple):
+    liked: dict[UUID, float]
+    seen: set[UUID]
+    held_out: set[UUID]
+
+
+def split_links(links: Iterable[LinkRow], holdout: float = 0.2, seed: int = 0) -> dict[UUID, UserSplit]:
+    """Random per-user holdout of interested links
+
+    Each user with at least two interests keeps at least one for training and
+    holds out roughly `holdout` of the rest. Users with fewer interests, and
+    all non-interested links, stay in training only.
+    """
+    by_user: dict[UUID, list[LinkRow]] = defaultdict(list)
+    for link in links:
+        by_user[link.user_id].append(link)
+
+    rng = random.Random(seed)
+    splits = {}
+    for user_id in sorted(by_user):
+        user_links = by_user[user_id]
+        interests = sorted((l for l in user_links if l.interested),
+                           key=lambda l: l.hobby_id)
+        rng.shuffle(interests)
+
+        n_held = 0
+        if len(interests) >= 2:
+            n_held = min(len(interests) - 1,
+                         max(1, round(len(interests) * holdout)))
+        held_out = {l.hobby_id for l in interests[:n_held]}
+
+        liked = {l.hobby_id: interest_weight(l.rating)
+                 for l in interests[n_held:]}
+        seen = {l.hobby_id for l in user_links} - held_out
+        splits[user_id] = UserSplit(liked, seen, held_out)
+    return splits
+
+
+def recall_at_k(ranked: list[UUID], relevant: set[UUID], k: int) -> float:
+    hits = sum(1 for hobby_id in ranked[:k] if hobby_id in relevant)
+    return hits / min(len(relevant), k)
+
+
+def ndcg_at_k(ranked: list[UUID], relevant: set[UUID], k: int) -> float:
+    dcg = sum(1 / math.log2(rank + 2)
+              for rank, hobby_id in enumerate(ranked[:k]) if hobby_id in relevant)
+    ideal = sum(1 / math.log2(rank + 2)
+                for rank in range(min(len(relevant), k)))
+    return dcg / ideal
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1,
+                math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[max(index, 0)]
+
+
+def evaluate(index: HobbyIndex, splits: dict[UUID, UserSplit], k: int = 10) -> dict:
+    """Score every user with held-out interests and summarise quality and speed"""
+    recalls: list[float] = []
+    ndcgs: list[float] = []
+    latencies: list[float] = []
+    recommended: set[UUID] = set()
+
+    batch_start = time.perf_counter()
+    for split in splits.values():
+        if not split.held_out:
+            continue
+        start = time.perf_counter()
+        ranked = rank_hobby_ids(index, split.liked, split.seen, k)
+        latencies.append(time.perf_counter() - start)
+
+        recommended.update(ranked)
+        recalls.append(recall_at_k(ranked, split.held_out, k))
+        ndcgs.append(ndcg_at_k(ranked, split.held_out, k))
+    batch_seconds = time.perf_counter() - batch_start
+
+    latencies.sort()
+    latency_ms = {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    if latencies:
+        latency_ms = {
+            "p50": _percentile(latencies, 50) * 1000,
+            "p95": _percentile(latencies, 95) * 1000,
+            "p99": _percentile(latencies, 99) * 1000,
+            "max": latencies[-1] * 1000,
+        }
+
+    return {
+        "k": k,
+        "users_evaluated": len(recalls),
+        "catalogue_size": len(index),
+        f"recall@{k}": statistics.fmean(recalls) if recalls else 0.0,
+        f"ndcg@{k}": statistics.fmean(ndcgs) if ndcgs else 0.0,
+        "coverage": len(recommended) / len(index) if len(index) else 0.0,
+        "latency": {
+            "per_query_ms": latency_ms,
+            "batch_seconds": batch_seconds,
+            "queries_per_second": len(latencies) / batch_seconds if batch_seconds else 0.0,
+        },
+    }
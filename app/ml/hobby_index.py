@@ -0,0 +1,217 @@
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Iterable
+from uuid import UUID
+
+from app.models import Hobby
+
+INDEX_FORMAT_VERSION = 1
+
+# Shared across instances so a rebuilt index never reuses a version number
+_model_versions = itertools.count(1)
+
+# Names are short but carry most of the meaning, so they count twice
+NAME_WEIGHT = 2
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset({
+    "a", "an", "and", "as", "at", "by", "for", "from", "in", "into", "is",
+    "it", "of", "on", "or", "the", "their", "to", "with",
+})
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Split text into lowercase unigrams and adjacent-word bigrams"""
+    if not text:
+        return []
+    words = [w for w in TOKEN_RE.findall(text.lower()) if w not in STOP_WORDS]
+    bigrams = [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return words + bigrams
+
+
+def hobby_terms(name: str, description: str | None) -> Counter[str]:
+    terms = Counter(tokenize(description))
+    for term in tokenize(name):
+        terms[term] += NAME_WEIGHT
+    return terms
+
+
+class HobbyIndex:
+    """Sparse TF-IDF index over hobby names and descriptions
+
+    Raw term frequencies are stored per hobby along with an inverted index of
+    postings, so adding or removing a hobby only touches its own terms. IDF
+    weights and document norms are derived lazily on the next query.
+
+    `version` changes on every mutation, so results computed from the index
+    can be cached against it. Request threads mutate and query the same
+    index, so both hold `_lock`.
+    """
+
+    def __init__(self):
+        self.version = next(_model_versions)
+        self._docs: dict[UUID, Counter[str]] = {}
+        self._postings: dict[str, dict[UUID, int]] = {}
+        self._norms: dict[UUID, float] = {}
+        self._norms_dirty = False
+        self._centroid: dict[str, float] | None = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, hobby_id: UUID) -> bool:
+        return hobby_id in self._docs
+
+    def hobby_ids(self) -> set[UUID]:
+        with self._lock:
+            return set(self._docs)
+
+    @classmethod
+    def build(cls, hobbies: Iterable[Hobby]) -> "HobbyIndex":
+        index = cls()
+        for hobby in hobbies:
+            index._add_terms(hobby.id, hobby_terms(
+                hobby.name, hobby.description))
+        return index
+
+    def add_hobby(self, hobby: Hobby):
+        self.add(hobby.id, hobby.name, hobby.description)
+
+    def add(self, hobby_id: UUID, name: str, description: str | None):
+        terms = hobby_terms(name, description)
+        with self._lock:
+            if hobby_id in self._docs:
+                self.remove(hobby_id)
+            self._add_terms(hobby_id, terms)
+
+    def remove(self, hobby_id: UUID):
+        with self._lock:
+            terms = self._docs.pop(hobby_id, None)
+            if terms is None:
+                return
+            for term in terms:
+                postings = self._postings[term]
+                del postings[hobby_id]
+                if not postings:
+                    del self._postings[term]
+            self._norms.pop(hobby_id, None)
+            self._changed()
+
+    def _add_terms(self, hobby_id: UUID, terms: Counter[str]):
+        with self._lock:
+            self._docs[hobby_id] = terms
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[hobby_id] = tf
+            self._changed()
+
+    def _changed(self):
+        self._norms_dirty = True
+        self._centroid = None
+        self.version = next(_model_versions)
+
+    def idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log((1 + len(self._docs)) / (1 + df)) + 1
+
+    def _refresh_norms(self):
+        if not self._norms_dirty:
+            return
+        squares = dict.fromkeys(self._docs, 0.0)
+        for term, postings in self._postings.items():
+            idf_sq = self.idf(term) ** 2
+            for hobby_id, tf in postings.items():
+                squares[hobby_id] += tf * tf * idf_sq
+        self._norms = {hobby_id: math.sqrt(sq)
+                       for hobby_id, sq in squares.items()}
+        self._norms_dirty = False
+
+    def vector(self, hobby_id: UUID) -> dict[str, float]:
+        """Unit-length TF-IDF vector for one indexed hobby"""
+        with self._lock:
+            self._refresh_norms()
+            norm = self._norms.get(hobby_id)
+            if not norm:
+                return {}
+            return {term: tf * self.idf(term) / norm
+                    for term, tf in self._docs[hobby_id].items()}
+
+    def query_vector(self, weighted_ids: dict[UUID, float]) -> dict[str, float]:
+        """Weighted sum of the unit vectors of several hobbies"""
+        query: dict[str, float] = {}
+        with self._lock:
+            for hobby_id, weight in weighted_ids.items():
+                for term, value in self.vector(hobby_id).items():
+                    query[term] = query.get(term, 0.0) + weight * value
+        return query
+
+    def score(self, query: dict[str, float], limit: int, exclude: Iterable[UUID] = ()) -> list[tuple[UUID, float]]:
+        """Top hobbies by cosine similarity to a sparse query vector"""
+        excluded = set(exclude)
+        scores: dict[UUID, float] = {}
+        with self._lock:
+            self._refresh_norms()
+            for term, q_weight in query.items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                term_weight = q_weight * self.idf(term)
+                for hobby_id, tf in postings.items():
+                    scores[hobby_id] = scores.get(hobby_id, 0.0) + term_weight * tf
+            ranked = [(score / self._norms[hobby_id], hobby_id)
+                      for hobby_id, score in scores.items()
+                      if hobby_id not in excluded and score > 0]
+        return [(hobby_id, score)
+                for score, hobby_id in heapq.nlargest(limit, ranked)]
+
+    def similar(self, hobby_ids: Iterable[UUID] | dict[UUID, float], limit: int = 10, exclude: Iterable[UUID] = ()) -> list[tuple[UUID, float]]:
+        """Hobbies most similar to the given ones, which are never returned"""
+        if not isinstance(hobby_ids, dict):
+            hobby_ids = dict.fromkeys(hobby_ids, 1.0)
+        excluded = set(exclude) | set(hobby_ids)
+        with self._lock:
+            return self.score(self.query_vector(hobby_ids), limit, excluded)
+
+    def cold_start(self, limit: int = 10, exclude: Iterable[UUID] = ()) -> list[tuple[UUID, float]]:
+        """Most representative hobbies, for users with nothing to go on"""
+        with self._lock:
+            # Sums every document, so it is kept until the index changes
+            if self._centroid is None:
+                self._centroid = self.query_vector(dict.fromkeys(self._docs, 1.0))
+            return self.score(self._centroid, limit, exclude)
+
+    def save(self, path: str):
+        """Atomically write raw term frequencies to disk as JSON"""
+        with self._lock:
+            docs = {str(hobby_id): terms for hobby_id, terms in self._docs.items()}
+        data = {"version": INDEX_FORMAT_VERSION, "docs": docs}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Per process, as several workers may save at once
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "HobbyIndex | None":
+        """Read an index written by `save`, or None if missing or outdated"""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_FORMAT_VERSION:
+            return None
+
+        index = cls()
+        for hobby_id, terms in data["docs"].items():
+            index._add_terms(UUID(hobby_id), Counter(terms))
+        return index
@@ -0,0 +1,362 @@
+import threading
+from array import array
+from typing import Iterable, NamedTuple
+from uuid import UUID
+
+from sqlmodel import Session, select
+
+from app.models import UserHobbyLink
+
+# Sentinel for a NULL rating in the int16 ratings array
+NO_RATING = -32768
+
+# Pending edits are folded into the CSR arrays, on a thread of their own,
+# once they outnumber this fraction of base edges (or the floor, for small
+# graphs)
+COMPACT_FRACTION = 0.125
+COMPACT_MIN_EDITS = 1024
+
+
+class Edge(NamedTuple):
+    user_id: UUID
+    hobby_id: UUID
+    interested: bool
+    rating: int | None
+
+
+def _stored_rating(rating: int | None) -> int:
+    """A rating as the int16 array holds it, clamped if it can't hold it"""
+    if rating is None:
+        return NO_RATING
+    return min(max(rating, NO_RATING + 1), 32767)
+
+
+class IdMap:
+    """Dense int32 surrogate ids for UUIDs, assigned in first-seen order"""
+
+    def __init__(self):
+        self._ids: dict[UUID, int] = {}
+        self._uuids: list[UUID] = []
+
+    def __len__(self) -> int:
+        return len(self._uuids)
+
+    def get(self, key: UUID) -> int | None:
+        return self._ids.get(key)
+
+    def intern(self, key: UUID) -> int:
+        surrogate = self._ids.get(key)
+        if surrogate is None:
+            surrogate = len(self._uuids)
+            self._ids[key] = surrogate
+            self._uuids.append(key)
+        return surrogate
+
+    def uuid(self, surrogate: int) -> UUID:
+        return self._uuids[surrogate]
+
+
+def _counting_sort(keys: array, n_keys: int) -> tuple[array, array]:
+    """CSR row pointers and a stable permutation grouping `keys` by value"""
+    indptr = array("q", bytes(8 * (n_keys + 1)))
+    for key in keys:
+        indptr[key + 1] += 1
+    for i in range(n_keys):
+        indptr[i + 1] += indptr[i]
+
+    cursor = array("q", indptr[:-1])
+    order = array("q", bytes(8 * len(keys)))
+    for position, key in enumerate(keys):
+        order[cursor[key]] = position
+        cursor[key] += 1
+    return indptr, order
+
+
+class LinkGraph:
+    """In-memory user-hobby graph stored as CSR arrays in both directions
+
+    Edges are kept user-major in parallel typed arrays (hobby id, rating,
+    interested flag). The hobby-major side stores user ids plus each edge's
+    position in the user-major arrays, so edge attributes are stored once.
+    That comes to 15 bytes per edge, excluding the per-node index pointers
+    and UUID maps.
+
+    The CSR arrays are immutable; writes go to a small overlay of pending
+    edits that is merged in by `compact`, in the background once it grows
+    large. Compaction builds the new arrays outside `_lock`, so reads and
+    writes carry on meanwhile; edits made in the meantime stay pending.
+    """
+
+    def __init__(self):
+        self.users = IdMap()
+        self.hobbies = IdMap()
+
+        self._user_indptr = array("q", [0])
+        self._user_hobbies = array("i")
+        self._ratings = array("h")
+        self._interested = array("B")
+
+        self._hobby_indptr = array("q", [0])
+        self._hobby_users = array("i")
+        self._hobby_edges = array("i")
+
+        # (user, hobby) -> (interested, rating), or None for a deleted edge
+        self._edits: dict[tuple[int, int], tuple[bool, int | None] | None] = {}
+        self._edited_by_user: dict[int, set[int]] = {}
+        self._edited_by_hobby: dict[int, set[int]] = {}
+
+        self._lock = threading.RLock()
+        self._compactor: threading.Thread | None = None
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[Edge]) -> "LinkGraph":
+        """Build from a stream of edges without materialising Python rows"""
+        graph = cls()
+        users, hobbies = array("i"), array("i")
+        ratings, interested = array("h"), array("B")
+        for edge in edges:
+            users.append(graph.users.intern(edge.user_id))
+            hobbies.append(graph.hobbies.intern(edge.hobby_id))
+            ratings.append(_stored_rating(edge.rating))
+            interested.append(edge.interested)
+        graph._install(graph._build(users, hobbies, ratings, interested,
+                                    len(graph.users), len(graph.hobbies)), {})
+        return graph
+
+    @classmethod
+    def load(cls, session: Session, batch_size: int = 10_000) -> "LinkGraph":
+        statement = select(UserHobbyLink.user_id, UserHobbyLink.hobby_id,
+                           UserHobbyLink.interested, UserHobbyLink.rating)
+        rows = session.execute(
+            statement.execution_options(yield_per=batch_size))
+        return cls.from_edges(Edge(*row) for row in rows)
+
+    @staticmethod
+    def _build(users: array, hobbies: array, ratings: array, interested: array, n_users: int, n_hobbies: int) -> tuple[array, ...]:
+        user_indptr, by_user = _counting_sort(users, n_users)
+        user_hobbies = array("i", (hobbies[i] for i in by_user))
+        user_ratings = array("h", (ratings[i] for i in by_user))
+        user_interested = array("B", (interested[i] for i in by_user))
+
+        hobby_indptr, by_hobby = _counting_sort(user_hobbies, n_hobbies)
+        user_of_edge = array("i", bytes(4 * len(user_hobbies)))
+        for user in range(len(user_indptr) - 1):
+            for edge in range(user_indptr[user], user_indptr[user + 1]):
+                user_of_edge[edge] = user
+        hobby_users = array("i", (user_of_edge[i] for i in by_hobby))
+        return (user_indptr, user_hobbies, user_ratings, user_interested,
+                hobby_indptr, hobby_users, array("i", by_hobby))
+
+    def _install(self, arrays: tuple[array, ...], edits: dict[tuple[int, int], tuple[bool, int | None] | None]):
+        (self._user_indptr, self._user_hobbies, self._ratings, self._interested,
+         self._hobby_indptr, self._hobby_users, self._hobby_edges) = arrays
+        self._edits = edits
+        self._edited_by_user = {}
+        self._edited_by_hobby = {}
+        for user, hobby in edits:
+            self._edited_by_user.setdefault(user, set()).add(hobby)
+            self._edited_by_hobby.setdefault(hobby, set()).add(user)
+
+    def __len__(self) -> int:
+        """Number of live edges"""
+        with self._lock:
+            count = len(self._user_hobbies)
+            for (user, hobby), edit in self._edits.items():
+                in_base = self._base_edge(user, hobby) is not None
+                count += (edit is not None) - in_base
+            return count
+
+    def nbytes(self) -> int:
+        """Bytes held by the CSR arrays"""
+        arrays = (self._user_indptr, self._user_hobbies, self._ratings,
+                  self._interested, self._hobby_indptr, self._hobby_users,
+                  self._hobby_edges)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+    def _base_edge(self, user: int, hobby: int) -> int | None:
+        if user + 1 >= len(self._user_indptr):
+            return None
+        start, end = self._user_indptr[user], self._user_indptr[user + 1]
+        for edge in range(start, end):
+            if self._user_hobbies[edge] == hobby:
+                return edge
+        return None
+
+    def _edge_attrs(self, edge: int) -> tuple[bool, int | None]:
+        rating = self._ratings[edge]
+        return bool(self._interested[edge]), None if rating == NO_RATING else rating
+
+    def _edit(self, user: int, hobby: int, value: tuple[bool, int | None] | None):
+        self._edits[(user, hobby)] = value
+        self._edited_by_user.setdefault(user, set()).add(hobby)
+        self._edited_by_hobby.setdefault(hobby, set()).add(user)
+        if (self._compactor is None and len(self._edits)
+                > max(COMPACT_MIN_EDITS, COMPACT_FRACTION * len(self._user_hobbies))):
+            # O(edges), so kept off the writer's request
+            self._compactor = threading.Thread(
+                target=self.compact, name="link-graph-compact", daemon=True)
+            self._compactor.start()
+
+    def upsert(self, user_id: UUID, hobby_id: UUID, interested: bool, rating: int | None):
+        with self._lock:
+            self._edit(self.users.intern(user_id), self.hobbies.intern(hobby_id),
+                       (interested, rating))
+
+    def remove(self, user_id: UUID, hobby_id: UUID):
+        with self._lock:
+            user, hobby = self.users.get(user_id), self.hobbies.get(hobby_id)
+            if user is not None and hobby is not None:
+                self._edit(user, hobby, None)
+
+    def remove_user(self, user_id: UUID):
+        with self._lock:
+            for hobby_id, _, _ in self.hobbies_of(user_id):
+                self.remove(user_id, hobby_id)
+
+    def remove_hobby(self, hobby_id: UUID):
+        with self._lock:
+            for user_id, _, _ in self.users_of(hobby_id):
+                self.remove(user_id, hobby_id)
+
+    def _user_edges(self, user: int) -> dict[int, tuple[bool, int | None]]:
+        edges = {}
+        if user + 1 < len(self._user_indptr):
+            for edge in range(self._user_indptr[user], self._user_indptr[user + 1]):
+                edges[self._user_hobbies[edge]] = self._edge_attrs(edge)
+        for hobby in self._edited_by_user.get(user, ()):
+            edit = self._edits[(user, hobby)]
+            if edit is None:
+                edges.pop(hobby, None)
+            else:
+                edges[hobby] = edit
+        return edges
+
+    def _hobby_edges_of(self, hobby: int) -> dict[int, tuple[bool, int | None]]:
+        edges = {}
+        if hobby + 1 < len(self._hobby_indptr):
+            for i in range(self._hobby_indptr[hobby], self._hobby_indptr[hobby + 1]):
+                edges[self._hobby_users[i]] = self._edge_attrs(
+                    self._hobby_edges[i])
+        for user in self._edited_by_hobby.get(hobby, ()):
+            edit = self._edits[(user, hobby)]
+            if edit is None:
+                edges.pop(user, None)
+            else:
+                edges[user] = edit
+        return edges
+
+    def hobbies_of(self, user_id: UUID) -> list[tuple[UUID, bool, int | None]]:
+        """(hobby_id, interested, rating) for each of a user's links"""
+        with self._lock:
+            user = self.users.get(user_id)
+            if user is None:
+                return []
+            return [(self.hobbies.uuid(hobby), interested, rating)
+                    for hobby, (interested, rating) in self._user_edges(user).items()]
+
+    def users_of(self, hobby_id: UUID) -> list[tuple[UUID, bool, int | None]]:
+        """(user_id, interested, rating) for each user linked to a hobby"""
+        with self._lock:
+            hobby = self.hobbies.get(hobby_id)
+            if hobby is None:
+                return []
+            return [(self.users.uuid(user), interested, rating)
+                    for user, (interested, rating) in self._hobby_edges_of(hobby).items()]
+
+    def compact(self):
+        """Fold pending edits into fresh CSR arrays"""
+        try:
+            self._compact()
+        finally:
+            self._compactor = None
+
+    def _compact(self):
+        # The arrays are only ever replaced, never changed in place, so a
+        # snapshot of them and of the edits can be merged without the lock
+        with self._lock:
+            user_indptr, user_hobbies = self._user_indptr, self._user_hobbies
+            base_ratings, base_interested = self._ratings, self._interested
+            edits = dict(self._edits)
+            n_users, n_hobbies = len(self.users), len(self.hobbies)
+
+        users, hobbies = array("i"), array("i")
+        ratings, interested = array("h"), array("B")
+
+        def append(user: int, hobby: int, attrs: tuple[bool, int | None]):
+            users.append(user)
+            hobbies.append(hobby)
+            ratings.append(_stored_rating(attrs[1]))
+            interested.append(attrs[0])
+
+        for user in range(len(user_indptr) - 1):
+            for edge in range(user_indptr[user], user_indptr[user + 1]):
+                hobby = user_hobbies[edge]
+                if (user, hobby) not in edits:
+                    rating = base_ratings[edge]
+                    append(user, hobby, (bool(base_interested[edge]),
+                                         None if rating == NO_RATING else rating))
+        for (user, hobby), edit in edits.items():
+            if edit is not None:
+                append(user, hobby, edit)
+        arrays = self._build(users, hobbies, ratings, interested, n_users, n_hobbies)
+
+        with self._lock:
+            # Edits made while building are not in the new arrays yet
+            newer = {key: edit for key, edit in self._edits.items()
+                     if key not in edits or edits[key] is not edit}
+            self._install(arrays, newer)
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            edges = len(self._user_hobbies)
+            return {
+                "users": len(self.users),
+                "hobbies": len(self.hobbies),
+                "edges": edges,
+                "pending_edits": len(self._edits),
+                "csr_bytes": self.nbytes(),
+                "bytes_per_edge": self.nbytes() / edges if edges else 0.0,
+            }
+
+
+_link_graph: LinkGraph | None = None
+
+
+def get_link_graph(session: Session) -> LinkGraph:
+    """Process-wide link graph, streamed from the database on first use"""
+    global _link_graph
+    if _link_graph is None:
+        _link_graph = LinkGraph.load(session)
+    return _link_graph
+
+
+def peek_link_graph() -> LinkGraph | None:
+    return _link_graph
+
+
+def reset_link_graph():
+    global _link_graph
+    _link_graph = None
+
+
+# Write hooks for crud; nothing to patch until the graph is first loaded
+
+def graph_upsert_link(link: UserHobbyLink):
+    if _link_graph is not None:
+        _link_graph.upsert(link.user_id, link.hobby_id,
+                           link.interested, link.rating)
+
+
+def graph_remove_link(user_id: UUID, hobby_id: UUID):
+    if _link_graph is not None:
+        _link_graph.remove(user_id, hobby_id)
+
+
+def graph_remove_user(user_id: UUID):
+    if _link_graph is not None:
+        _link_graph.remove_user(user_id)
+
+
+def graph_remove_hobby(hobby_id: UUID):
+    if _link_graph is not None:
+        _link_graph.remove_hobby(hobby_id)
@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+from uuid import UUID
+
+# Invalidations remembered for computes still in flight, at the least
+_MIN_INVALIDATIONS_KEPT = 1024
+
+
+@dataclass
+class _Entry:
+    model_version: int
+    limit: int
+    hobby_ids: list[UUID]
+    expires_at: float
+
+
+class SuggestionCache:
+    """LRU cache of suggested hobby ids per user
+
+    Entries are tagged with the model version they were computed against, so
+    any change to the model makes them stale without a sweep. Link writes for
+    a user drop that user's entry via `invalidate`.
+
+    A result computed before an invalidation may only arrive after it, so
+    computes take a `generation()` first and `put` drops results whose
+    user has been invalidated since. Only the newest invalidations are
+    remembered; a result older than the ones forgotten is dropped too.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, refresh_ahead: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._entries: OrderedDict[UUID, _Entry] = OrderedDict()
+        self._generation = 0
+        self._invalidated: OrderedDict[UUID, int] = OrderedDict()
+        self._forgotten = 0
+        self._lock = threading.Lock()
+        self.configure(maxsize, ttl, refresh_ahead)
+        self._reset_stats()
+
+    def configure(self, maxsize: int, ttl: float, refresh_ahead: float = 0.0):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self.refresh_ahead = refresh_ahead
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def _reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+        self.recomputes = 0
+        self.recompute_seconds = 0.0
+        self.recompute_max_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: UUID, model_version: int, limit: int) -> list[UUID] | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if (entry is None or entry.model_version != model_version
+                    or entry.limit < limit or entry.expires_at <= self._clock()):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry.hobby_ids[:limit]
+
+    def generation(self) -> int:
+        """Taken before computing a result, and passed on to `put`"""
+        return self._generation
+
+    def put(self, user_id: UUID, model_version: int, limit: int, hobby_ids: list[UUID], generation: int | None = None):
+        entry = _Entry(model_version, limit, hobby_ids,
+                       self._clock() + self.ttl)
+        with self._lock:
+            if generation is not None and (
+                    self._forgotten > generation
+                    or self._invalidated.get(user_id, 0) > generation):
+                self.stale_puts += 1
+                return
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, user_id: UUID, model_version: int, limit: int, compute: Callable[[], list[UUID]]) -> list[UUID]:
+        hobby_ids = self.get(user_id, model_version, limit)
+        if hobby_ids is not None:
+            return hobby_ids
+
+        generation = self.generation()
+        start = time.perf_counter()
+        hobby_ids = compute()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.recomputes += 1
+            self.recompute_seconds += elapsed
+            self.recompute_max_seconds = max(
+                self.recompute_max_seconds, elapsed)
+
+        self.put(user_id, model_version, limit, hobby_ids, generation)
+        return hobby_ids
+
+    def needs_refresh(self, user_id: UUID) -> bool:
+        """Whether a live entry is close enough to expiry to refresh early"""
+        if self.refresh_ahead <= 0:
+            return False
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return False
+        remaining = entry.expires_at - self._clock()
+        return 0 < remaining <= self.refresh_ahead
+
+    def invalidate(self, user_id: UUID):
+        with self._lock:
+            self._generation += 1
+            self._invalidated[user_id] = self._generation
+            self._invalidated.move_to_end(user_id)
+            while len(self._invalidated) > max(self.maxsize, _MIN_INVALIDATIONS_KEPT):
+                _, self._forgotten = self._invalidated.popitem(last=False)
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._reset_stats()
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+            "recomputes": self.recomputes,
+            "recompute_avg_seconds": self.recompute_seconds / self.recomputes if self.recomputes else 0.0,
+            "recompute_max_seconds": self.recompute_max_seconds,
+        }
+
+
+# Holds nothing until configured by the app factory, which sizes it from settings
+suggestion_cache = SuggestionCache(maxsize=0, ttl=0.0)
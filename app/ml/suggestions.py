@@ -0,0 +1,120 @@
+from sqlmodel import Session, select
+from uuid import UUID
+
+from app.core.config import settings
+from app.db.database import get_engine
+from app.ml.hobby_index import HobbyIndex
+from app.ml.link_graph import peek_link_graph
+from app.ml.suggestion_cache import suggestion_cache
+from app.models import Hobby, User
+
+_hobby_index: HobbyIndex | None = None
+
+
+def sync_hobby_index(session: Session, index: HobbyIndex) -> bool:
+    """Bring an index up to date with the hobbies table, fetching only new rows"""
+    statement = select(Hobby.id).where(Hobby.deleted_at == None)  # type: ignore
+    db_ids = set(session.exec(statement).all())
+    indexed_ids = index.hobby_ids()
+
+    for hobby_id in indexed_ids - db_ids:
+        index.remove(hobby_id)
+
+    missing_ids = db_ids - indexed_ids
+    if missing_ids:
+        statement = select(Hobby).where(Hobby.id.in_(missing_ids))  # type: ignore
+        for hobby in session.exec(statement):
+            index.add_hobby(hobby)
+
+    return bool(missing_ids) or indexed_ids != db_ids
+
+
+def get_hobby_index(session: Session) -> HobbyIndex:
+    """Process-wide hobby index, loaded from disk (or built) on first use"""
+    global _hobby_index
+    if _hobby_index is None:
+        path = settings.HOBBY_INDEX_PATH
+        index = (path and HobbyIndex.load(path)) or HobbyIndex()
+        if sync_hobby_index(session, index) and path:
+            index.save(path)
+        _hobby_index = index
+    return _hobby_index
+
+
+def peek_hobby_index() -> HobbyIndex | None:
+    return _hobby_index
+
+
+def save_hobby_index():
+    if _hobby_index is not None and settings.HOBBY_INDEX_PATH:
+        _hobby_index.save(settings.HOBBY_INDEX_PATH)
+
+
+def reset_hobby_index():
+    global _hobby_index
+    _hobby_index = None
+
+
+def index_hobby(hobby: Hobby):
+    # Nothing to patch until the index is first loaded; it syncs then
+    if _hobby_index is not None:
+        _hobby_index.add_hobby(hobby)
+
+
+def unindex_hobby(hobby_id: UUID):
+    if _hobby_index is not None:
+        _hobby_index.remove(hobby_id)
+
+
+def suggest_hobby_ids(index: HobbyIndex, user: User, limit: int) -> list[UUID]:
+    """Content-based suggestions from the hobbies a user is interested in
+
+    Rated hobbies pull harder than unrated ones. Users without any interests
+    get the most representative hobbies in the catalogue instead. The links
+    come from the link graph once it is loaded, saving a query per user.
+    """
+    graph = peek_link_graph()
+    if graph is not None:
+        links = graph.hobbies_of(user.id)
+    else:
+        links = [(link.hobby_id, link.interested, link.rating)
+                 for link in user.hobby_links]
+    seen = {hobby_id for hobby_id, _, _ in links}
+    liked = {hobby_id: interest_weight(rating)
+             for hobby_id, interested, rating in links if interested}
+    return rank_hobby_ids(index, liked, seen, limit)
+
+
+def interest_weight(rating: int | None) -> float:
+    return 1.0 + (rating or 0) / 5
+
+
+def rank_hobby_ids(index: HobbyIndex, liked: dict[UUID, float], seen: set[UUID], limit: int) -> list[UUID]:
+    if liked:
+        ranked = index.similar(liked, limit, exclude=seen)
+    else:
+        ranked = index.cold_start(limit, exclude=seen)
+    return [hobby_id for hobby_id, _ in ranked]
+
+
+def get_cached_suggestion_ids(index: HobbyIndex, user: User, limit: int) -> list[UUID]:
+    return suggestion_cache.get_or_compute(
+        user.id, index.version, limit,
+        lambda: suggest_hobby_ids(index, user, limit))
+
+
+def refresh_user_suggestions(user_id: UUID, limit: int):
+    """Recompute a user's cached suggestions ahead of expiry
+
+    Users pending deletion are skipped, as they are by every other read.
+    """
+    generation = suggestion_cache.generation()
+    with Session(get_engine()) as session:
+        statement = select(User).where(
+            User.id == user_id, User.deleted_at == None)  # type: ignore
+        user = session.exec(statement).first()
+        if user is None:
+            return
+        index = get_hobby_index(session)
+        suggestion_cache.put(user_id, index.version, limit,
+                             suggest_hobby_ids(index, user, limit), generation)
@@ -1,3 +1,7 @@
+from datetime import datetime, timezone
+from pydantic import computed_field
+from sqlalchemy import BigInteger, CheckConstraint, Column, DateTime, Index, event, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import SQLModel, Field, Relationship
 from uuid import UUID, uuid4
 
@@ -17,6 +21,9 @@ class User(UserBase, table=True):
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     password_hash: str
+    # Set while a background deletion job purges the user's links
+    deleted_at: datetime | None = Field(
+        default=None, sa_type=DateTime(timezone=True))  # type: ignore
 
     hobby_links: list["UserHobbyLink"] = Relationship(
         back_populates="user", passive_deletes="all")
@@ -27,6 +34,13 @@ class UserPublic(UserBase):
     id: UUID
 
 
+class UserProfilePublic(SQLModel):
+    """Props of a User that other users may see"""
+    id: UUID
+    username: str
+    name: str
+
+
 class UserCreate(UserBase):
     """Props to receive on User creation"""
     password: str = Field(min_length=8, max_length=40)
@@ -39,6 +53,19 @@ class UserUpdate(UserBase):
     password: str | None = Field(default=None, min_length=8, max_length=40)
 
 
+class UsersBatchPublic(SQLModel):
+    """Props to return for a batch of users fetched by id"""
+    users: list[UserProfilePublic]
+    missing: list[UUID]
+
+
+class TokenPublic(SQLModel):
+    """Props to return for an issued access token"""
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+
 # Hobby models
 
 class HobbyBase(SQLModel):
@@ -52,6 +79,9 @@ class Hobby(HobbyBase, table=True):
     __tablename__ = "hobbies"
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
+    # Set while a background deletion job purges the hobby's links
+    deleted_at: datetime | None = Field(
+        default=None, sa_type=DateTime(timezone=True))  # type: ignore
 
 
 class HobbyPublic(HobbyBase):
@@ -59,6 +89,12 @@ class HobbyPublic(HobbyBase):
     id: UUID
 
 
+class HobbiesBatchPublic(SQLModel):
+    """Props to return for a batch of hobbies fetched by id"""
+    hobbies: list[HobbyPublic]
+    missing: list[UUID]
+
+
 class HobbyCreate(HobbyBase):
     """Props to receive on Hobby creation"""
     pass
@@ -77,9 +113,24 @@ class UserHobbyBase(SQLModel):
     rating: int | None = None
 
 
+# Hash partitions of user_hobbies. Changing this needs a migration that
+# repartitions the table
+USER_HOBBIES_PARTITIONS = 16
+
+
 class UserHobbyLink(UserHobbyBase, table=True):
     """DB model for userhobbylink table"""
     __tablename__ = "user_hobbies"
+    __table_args__ = (
+        # Reverse lookups and cascade deletes from hobbies; the PK only
+        # covers lookups by user. Like the PK it is partitioned, one index
+        # per partition, so lookups by hobby visit every partition
+        Index("ix_user_hobbies_hobby_id_user_id", "hobby_id", "user_id"),
+        # The bound UserHobbyCreate and UserHobbyUpdate accept
+        CheckConstraint("rating BETWEEN 0 AND 5", name="ck_user_hobbies_rating"),
+        # Queries that filter on user_id only touch one partition
+        {"postgresql_partition_by": "HASH (user_id)"},
+    )
 
     user_id: UUID = Field(foreign_key="users.id",
                           primary_key=True, ondelete="CASCADE")
@@ -90,6 +141,18 @@ class UserHobbyLink(UserHobbyBase, table=True):
     hobby: Hobby = Relationship()
 
 
+@event.listens_for(UserHobbyLink.__table__, "after_create")
+def _create_user_hobbies_partitions(table, connection, **kw):
+    # For metadata.create_all; the migrations create them for real databases
+    schema = connection.schema_for_object(table)
+    prefix = f'"{schema}".' if schema else ""
+    for remainder in range(USER_HOBBIES_PARTITIONS):
+        connection.execute(text(
+            f'CREATE TABLE {prefix}"{table.name}_p{remainder}" '
+            f'PARTITION OF {prefix}"{table.name}" FOR VALUES WITH '
+            f'(MODULUS {USER_HOBBIES_PARTITIONS}, REMAINDER {remainder})'))
+
+
 class UserHobbyPublic(UserHobbyBase):
     """Props to return for UserHobby"""
     user_id: UUID
@@ -99,11 +162,164 @@ class UserHobbyPublic(UserHobbyBase):
 class UserHobbyCreate(UserHobbyBase):
     """Props to receive on UserHobby creation"""
     hobby_id: UUID
+    rating: int | None = Field(default=None, ge=0, le=5)
 
 
 class UserHobbyUpdate(UserHobbyBase):
     """Props to receive on UserHobby update"""
-    pass
+    rating: int | None = Field(default=None, ge=0, le=5)
+
+
+class HobbyUserPublic(UserProfilePublic):
+    """Props to return for a user linked to a hobby"""
+    interested: bool
+    rating: int | None
+
+
+class HobbyUsersPage(SQLModel):
+    """Page of users linked to a hobby"""
+    users: list[HobbyUserPublic]
+    next_cursor: UUID | None
+
+
+# HobbyStats models
+
+class HobbyStatsBase(SQLModel):
+    """Shared HobbyStats props"""
+    link_count: int = 0
+    interested_count: int = 0
+    rating_count: int = 0
+    rating_sum: int = 0
+
+
+class HobbyStats(HobbyStatsBase, table=True):
+    """DB model for hobby_stats table, maintained by triggers on user_hobbies"""
+    __tablename__ = "hobby_stats"
+
+    hobby_id: UUID = Field(foreign_key="hobbies.id",
+                           primary_key=True, ondelete="CASCADE")
+    interested_count: int = Field(default=0, index=True)
+    rating_histogram: dict[str, int] = Field(
+        default_factory=dict,
+        sa_column=Column(JSONB, nullable=False, server_default=text("'{}'::jsonb")))
+
+
+class HobbyStatsPublic(HobbyStatsBase):
+    """Props to return for HobbyStats"""
+    hobby_id: UUID
+    rating_histogram: dict[int, int]
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def rating_average(self) -> float | None:
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+
+class PopularHobbyPublic(HobbyPublic):
+    """Props to return for a hobby on the popularity leaderboard"""
+    interested_count: int
+    rating_count: int
+    rating_average: float | None
+
+
+# DeletionJob models
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class DeletionJobBase(SQLModel):
+    """Shared DeletionJob props"""
+    target_table: str
+    target_id: UUID
+    status: str = "pending"
+    links_total: int = 0
+    links_deleted: int = 0
+    error: str | None = None
+    created_at: datetime = Field(
+        default_factory=utcnow, sa_type=DateTime(timezone=True))  # type: ignore
+    updated_at: datetime = Field(
+        default_factory=utcnow, sa_type=DateTime(timezone=True))  # type: ignore
+
+
+class DeletionJob(DeletionJobBase, table=True):
+    """DB model for deletion_jobs table"""
+    __tablename__ = "deletion_jobs"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    status: str = Field(default="pending", index=True)
+
+
+class DeletionJobPublic(DeletionJobBase):
+    """Props to return for DeletionJob"""
+    id: UUID
+
+
+# Outbox models
+
+class OutboxEvent(SQLModel, table=True):
+    """DB model for outbox_events table, appended to with each change it describes
+
+    `txid` is the writing transaction's id, filled in by the database.
+    Readers order events by (txid, id), see app.events.
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index("ix_outbox_events_txid_id", "txid", "id"),
+        # For streams catching one user up, see crud.read_events
+        Index("ix_outbox_events_user_id_txid_id", "user_id", "txid", "id"),
+        Index("ix_outbox_events_broadcasts", "txid", "id",
+              postgresql_where=text("type IN ('hobby.deleted')")),
+        # For workers reading back recent token revocations at startup
+        Index("ix_outbox_events_token_revocations", "created_at",
+              postgresql_where=text("type IN ('token.revoked', 'user.tokens_revoked')")),
+    )
+
+    id: int | None = Field(default=None, primary_key=True, sa_type=BigInteger)  # type: ignore
+    txid: int | None = Field(default=None, sa_column=Column(
+        BigInteger, nullable=False,
+        server_default=text("pg_current_xact_id()::text::bigint")))
+    type: str
+    user_id: UUID | None = None
+    hobby_id: UUID | None = None
+    payload: dict = Field(
+        default_factory=dict,
+        sa_column=Column(JSONB, nullable=False, server_default=text("'{}'::jsonb")))
+    created_at: datetime = Field(
+        default_factory=utcnow, sa_type=DateTime(timezone=True))  # type: ignore
+
+
+class OutboxOffset(SQLModel, table=True):
+    """DB model for outbox_offsets table: how far each named consumer has read"""
+    __tablename__ = "outbox_offsets"
+
+    consumer: str = Field(primary_key=True)
+    txid: int = Field(default=0, sa_type=BigInteger)  # type: ignore
+    event_id: int = Field(default=0, sa_type=BigInteger)  # type: ignore
+    updated_at: datetime = Field(
+        default_factory=utcnow, sa_type=DateTime(timezone=True))  # type: ignore
+
+
+# Suggestion models
+
+class HobbySuggestionsPublic(SQLModel):
+    """Props to return for hobby suggestions"""
+    user_id: UUID
+    suggestions: list[HobbyPublic]
+
+
+class SimilarHobbiesPublic(SQLModel):
+    """Props to return for hobbies similar to a hobby"""
+    hobby_id: UUID
+    similar: list[HobbyPublic]
+
+
+class UserDetailPublic(UserPublic):
+    """Props to return for User with any requested expansions"""
+    hobbies: list[HobbyPublic] | None = None
+    suggestions: list[HobbyPublic] | None = None
 
 
 def get_metadata():
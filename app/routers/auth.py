@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from typing import Annotated
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.dependencies import SessionDep, TokenClaimsDep
+from app.models import TokenPublic
+from app import crud
+
+
+router = APIRouter()
+
+
+@router.post("/token", response_model=TokenPublic)
+def login(session: SessionDep, form: Annotated[OAuth2PasswordRequestForm, Depends()]):
+    user = crud.authenticate_user(session, form.username, form.password)
+    if not user:
+        raise HTTPException(
+            status_code=401,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"})
+
+    return TokenPublic(access_token=create_access_token(user.id),
+                       expires_in=settings.ACCESS_TOKEN_TTL)
+
+
+@router.post("/logout")
+def logout(session: SessionDep, claims: TokenClaimsDep, everywhere: bool = False):
+    if everywhere:
+        crud.revoke_user_tokens(session, claims.sub)
+    else:
+        crud.revoke_token(session, claims)
+    return {"ok": True}
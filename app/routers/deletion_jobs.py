@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException
+from uuid import UUID
+
+from app.dependencies import SessionDep, TokenClaimsDep, require_user_token
+from app.models import DeletionJobPublic, User
+from app import crud
+
+
+router = APIRouter()
+
+
+@router.get("/deletion-jobs/{job_id}", response_model=DeletionJobPublic)
+def get_deletion_job(session: SessionDep, claims: TokenClaimsDep, job_id: UUID):
+    """A deletion job's progress; a user's own token is needed for theirs"""
+    job = crud.get_deletion_job(session, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    if job.target_table == User.__tablename__:
+        require_user_token(claims, job.target_id)
+    return job
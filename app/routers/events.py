@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Annotated
+
+from app.core.config import settings
+from app.crud.outbox import HOBBY_DELETED
+from app.dependencies import TokenClaimsDep
+from app.events import SSE_HEADERS, Event, EventStream, Position
+
+
+router = APIRouter()
+
+
+@router.get("/events", response_class=StreamingResponse)
+def get_events(request: Request, claims: TokenClaimsDep, after: str | None = None, last_event_id: Annotated[str | None, Header()] = None):
+    """Server-sent stream of outbox events about the caller, and hobby deletes
+
+    Resumes after the `Last-Event-ID` header (or `after`) when given, as
+    long as the outbox still holds everything since; otherwise answers 410,
+    and the client reconnects without one.
+    """
+    dispatcher = request.app.state.event_dispatcher
+    if dispatcher is None:
+        raise HTTPException(status_code=503, detail="Event streams are disabled")
+    resume = last_event_id or after
+    try:
+        position = Position.parse(resume) if resume else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid event position")
+    if position is not None and not dispatcher.retains(position):
+        # Events after it may have been pruned, so it can't be resumed
+        raise HTTPException(status_code=410, detail="Event position has expired")
+
+    def accept(event: Event) -> bool:
+        return event.user_id == claims.sub or event.type == HOBBY_DELETED
+
+    stream = EventStream(dispatcher, position, accept, claims.sub,
+                         heartbeat=settings.SSE_HEARTBEAT_INTERVAL,
+                         queue_size=settings.SSE_QUEUE_SIZE,
+                         closed=lambda: request.app.state.draining)
+    return StreamingResponse(stream, media_type="text/event-stream", headers=SSE_HEADERS)
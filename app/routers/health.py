@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Request, Response
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app import ml
+from app.db.database import get_engine
+
+
+router = APIRouter()
+
+
+@router.get("/health/live")
+def get_liveness():
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+def get_readiness(request: Request, response: Response):
+    state = request.app.state
+    checks = {
+        "started": state.ready,
+        "draining": state.draining,
+        "database": True,
+        "hobby_index": ml.peek_hobby_index() is not None,
+    }
+    # Not SessionDep, which checks out a connection before the route runs
+    # and so would fail the request outright while the database is down
+    try:
+        with Session(get_engine()) as session:
+            session.execute(text("SELECT 1"))
+    except Exception:
+        checks["database"] = False
+
+    ready = (checks["started"] and not checks["draining"]
+             and checks["database"] and checks["hobby_index"])
+    if not ready:
+        response.status_code = 503
+    return {"status": "ready" if ready else "unavailable", "checks": checks}
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Response
+from typing import Annotated
 from uuid import UUID
 
-from app.dependencies import SessionDep
-from app.models import HobbyPublic, HobbyCreate
-from app import crud
+from app.core.config import settings
+from app.core.responses import FastJSONResponse, fast_json
+
+from app.dependencies import BatchIdsDep, SessionDep, HobbyFieldsDep, HobbyIndexDep, TokenClaimsDep
+from app.models import DeletionJobPublic, HobbiesBatchPublic, HobbyPublic, HobbyCreate, HobbyStatsPublic, HobbyUserPublic, HobbyUsersPage, PopularHobbyPublic, SimilarHobbiesPublic
+from app import crud, jobs
 
 
 router = APIRouter()
@@ -16,22 +20,92 @@ def create_hobby(session: SessionDep, hobby_in: HobbyCreate):
         raise HTTPException(status_code=400, detail="Hobby already exists")
 
     db_hobby = crud.create_hobby(session, hobby_in)
-    return db_hobby
+    return fast_json(HobbyPublic, db_hobby)
+
+
+@router.get("/hobbies", response_model=HobbiesBatchPublic)
+def get_hobbies(session: SessionDep, ids: BatchIdsDep):
+    hobbies = crud.get_hobbies_by_uuids(session, ids)
+    found = {hobby.id for hobby in hobbies}
+    return HobbiesBatchPublic(
+        hobbies=hobbies, missing=[i for i in ids if i not in found])
+
+
+# Must be registered before /hobbies/{hobby_id}
+@router.get("/hobbies/popular", response_model=list[PopularHobbyPublic])
+def get_popular_hobbies(session: SessionDep, limit: Annotated[int, Query(le=100)] = 10):
+    popular = crud.get_popular_hobbies(session, limit)
+    return [
+        PopularHobbyPublic.model_validate(
+            hobby, update=HobbyStatsPublic.model_validate(stats).model_dump(
+                include={"interested_count", "rating_count", "rating_average"}))
+        for hobby, stats in popular
+    ]
 
 
 @router.get("/hobbies/{hobby_id}", response_model=HobbyPublic)
-def get_hobby(session: SessionDep, hobby_id: UUID):
+def get_hobby(session: SessionDep, hobby_id: UUID, fields: HobbyFieldsDep):
+    if fields is not None:
+        row = crud.get_hobby_fields(session, hobby_id, fields)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Hobby not found")
+        return FastJSONResponse(row)
+
+    db_hobby = crud.get_hobby_by_uuid(session, hobby_id)
+    if not db_hobby:
+        raise HTTPException(status_code=404, detail="Hobby not found")
+    return fast_json(HobbyPublic, db_hobby)
+
+
+@router.get("/hobbies/{hobby_id}/stats", response_model=HobbyStatsPublic)
+def get_hobby_stats(session: SessionDep, hobby_id: UUID):
+    stats = crud.get_hobby_stats(session, hobby_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Hobby not found")
+    return stats
+
+
+@router.get("/hobbies/{hobby_id}/users", response_model=HobbyUsersPage)
+def get_hobby_users(session: SessionDep, claims: TokenClaimsDep, hobby_id: UUID, cursor: UUID | None = None, limit: Annotated[int, Query(le=100)] = 10, interested: bool | None = None):
     db_hobby = crud.get_hobby_by_uuid(session, hobby_id)
     if not db_hobby:
         raise HTTPException(status_code=404, detail="Hobby not found")
-    return db_hobby
 
+    # Fetch one extra row to know whether there is a next page
+    rows = crud.get_hobby_user_links(
+        session, hobby_id, limit + 1, after=cursor, interested=interested)
+    users = [
+        HobbyUserPublic.model_validate(
+            user, update={"interested": link.interested, "rating": link.rating})
+        for user, link in rows[:limit]
+    ]
+    next_cursor = users[-1].id if len(rows) > limit else None
+    return HobbyUsersPage(users=users, next_cursor=next_cursor)
 
-@router.delete("/hobbies/{hobby_id}")
-def delete_hobby(session: SessionDep, hobby_id: UUID):
+
+@router.get("/hobbies/{hobby_id}/similar", response_model=SimilarHobbiesPublic)
+def get_similar_hobbies(session: SessionDep, hobby_index: HobbyIndexDep, hobby_id: UUID, limit: Annotated[int, Query(le=50)] = 10):
     db_hobby = crud.get_hobby_by_uuid(session, hobby_id)
     if not db_hobby:
         raise HTTPException(status_code=404, detail="Hobby not found")
 
+    ranked = hobby_index.similar([db_hobby.id], limit)
+    hobbies = crud.get_hobbies_by_uuids(session, [h_id for h_id, _ in ranked])
+    return SimilarHobbiesPublic(hobby_id=db_hobby.id, similar=hobbies)
+
+
+@router.delete("/hobbies/{hobby_id}", responses={202: {"model": DeletionJobPublic}})
+def delete_hobby(session: SessionDep, background_tasks: BackgroundTasks, response: Response, hobby_id: UUID, background: bool = False):
+    db_hobby = crud.get_hobby_by_uuid(session, hobby_id)
+    if not db_hobby:
+        raise HTTPException(status_code=404, detail="Hobby not found")
+
+    if background or crud.count_hobby_links(session, db_hobby.id) >= settings.BACKGROUND_DELETE_MIN_LINKS:
+        job = crud.mark_hobby_deleted(session, db_hobby)
+        background_tasks.add_task(
+            jobs.run_deletion_job, session.get_bind(), job.id)
+        response.status_code = 202
+        return DeletionJobPublic.model_validate(job)
+
     crud.delete_hobby(session, db_hobby)
     return {"ok": True}
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Request
+
+from app import ml
+from app.core.security import token_denylist
+
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+def get_metrics(request: Request):
+    link_graph = ml.peek_link_graph()
+    rating_buffer = request.app.state.rating_buffer
+    event_dispatcher = request.app.state.event_dispatcher
+    user_event_hub = request.app.state.user_event_hub
+    return {
+        "admission": request.app.state.admission_controller.stats(),
+        "coalescing": request.app.state.request_coalescer.stats(),
+        "token_denylist": token_denylist.stats(),
+        "suggestion_cache": ml.suggestion_cache.stats(),
+        "link_graph": link_graph.stats() if link_graph else None,
+        "rating_buffer": rating_buffer.stats() if rating_buffer else None,
+        "event_dispatcher": event_dispatcher.stats() if event_dispatcher else None,
+        "user_event_hub": user_event_hub.stats() if user_event_hub else None,
+    }
@@ -1,23 +1,32 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from typing import Annotated
 from uuid import UUID
 
-from app.dependencies import SessionDep
-from app.models import UserHobbyPublic, UserHobbyCreate, UserHobbyUpdate, HobbyPublic
-from app import crud
+from app.core.config import settings
+from app.core.responses import FastJSONResponse, fast_json
+from app.dependencies import SessionDep, HobbyFieldsDep, HobbyIndexDep, UserHobbyFieldsDep, require_user_token
+from app.models import UserHobbyPublic, UserHobbyCreate, UserHobbyUpdate, HobbyPublic, HobbySuggestionsPublic
+from app import crud, events, ml
 
 
-router = APIRouter()
+# Every route here is under /users/{user_id}
+router = APIRouter(dependencies=[Depends(require_user_token)])
 
 
 @router.get("/users/{user_id}/hobbies", response_model=list[HobbyPublic])
-def get_user_hobbies(session: SessionDep, user_id: UUID, offset: int = 0, limit: Annotated[int, Query(le=100)] = 10):
+def get_user_hobbies(session: SessionDep, user_id: UUID, fields: HobbyFieldsDep, offset: int = 0, limit: Annotated[int, Query(le=100)] = 10):
     user = crud.get_user_by_uuid(session, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    hobbies = [uh.hobby for uh in user.hobby_links[offset:offset+limit]]
-    return hobbies
+    if fields is not None:
+        return FastJSONResponse(crud.get_user_hobby_fields(
+            session, user_id, fields, limit, offset))
+
+    hobbies = crud.get_user_hobbies(session, user_id, limit, offset)
+    return fast_json(HobbyPublic, hobbies)
 
 
 @router.post("/users/{user_id}/hobbies", response_model=UserHobbyPublic)
@@ -37,44 +46,119 @@ def add_user_hobby(session: SessionDep, user_id: UUID, user_hobby_in: UserHobbyC
 
     db_user_hobby = crud.create_user_hobby_link(
         session, user_id, user_hobby_in)
-    return db_user_hobby
+    return fast_json(UserHobbyPublic, db_user_hobby)
+
+
+# Must be registered before /users/{user_id}/hobbies/{hobby_id}
+@router.get("/users/{user_id}/hobbies/suggestions", response_model=HobbySuggestionsPublic)
+def get_hobby_suggestions(session: SessionDep, hobby_index: HobbyIndexDep, background_tasks: BackgroundTasks, user_id: UUID, limit: Annotated[int, Query(le=50)] = 10):
+    user = crud.get_user_by_uuid(session, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    hobby_ids = ml.get_cached_suggestion_ids(hobby_index, user, limit)
+    if ml.suggestion_cache.needs_refresh(user.id):
+        background_tasks.add_task(
+            ml.refresh_user_suggestions, user.id, limit)
+    hobbies = crud.get_hobbies_by_uuids(session, hobby_ids)
+    return HobbySuggestionsPublic(user_id=user.id, suggestions=hobbies)
+
+
+# Must be registered before /users/{user_id}/hobbies/{hobby_id}
+@router.get("/users/{user_id}/hobbies/stream", response_class=StreamingResponse)
+async def stream_user_hobbies(request: Request, user_id: UUID, limit: Annotated[int, Query(le=50)] = 10, after: str | None = None, last_event_id: Annotated[str | None, Header()] = None):
+    """Server-sent stream of the user's link changes and refreshed suggestions
+
+    Catches up on the events missed since the `Last-Event-ID` header (or
+    `after`) when given. No session is held open while streaming;
+    suggestions are loaded on their own short-lived sessions.
+    """
+    hub = request.app.state.user_event_hub
+    if hub is None:
+        raise HTTPException(status_code=503, detail="Event streams are disabled")
+    resume = last_event_id or after
+    try:
+        position = events.Position.parse(resume) if resume else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid event position")
+    initial = await run_in_threadpool(events.load_user_suggestions, user_id, limit)
+    if initial is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    stream = events.UserStream(hub, user_id, limit, initial, after=position,
+                               heartbeat=settings.SSE_HEARTBEAT_INTERVAL,
+                               queue_size=settings.SSE_QUEUE_SIZE,
+                               closed=lambda: request.app.state.draining)
+    return StreamingResponse(stream, media_type="text/event-stream", headers=events.SSE_HEADERS)
 
 
 @router.get("/users/{user_id}/hobbies/{hobby_id}", response_model=UserHobbyPublic)
-def get_user_hobby(session: SessionDep, user_id: UUID, hobby_id: UUID):
+def get_user_hobby(request: Request, session: SessionDep, user_id: UUID, hobby_id: UUID, fields: UserHobbyFieldsDep):
+    rating_buffer = request.app.state.rating_buffer
+    if rating_buffer is not None:
+        # Read our own buffered writes
+        pending, rating = rating_buffer.get(user_id, hobby_id)
+        if pending:
+            user_hobby = crud.get_user_hobby_link(
+                session, user_id=user_id, hobby_id=hobby_id)
+            if not user_hobby:
+                raise HTTPException(
+                    status_code=404, detail="User hobby link not found")
+            public = UserHobbyPublic.model_validate(
+                user_hobby, update={"rating": rating})
+            if fields is not None:
+                return FastJSONResponse(public.model_dump(include=set(fields)))
+            return public
+
+    if fields is not None:
+        row = crud.get_user_hobby_link_fields(
+            session, user_id, hobby_id, fields)
+        if row is None:
+            raise HTTPException(
+                status_code=404, detail="User hobby link not found")
+        return FastJSONResponse(row)
+
     user_hobby = crud.get_user_hobby_link(
         session, user_id=user_id, hobby_id=hobby_id)
     if not user_hobby:
         raise HTTPException(
             status_code=404, detail="User hobby link not found")
-    return user_hobby
+    return fast_json(UserHobbyPublic, user_hobby)
 
 
 @router.patch("/users/{user_id}/hobbies/{hobby_id}", response_model=UserHobbyPublic)
-def update_user_hobby(session: SessionDep, user_id: UUID, hobby_id: UUID, user_hobby_in: UserHobbyUpdate):
+def update_user_hobby(request: Request, session: SessionDep, user_id: UUID, hobby_id: UUID, user_hobby_in: UserHobbyUpdate):
     db_user_hobby = crud.get_user_hobby_link(
         session, user_id=user_id, hobby_id=hobby_id)
     if not db_user_hobby:
         raise HTTPException(
             status_code=404, detail="User hobby link not found")
 
+    rating_buffer = request.app.state.rating_buffer
+    if rating_buffer is not None:
+        update_data = user_hobby_in.model_dump(exclude_unset=True)
+        if update_data.keys() == {"rating"}:
+            rating_buffer.put(user_id, hobby_id, update_data["rating"])
+            return UserHobbyPublic.model_validate(db_user_hobby, update=update_data)
+        # Written now, so a buffered rating must not overwrite it later
+        pending, rating = rating_buffer.pop(user_id, hobby_id)
+        if pending and "rating" not in update_data:
+            user_hobby_in.rating = rating
+
     db_user_hobby = crud.update_user_hobby_link(
         session, db_user_hobby, user_hobby_in)
-    return db_user_hobby
+    return fast_json(UserHobbyPublic, db_user_hobby)
 
 
 @router.delete("/users/{user_id}/hobbies/{hobby_id}")
-def delete_user_hobby(session: SessionDep, user_id: UUID, hobby_id: UUID):
+def delete_user_hobby(request: Request, session: SessionDep, user_id: UUID, hobby_id: UUID):
     db_user_hobby = crud.get_user_hobby_link(
         session, user_id=user_id, hobby_id=hobby_id)
     if not db_user_hobby:
         raise HTTPException(
             status_code=404, detail="User hobby link not found")
 
+    if request.app.state.rating_buffer is not None:
+        request.app.state.rating_buffer.pop(user_id, hobby_id)
     crud.delete_user_hobby_link(session, db_user_hobby)
     return {"ok": True}
-
-
-@router.get("/users/{user_id}/hobbies/suggestions")
-def get_hobby_suggestions(user_id: UUID):
-    return {"user_id": user_id, "suggestions": [], "message": "Hobby suggestions (placeholder)"}
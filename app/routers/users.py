@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from typing import Annotated
 from uuid import UUID
 
-from app.dependencies import SessionDep
-from app.models import UserPublic, UserCreate, UserUpdate
-from app import crud
+from app.core.config import settings
+from app.core.responses import FastJSONResponse, fast_json
+from app.dependencies import BatchIdsDep, SessionDep, TokenClaimsDep, UserFieldsDep, require_user_token
+from app.models import DeletionJobPublic, HobbyPublic, UserDetailPublic, UserPublic, UserCreate, UserUpdate, UsersBatchPublic
+from app import crud, jobs, ml
 
 
 router = APIRouter()
@@ -25,31 +28,87 @@ def create_user(session: SessionDep, user_in: UserCreate):
                 detail="A user with this email already exists.")
 
     user = crud.create_user(session, user_in)
-    return user
+    return fast_json(UserPublic, user)
 
 
-@router.get("/users/{user_id}", response_model=UserPublic)
-def get_user(session: SessionDep, user_id: UUID):
-    user = crud.get_user_by_uuid(session, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+# Any signed-in user may look up others, but only sees what their profile
+# shows; their own email is at GET /users/{user_id}
+@router.get("/users", response_model=UsersBatchPublic)
+def get_users(session: SessionDep, claims: TokenClaimsDep, ids: BatchIdsDep):
+    users = crud.get_users_by_uuids(session, ids)
+    found = {user.id for user in users}
+    return UsersBatchPublic(
+        users=users, missing=[i for i in ids if i not in found])
+
 
+USER_EXPANSIONS = frozenset({"hobbies", "suggestions"})
 
-@router.patch("/users/{user_id}", response_model=UserPublic)
+
+@router.get("/users/{user_id}", response_model=UserDetailPublic, response_model_exclude_unset=True, dependencies=[Depends(require_user_token)])
+def get_user(session: SessionDep, user_id: UUID, fields: UserFieldsDep, include: str = "", hobbies_offset: int = 0, hobbies_limit: Annotated[int, Query(le=100)] = 10, suggestions_limit: Annotated[int, Query(le=50)] = 10):
+    expansions = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = expansions - USER_EXPANSIONS
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include: {', '.join(sorted(unknown))}")
+
+    if fields is not None:
+        if expansions:
+            raise HTTPException(
+                status_code=400, detail="fields can't be combined with include")
+        row = crud.get_user_fields(session, user_id, fields)
+        if row is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return FastJSONResponse(row)
+
+    if "hobbies" not in expansions:
+        user = crud.get_user_by_uuid(session, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        if not expansions:
+            return fast_json(UserPublic, user)
+        detail = UserDetailPublic.model_validate(user)
+    else:
+        found = crud.get_user_with_hobbies(
+            session, user_id, hobbies_limit, hobbies_offset)
+        if not found:
+            raise HTTPException(status_code=404, detail="User not found")
+        user, hobbies = found
+        detail = UserDetailPublic.model_validate(user)
+        detail.hobbies = hobbies
+
+    if "suggestions" in expansions:
+        hobby_index = ml.get_hobby_index(session)
+        hobby_ids = ml.get_cached_suggestion_ids(
+            hobby_index, user, suggestions_limit)
+        detail.suggestions = [HobbyPublic.model_validate(hobby)
+                              for hobby in crud.get_hobbies_by_uuids(session, hobby_ids)]
+    return detail
+
+
+@router.patch("/users/{user_id}", response_model=UserPublic, dependencies=[Depends(require_user_token)])
 def update_user(session: SessionDep, user_id: UUID, user_in: UserUpdate):
     db_user = crud.get_user_by_uuid(session, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
     db_user = crud.update_user(session, db_user, user_in)
-    return db_user
+    return fast_json(UserPublic, db_user)
 
 
-@router.delete("/users/{user_id}")
-def delete_user(session: SessionDep, user_id: UUID):
+@router.delete("/users/{user_id}", responses={202: {"model": DeletionJobPublic}}, dependencies=[Depends(require_user_token)])
+def delete_user(session: SessionDep, background_tasks: BackgroundTasks, response: Response, user_id: UUID, background: bool = False):
     db_user = crud.get_user_by_uuid(session, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
+
+    if background or crud.count_user_links(session, db_user.id) >= settings.BACKGROUND_DELETE_MIN_LINKS:
+        job = crud.mark_user_deleted(session, db_user)
+        background_tasks.add_task(
+            jobs.run_deletion_job, session.get_bind(), job.id)
+        response.status_code = 202
+        return DeletionJobPublic.model_validate(job)
+
     crud.delete_user(session, db_user)
     return {"ok": True}
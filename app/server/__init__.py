@@ -0,0 +1 @@
+from .helpers import *
@@ -0,0 +1,19 @@
+import argparse
+
+from .helpers import run
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m app.server",
+        description="Run the API with multiple worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=80)
+    parser.add_argument("--workers", type=int,
+                        help="defaults to WEB_CONCURRENCY, or one per CPU")
+    args = parser.parse_args()
+
+    run(args.host, args.port, args.workers)
+
+
+main()
@@ -0,0 +1,42 @@
+import os
+import uvicorn
+
+from app.core.config import settings
+
+
+def worker_count() -> int:
+    return settings.WEB_CONCURRENCY or os.cpu_count() or 1
+
+
+def check_settings(workers: int):
+    """Refuse to start workers whose settings only hold in a single process"""
+    if workers > 1 and not settings.AUTH_SECRET_KEY:
+        raise SystemExit("AUTH_SECRET_KEY is needed with several workers, or each "
+                         "signs tokens with its own key that the others reject")
+    if workers > 1 and not settings.OUTBOX_DISPATCHER_ENABLED:
+        raise SystemExit("OUTBOX_DISPATCHER_ENABLED is needed with several workers, "
+                         "which learn of each other's token revocations through it")
+
+
+def run(host: str = "0.0.0.0", port: int = 80, workers: int | None = None):
+    """Serve the API from several worker processes
+
+    uvicorn spawns rather than forks its workers, so each one imports the
+    app and builds its own engine, caches and hobby index through the
+    factory's lifespan; nothing is preloaded in the supervisor. On SIGTERM
+    the supervisor signals every worker, which drain and then finish their
+    in-flight requests.
+    """
+    workers = workers or worker_count()
+    check_settings(workers)
+    uvicorn.run(
+        "app.main:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        proxy_headers=True,
+        # Covers the drain period as well as in-flight requests
+        timeout_graceful_shutdown=int(
+            settings.DRAIN_SECONDS + settings.GRACEFUL_SHUTDOWN_TIMEOUT),
+    )
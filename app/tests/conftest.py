@@ -1,35 +1,104 @@
+import os
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, create_engine
+from sqlalchemy import event, text
 from sqlalchemy.engine import Engine
-from typing import Generator
-import alembic
-from alembic.config import Config as AlembicConfig
+from sqlalchemy.pool import NullPool
+from typing import Callable, Generator
+from uuid import UUID
 
+from app.db import database
 from app.db.database import get_session
 from app.main import app
 from app.core.config import settings
+from app.core.security import create_access_token, token_denylist
+from app import ml
+from app.tests.databases import PROVISION_LOCK_KEY, database_url, ensure_template
 
 
-@pytest.fixture
-def engine() -> Engine:
-    engine = create_engine(f"{settings.TEST_DATABASE_URL}")
-    return engine
+@pytest.fixture(scope="session")
+def admin_engine() -> Generator[Engine, None, None]:
+    """Autocommit engine on the configured test database, for CREATE DATABASE"""
+    engine = create_engine(str(settings.TEST_DATABASE_URL),
+                           isolation_level="AUTOCOMMIT", poolclass=NullPool)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def engine(admin_engine: Engine) -> Generator[Engine, None, None]:
+    """Engine on a migrated database of this worker's own
+
+    The database is cloned from a template that is migrated only when the
+    migrations change. Under pytest-xdist each worker gets its own clone.
+    """
+    base = settings.POSTGRES_TEST_DB
+    template = f"{base}_template"
+    name = f"{base}_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}"
+
+    with admin_engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"),
+                     {"key": PROVISION_LOCK_KEY})
+        try:
+            ensure_template(conn, template)
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+            conn.execute(
+                text(f'CREATE DATABASE "{name}" TEMPLATE "{template}"'))
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"),
+                         {"key": PROVISION_LOCK_KEY})
+
+    engine = database.make_engine(database_url(name))
+    # Anything that opens its own session (warm-up, background refreshes)
+    # talks to the same database
+    database._engine = engine
+    yield engine
+    database._engine = None
+    engine.dispose()
+    with admin_engine.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
 
 
 @pytest.fixture(autouse=True)
-def apply_migrations(engine: Engine):
-    alembic_cfg = AlembicConfig("alembic.ini")
-    alembic_cfg.attributes["connection"] = engine
-    alembic.command.upgrade(alembic_cfg, "head")
+def ml_state(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "HOBBY_INDEX_PATH",
+                        str(tmp_path / "hobby_index.json"))
+    ml.reset_hobby_index()
+    ml.reset_link_graph()
+    ml.suggestion_cache.clear()
     yield
-    alembic.command.downgrade(alembic_cfg, "base")
+    ml.reset_hobby_index()
+    ml.reset_link_graph()
+    ml.suggestion_cache.clear()
 
 
 @pytest.fixture
 def session(engine: Engine) -> Generator[Session, None, None]:
-    with Session(engine) as session:
-        yield session
+    """Session inside a transaction that is rolled back after the test
+
+    Commits release a SAVEPOINT instead, so tests see their own writes and
+    can still roll back after an error, but nothing outlives the test.
+    """
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+            yield session
+        transaction.rollback()
+
+
+@pytest.fixture
+def statements(session: Session) -> Generator[list[str], None, None]:
+    """SQL statements run through the test session's connection"""
+    executed: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    connection = session.connection()
+    event.listen(connection, "before_cursor_execute", record)
+    yield executed
+    event.remove(connection, "before_cursor_execute", record)
 
 
 @pytest.fixture
@@ -37,3 +106,11 @@ def client(session: Session) -> Generator[TestClient, None, None]:
     app.dependency_overrides[get_session] = lambda: session
     yield TestClient(app)
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def auth_headers() -> Generator[Callable[[UUID], dict[str, str]], None, None]:
+    def make_headers(user_id: UUID) -> dict[str, str]:
+        return {"Authorization": f"Bearer {create_access_token(user_id)}"}
+    yield make_headers
+    token_denylist.clear()
@@ -0,0 +1,116 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.admission import AdmissionController, AdmissionMiddleware, InMemoryRateLimiter
+from app.db.database import PoolMonitor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _make_controller(max_in_flight: int = 2, clock=None) -> AdmissionController:
+    monitor = PoolMonitor(clock=clock or FakeClock())
+    return AdmissionController(max_in_flight=max_in_flight, write_share=0.5,
+                               pool_wait_threshold=0.1, monitor=monitor)
+
+
+def test_controller_limits_in_flight_with_write_share():
+    controller = _make_controller(max_in_flight=2)
+    assert controller.try_admit("POST") is None
+    assert controller.try_admit("POST") == "in_flight"
+    assert controller.try_admit("GET") is None
+    assert controller.try_admit("GET") == "in_flight"
+
+    controller.release()
+    assert controller.try_admit("GET") is None
+    assert controller.stats()["shed"]["in_flight"] == 2
+
+
+def test_controller_sheds_writes_first_on_pool_wait():
+    clock = FakeClock()
+    controller = _make_controller(max_in_flight=10, clock=clock)
+    for _ in range(10):
+        controller.monitor.record(0.15)
+
+    assert controller.try_admit("POST") == "pool_wait"
+    assert controller.try_admit("GET") is None
+
+    for _ in range(20):
+        controller.monitor.record(0.5)
+    assert controller.try_admit("GET") == "pool_wait"
+
+    # The wait average decays once samples stop arriving
+    clock.now += 10
+    assert controller.try_admit("POST") is None
+
+
+def test_in_memory_rate_limiter():
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(rate=1, burst=2, clock=clock)
+
+    async def acquire():
+        return await limiter.acquire("client")
+
+    assert asyncio.run(acquire()) is None
+    assert asyncio.run(acquire()) is None
+    assert asyncio.run(acquire()) == 1.0
+
+    clock.now += 1
+    assert asyncio.run(acquire()) is None
+
+
+def _make_client(controller: AdmissionController, limiter=None) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware,
+                       controller=controller, limiter=limiter)
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.get("/stream")
+    def stream():
+        async def body():
+            # The stream no longer holds a slot once it has started
+            yield f"in_flight={controller.in_flight}".encode()
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+def test_middleware_sheds_with_retry_after():
+    controller = _make_controller(max_in_flight=1)
+    client = _make_client(controller)
+    assert client.get("/ping").status_code == 200
+    assert controller.in_flight == 0
+
+    controller.try_admit("GET")
+    resp = client.get("/ping")
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"
+
+
+def test_middleware_rate_limits():
+    controller = _make_controller()
+    client = _make_client(controller, InMemoryRateLimiter(rate=0.5, burst=1))
+    assert client.get("/ping").status_code == 200
+
+    resp = client.get("/ping")
+    assert resp.status_code == 429
+    assert int(resp.headers["retry-after"]) >= 1
+    assert controller.stats()["shed"]["rate_limit"] == 1
+
+
+def test_middleware_releases_event_streams_once_started():
+    controller = _make_controller(max_in_flight=1)
+    client = _make_client(controller)
+    resp = client.get("/stream")
+    assert resp.text == "in_flight=0"
+    assert controller.in_flight == 0
@@ -0,0 +1,68 @@
+import asyncio
+import httpx
+from fastapi import FastAPI
+
+from app.core.coalescing import CoalescingMiddleware, RequestCoalescer
+
+
+def _make_app(coalescer: RequestCoalescer, calls: list[str], delay: float = 0.05) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CoalescingMiddleware, coalescer=coalescer)
+
+    @app.get("/hobbies/{name}")
+    async def get_hobby(name: str):
+        calls.append(name)
+        await asyncio.sleep(delay)
+        return {"name": name, "call": len(calls)}
+
+    return app
+
+
+async def _get_all(app: FastAPI, paths: list[str]) -> list[httpx.Response]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(client.get(path) for path in paths))
+
+
+def test_identical_requests_share_one_computation():
+    coalescer = RequestCoalescer(patterns=[r"/hobbies/[^/]+"])
+    calls: list[str] = []
+    app = _make_app(coalescer, calls)
+
+    responses = asyncio.run(_get_all(app, ["/hobbies/chess"] * 5))
+    assert calls == ["chess"]
+    assert all(r.status_code == 200 for r in responses)
+    assert all(r.json() == {"name": "chess", "call": 1} for r in responses)
+    assert coalescer.stats() == {
+        "in_flight": 0, "leaders": 1, "coalesced": 4, "timeouts": 0}
+
+
+def test_different_requests_are_not_shared():
+    coalescer = RequestCoalescer(patterns=[r"/hobbies/[^/]+"])
+    calls: list[str] = []
+    app = _make_app(coalescer, calls)
+
+    asyncio.run(_get_all(app, ["/hobbies/chess", "/hobbies/go",
+                               "/hobbies/chess?x=1"]))
+    assert sorted(calls) == ["chess", "chess", "go"]
+    assert coalescer.coalesced == 0
+
+
+def test_unmatched_paths_are_not_shared():
+    coalescer = RequestCoalescer(patterns=[r"/users/[^/]+"])
+    calls: list[str] = []
+    app = _make_app(coalescer, calls)
+
+    asyncio.run(_get_all(app, ["/hobbies/chess"] * 2))
+    assert calls == ["chess", "chess"]
+
+
+def test_waiters_run_themselves_after_max_wait():
+    coalescer = RequestCoalescer(patterns=[r"/hobbies/[^/]+"], max_wait=0.01)
+    calls: list[str] = []
+    app = _make_app(coalescer, calls, delay=0.1)
+
+    responses = asyncio.run(_get_all(app, ["/hobbies/chess"] * 2))
+    assert calls == ["chess", "chess"]
+    assert all(r.status_code == 200 for r in responses)
+    assert coalescer.timeouts == 1
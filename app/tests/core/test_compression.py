@@ -0,0 +1,79 @@
+import gzip
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, choose_encoding
+
+BIG_TEXT = "hobby " * 1000
+
+
+def _make_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse(BIG_TEXT)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([BIG_TEXT[:100]] * 20), media_type="text/plain")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter([BIG_TEXT]), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+def test_choose_encoding():
+    supported = ["zstd", "br", "gzip"]
+    assert choose_encoding("gzip, br", supported) == "br"
+    assert choose_encoding("gzip;q=1.0, br;q=0.5", supported) == "gzip"
+    assert choose_encoding("br;q=0, gzip", supported) == "gzip"
+    assert choose_encoding("*", supported) == "zstd"
+    assert choose_encoding("identity", supported) is None
+    assert choose_encoding("", supported) is None
+
+
+def test_compresses_large_body():
+    client = _make_client()
+    resp = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert int(resp.headers["content-length"]) < len(BIG_TEXT)
+    assert resp.text == BIG_TEXT
+
+
+def test_skips_small_body():
+    client = _make_client()
+    resp = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+    assert resp.text == "tiny"
+
+
+def test_skips_without_accept_encoding():
+    client = _make_client()
+    resp = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in resp.headers
+    assert resp.text == BIG_TEXT
+
+
+def test_compresses_streaming_body():
+    client = _make_client()
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as resp:
+        raw = b"".join(resp.iter_raw())
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "content-length" not in resp.headers
+    assert gzip.decompress(raw).decode() == BIG_TEXT[:100] * 20
+
+
+def test_skips_event_stream():
+    client = _make_client()
+    resp = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
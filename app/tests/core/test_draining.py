@@ -0,0 +1,38 @@
+import signal
+import time
+from fastapi import FastAPI
+
+from app.core.draining import install_drain_handler
+
+
+def test_sigterm_drains_before_calling_server_handler():
+    calls = []
+    original = signal.signal(signal.SIGTERM, lambda sig, frame: calls.append(sig))
+    try:
+        app = FastAPI()
+        app.state.draining = False
+        install_drain_handler(app, drain_seconds=0.05)
+
+        signal.raise_signal(signal.SIGTERM)
+        assert app.state.draining is True
+        assert calls == []
+
+        time.sleep(0.2)
+        assert calls == [signal.SIGTERM]
+    finally:
+        signal.signal(signal.SIGTERM, original)
+
+
+def test_second_sigterm_skips_drain():
+    calls = []
+    original = signal.signal(signal.SIGTERM, lambda sig, frame: calls.append(sig))
+    try:
+        app = FastAPI()
+        app.state.draining = False
+        install_drain_handler(app, drain_seconds=10)
+
+        signal.raise_signal(signal.SIGTERM)
+        signal.raise_signal(signal.SIGTERM)
+        assert calls == [signal.SIGTERM]
+    finally:
+        signal.signal(signal.SIGTERM, original)
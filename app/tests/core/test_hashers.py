@@ -0,0 +1,72 @@
+import pytest
+
+from app.core.config import settings
+from app.core.hashers import BcryptHasher, calibrate_bcrypt, identify_hasher
+from app.core.security import hash_password, password_needs_rehash, verify_password
+
+
+def test_bcrypt_hasher():
+    hasher = BcryptHasher(rounds=4)
+    password_hash = hasher.hash("ultrasecure")
+
+    assert password_hash.startswith("$2b$04$")
+    assert hasher.verify("ultrasecure", password_hash)
+    assert not hasher.verify("wrongpassword", password_hash)
+    assert not hasher.verify("ultrasecure", "not a hash")
+    assert not hasher.needs_rehash(password_hash)
+    assert BcryptHasher(rounds=5).needs_rehash(password_hash)
+
+
+def test_argon2_hasher():
+    pytest.importorskip("argon2")
+    from app.core.hashers import Argon2Hasher
+
+    hasher = Argon2Hasher(time_cost=1, memory_cost=1024, parallelism=1)
+    password_hash = hasher.hash("ultrasecure")
+
+    assert password_hash.startswith("$argon2id$")
+    assert hasher.verify("ultrasecure", password_hash)
+    assert not hasher.verify("wrongpassword", password_hash)
+    assert not hasher.needs_rehash(password_hash)
+    assert Argon2Hasher(time_cost=2, memory_cost=1024,
+                        parallelism=1).needs_rehash(password_hash)
+
+
+def test_identify_hasher():
+    assert identify_hasher(BcryptHasher(rounds=4).hash("pw")) == "bcrypt"
+    assert identify_hasher("$argon2id$v=19$m=1024,t=1,p=1$abc$def") == "argon2id"
+    assert identify_hasher("ultrasecure") is None
+
+
+def test_password_needs_rehash(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    password_hash = hash_password("ultrasecure")
+    assert verify_password("ultrasecure", password_hash)
+    assert not password_needs_rehash(password_hash)
+
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    assert password_needs_rehash(password_hash)
+    # Old hashes still verify until they're upgraded
+    assert verify_password("ultrasecure", password_hash)
+
+
+def test_password_needs_rehash_other_scheme(monkeypatch: pytest.MonkeyPatch):
+    pytest.importorskip("argon2")
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    bcrypt_hash = hash_password("ultrasecure")
+
+    monkeypatch.setattr(settings, "PASSWORD_HASHER", "argon2id")
+    monkeypatch.setattr(settings, "ARGON2_MEMORY_COST", 1024)
+    monkeypatch.setattr(settings, "ARGON2_TIME_COST", 1)
+    assert password_needs_rehash(bcrypt_hash)
+    assert verify_password("ultrasecure", bcrypt_hash)
+
+    argon2_hash = hash_password("ultrasecure")
+    assert argon2_hash.startswith("$argon2id$")
+    assert not password_needs_rehash(argon2_hash)
+
+
+def test_calibrate_bcrypt():
+    params, elapsed = calibrate_bcrypt(target=0.0, repeat=1)
+    assert params == {"rounds": 4}
+    assert elapsed > 0
@@ -0,0 +1,38 @@
+import json
+import pytest
+from uuid import uuid4
+
+from app.core import responses
+from app.core.config import settings
+from app.core.responses import FastJSONResponse, fast_json, project
+from app.models import User, UserPublic
+
+
+def test_project_copies_public_fields_only():
+    user = User(id=uuid4(), username="beeyou", name="kiko",
+                password_hash="ultrasecure")
+    assert project(UserPublic, user) == {
+        "username": "beeyou", "email": None, "name": "kiko", "id": user.id}
+
+
+def test_fast_json_disabled_returns_data(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", False)
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    assert fast_json(UserPublic, user) is user
+
+
+def test_fast_json_enabled_renders_json(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+
+    resp = fast_json(UserPublic, [user])
+    assert isinstance(resp, FastJSONResponse)
+    assert json.loads(resp.body) == [{
+        "username": "beeyou", "email": None, "name": "kiko", "id": str(user.id)}]
+
+
+def test_fast_json_response_without_orjson(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(responses, "orjson", None)
+    hobby_id = uuid4()
+    resp = FastJSONResponse({"id": hobby_id, "name": "Café"})
+    assert json.loads(resp.body) == {"id": str(hobby_id), "name": "Café"}
@@ -0,0 +1,81 @@
+import pytest
+from uuid import uuid4
+
+from app.core.security import (InvalidTokenError, TokenDenylist, create_access_token,
+                               decode_access_token)
+
+
+def test_access_token_round_trip():
+    user_id = uuid4()
+    token = create_access_token(user_id, ttl=60, now=1000.0)
+
+    claims = decode_access_token(token, now=1030.0)
+    assert claims.sub == user_id
+    assert claims.iat == 1000.0
+    assert claims.exp == 1060
+    assert len(claims.jti) == 16
+
+
+def test_access_token_expired():
+    token = create_access_token(uuid4(), ttl=60, now=1000.0)
+    with pytest.raises(InvalidTokenError):
+        decode_access_token(token, now=1060.0)
+
+
+def test_access_token_tampered():
+    token = create_access_token(uuid4(), ttl=60, now=1000.0)
+    header, payload, signature = token.split(".")
+    other = create_access_token(uuid4(), ttl=60, now=1000.0).split(".")[1]
+
+    for bad in [f"{header}.{other}.{signature}", f"{header}.{payload}.", "garbage", "é.é.é"]:
+        with pytest.raises(InvalidTokenError):
+            decode_access_token(bad, now=1030.0)
+
+
+def test_denylist_revokes_single_token():
+    denylist = TokenDenylist(clock=lambda: 1000.0)
+    user_id = uuid4()
+    revoked = decode_access_token(create_access_token(user_id, now=1000.0), now=1000.0)
+    other = decode_access_token(create_access_token(user_id, now=1000.0), now=1000.0)
+
+    denylist.revoke(revoked)
+    assert denylist.is_revoked(revoked)
+    assert not denylist.is_revoked(other)
+
+
+def test_denylist_revokes_user_tokens_issued_before():
+    now = [1000.0]
+    denylist = TokenDenylist(clock=lambda: now[0])
+    user_id = uuid4()
+    old = decode_access_token(create_access_token(user_id, now=999.5), now=1000.0)
+    other_user = decode_access_token(create_access_token(uuid4(), now=999.5), now=1000.0)
+
+    denylist.revoke_user(user_id, ttl=60)
+    new = decode_access_token(create_access_token(user_id, now=1000.001), now=1000.0)
+    assert denylist.is_revoked(old)
+    assert not denylist.is_revoked(other_user)
+    assert not denylist.is_revoked(new)
+
+
+def test_denylist_keeps_latest_user_cutoff():
+    denylist = TokenDenylist(clock=lambda: 1000.0)
+    user_id = uuid4()
+    claims = decode_access_token(create_access_token(user_id, now=1005.0), now=1010.0)
+
+    denylist.revoke_user(user_id, ttl=60, issued_before=1010.0)
+    # Applied late, as when replayed from the outbox
+    denylist.revoke_user(user_id, ttl=60, issued_before=1001.0)
+    assert denylist.is_revoked(claims)
+
+
+def test_denylist_prunes_expired_entries():
+    now = [1000.0]
+    denylist = TokenDenylist(prune_interval=10, clock=lambda: now[0])
+    claims = decode_access_token(create_access_token(uuid4(), ttl=5, now=1000.0), now=1000.0)
+    denylist.revoke(claims)
+    denylist.revoke_user(uuid4(), ttl=5)
+    assert denylist.stats() == {"tokens": 1, "users": 1}
+
+    now[0] = 1011.0
+    denylist.revoke_user(uuid4(), ttl=5)
+    assert denylist.stats() == {"tokens": 0, "users": 1}
@@ -43,6 +43,18 @@ def test_get_hobby(session: Session):
     assert crud.get_hobby_by_name(session, "Nope") is None
 
 
+def test_get_hobbies_by_uuids_preserves_order(session: Session):
+    first = Hobby(name="First")
+    second = Hobby(name="Second")
+    session.add_all([first, second])
+    session.commit()
+
+    hobbies = crud.get_hobbies_by_uuids(
+        session, [second.id, uuid4(), first.id])
+    assert [h.id for h in hobbies] == [second.id, first.id]
+    assert crud.get_hobbies_by_uuids(session, []) == []
+
+
 def test_delete_hobby_removes_record(session: Session):
     user = User(username="user_delete_hobby",
                 name="User", password_hash="password")
@@ -54,3 +66,59 @@ def test_delete_hobby_removes_record(session: Session):
     crud.delete_hobby(session, hobby)
     assert session.get(Hobby, hobby.id) is None
     assert session.get(UserHobbyLink, (user.id, hobby.id)) is None
+
+
+def test_hobby_stats_track_links(session: Session):
+    alice = User(username="alice", name="Alice", password_hash="password")
+    bob = User(username="bob", name="Bob", password_hash="password")
+    hobby = Hobby(name="Chess")
+    session.add_all([alice, bob, hobby])
+    session.commit()
+
+    stats = crud.get_hobby_stats(session, hobby.id)
+    assert stats is not None
+    assert stats.link_count == 0
+    assert stats.rating_histogram == {}
+
+    alice_link = UserHobbyLink(user_id=alice.id, hobby_id=hobby.id, rating=4)
+    bob_link = UserHobbyLink(user_id=bob.id, hobby_id=hobby.id,
+                             interested=False, rating=2)
+    session.add_all([alice_link, bob_link])
+    session.commit()
+    session.refresh(stats)
+    assert stats.link_count == 2
+    assert stats.interested_count == 1
+    assert stats.rating_count == 2
+    assert stats.rating_sum == 6
+    assert stats.rating_histogram == {"4": 1, "2": 1}
+
+    bob_link.rating = 4
+    session.add(bob_link)
+    session.commit()
+    session.refresh(stats)
+    assert stats.rating_sum == 8
+    assert stats.rating_histogram == {"4": 2, "2": 0}
+
+    crud.delete_user(session, alice)
+    session.refresh(stats)
+    assert stats.link_count == 1
+    assert stats.interested_count == 0
+    assert stats.rating_histogram == {"4": 1, "2": 0}
+
+
+def test_get_popular_hobbies(session: Session):
+    user = User(username="popular", name="User", password_hash="password")
+    chess = Hobby(name="Chess")
+    go = Hobby(name="Go")
+    baking = Hobby(name="Baking")
+    session.add_all([
+        user, chess, go, baking,
+        UserHobbyLink(user_id=user.id, hobby_id=go.id),
+    ])
+    session.commit()
+
+    popular = crud.get_popular_hobbies(session, limit=2)
+    assert len(popular) == 2
+    hobby, stats = popular[0]
+    assert hobby.id == go.id
+    assert stats.interested_count == 1
@@ -0,0 +1,75 @@
+from sqlmodel import Session
+from uuid import uuid4
+
+from app.models import Hobby, User, UserHobbyLink, utcnow
+from app import crud
+
+
+def _selects(statements: list[str]) -> int:
+    return len([s for s in statements if s.startswith("SELECT")])
+
+
+def test_loader_batches_primed_ids(session: Session, statements: list[str]):
+    hobbies = [Hobby(name=name) for name in ["Chess", "Go", "Painting"]]
+    session.add_all(hobbies)
+    session.commit()
+    ids = [hobby.id for hobby in hobbies]
+    missing = uuid4()
+
+    loader = crud.hobby_loader(session)
+    assert crud.hobby_loader(session) is loader
+    statements.clear()
+    loader.prime([*ids, missing])
+    assert loader.load(ids[1]).name == "Go"  # type: ignore
+    assert loader.load_many([ids[2], missing, ids[0]]) == [
+        hobbies[2], None, hobbies[0]]
+    assert _selects(statements) == 1
+    assert "= ANY" in statements[-1]
+
+
+def test_loader_skips_deleted_rows(session: Session):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure",
+                deleted_at=utcnow())
+    session.add(user)
+    session.commit()
+
+    assert crud.get_user_by_uuid(session, user.id) is None
+    assert crud.get_users_by_uuids(session, [user.id, uuid4()]) == []
+
+
+def test_loader_memo_cleared_on_commit(session: Session, statements: list[str]):
+    hobby_id = uuid4()
+    assert crud.get_hobby_by_uuid(session, hobby_id) is None
+
+    statements.clear()
+    assert crud.get_hobby_by_uuid(session, hobby_id) is None
+    assert _selects(statements) == 0
+
+    session.add(Hobby(id=hobby_id, name="Chess"))
+    session.commit()
+    assert crud.get_hobby_by_uuid(session, hobby_id).name == "Chess"  # type: ignore
+
+
+def test_loaders_are_per_session(session: Session):
+    other = Session(session.get_bind())
+    try:
+        assert crud.user_loader(other) is not crud.user_loader(session)
+    finally:
+        other.close()
+
+
+def test_user_hobbies_load_in_one_query(session: Session, statements: list[str]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    hobbies = [Hobby(name=f"Hobby {i}") for i in range(5)]
+    session.add_all([user, *hobbies,
+                     *(UserHobbyLink(user=user, hobby=h) for h in hobbies)])
+    session.commit()
+    user_id = user.id
+
+    statements.clear()
+    user = crud.get_user_by_uuid(session, user_id)
+    found = crud.get_hobbies_by_uuids(
+        session, [link.hobby_id for link in user.hobby_links])  # type: ignore
+    assert len(found) == 5
+    # The user, their links, then every hobby at once
+    assert _selects(statements) == 3
@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import delete, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from uuid import uuid4
+
+from app.models import Hobby, OutboxEvent, OutboxOffset, User, UserCreate, UserHobbyCreate, UserHobbyUpdate
+from app import crud
+
+
+def _events(session: Session) -> list[OutboxEvent]:
+    return list(session.exec(select(OutboxEvent).order_by(OutboxEvent.id)).all())  # type: ignore
+
+
+@pytest.fixture
+def committed(engine: Engine):
+    """Commits events for real, since only committed ones can be read"""
+    def commit(*types: str) -> list[int]:
+        with Session(engine) as session:
+            events = [crud.record_event(session, t) for t in types]
+            session.commit()
+            return [event.id for event in events]  # type: ignore
+    yield commit
+    with Session(engine) as session:
+        session.execute(delete(OutboxEvent))
+        session.execute(delete(OutboxOffset))
+        session.commit()
+
+
+def test_link_writes_record_events(session: Session):
+    user = crud.create_user(session, UserCreate(
+        username="outbox", name="Outbox", password="password"))
+    hobby = Hobby(name="Knitting")
+    session.add(hobby)
+    session.commit()
+
+    link = crud.create_user_hobby_link(
+        session, user.id, UserHobbyCreate(hobby_id=hobby.id, rating=3))
+    crud.update_user_hobby_link(session, link, UserHobbyUpdate(rating=4))
+    crud.update_user_hobby_ratings(session, {(user.id, hobby.id): 5})
+    crud.delete_user_hobby_link(session, link)
+    crud.delete_user(session, user)
+
+    events = _events(session)
+    assert [e.type for e in events] == [
+        crud.LINK_CREATED, crud.LINK_UPDATED, crud.LINK_UPDATED,
+        crud.LINK_DELETED, crud.USER_DELETED]
+    assert [e.payload.get("rating") for e in events] == [3, 4, 5, 5, None]
+    assert all(e.user_id == user.id for e in events)
+    assert events[0].hobby_id == hobby.id
+
+
+def test_events_roll_back_with_the_write(session: Session):
+    hobby = Hobby(name="Origami")
+    session.add(hobby)
+    session.commit()
+    with pytest.raises(RuntimeError):
+        with session.begin_nested():
+            crud.record_event(session, crud.HOBBY_DELETED, hobby_id=hobby.id)
+            session.flush()
+            raise RuntimeError
+    assert _events(session) == []
+
+
+def test_read_events_skips_running_transactions(session: Session):
+    crud.record_event(session, crud.USER_DELETED)
+    session.flush()
+    # The test's own transaction never commits, so its events are never due
+    assert crud.read_events(session, (0, 0), 10) == []
+    assert crud.get_outbox_head(session) == (0, 0)
+
+
+def test_read_events_in_transaction_order(session: Session, committed):
+    first = committed("a", "b")
+    second = committed("c")
+    events = crud.read_events(session, (0, 0), 10)
+    assert [e.id for e in events] == first + second
+    assert crud.get_outbox_head(session) == (events[-1].txid, second[0])
+
+    after = (events[0].txid, events[0].id)
+    assert [e.type for e in crud.read_events(session, after, 10)] == ["b", "c"]
+    assert [e.type for e in crud.read_events(session, after, 1)] == ["b"]
+
+
+
+def test_read_events_for_one_user(session: Session, engine: Engine, committed):
+    user_id, other_id = uuid4(), uuid4()
+    with Session(engine) as writer:
+        for type, uid in [(crud.LINK_CREATED, user_id), (crud.LINK_CREATED, other_id),
+                          (crud.HOBBY_DELETED, None), (crud.TOKEN_REVOKED, None),
+                          (crud.LINK_DELETED, user_id)]:
+            crud.record_event(writer, type, uid)
+        writer.commit()
+    events = crud.read_events(session, (0, 0), 10, user_id)
+    assert [e.type for e in events] == [
+        crud.LINK_CREATED, crud.HOBBY_DELETED, crud.LINK_DELETED]
+    assert crud.get_outbox_tail(session) == (events[0].txid, events[0].id)
+
+    # Read off the user's and the broadcasts' indexes, not a scan
+    session.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = "\n".join(session.execute(text(
+        "EXPLAIN SELECT * FROM outbox_events WHERE (txid, id) > (0, 0) "
+        "AND (user_id = :user_id OR type IN ('hobby.deleted')) "
+        "ORDER BY txid, id LIMIT 10"), {"user_id": user_id}).scalars())
+    assert "ix_outbox_events_user_id_txid_id" in plan
+    assert "ix_outbox_events_broadcasts" in plan
+
+
+def test_outbox_offsets(session: Session):
+    assert crud.get_outbox_offset(session, "mailer") == (0, 0)
+    crud.save_outbox_offset(session, "mailer", (10, 3))
+    crud.save_outbox_offset(session, "mailer", (12, 7))
+    session.expire_all()
+    assert crud.get_outbox_offset(session, "mailer") == (12, 7)
+
+
+def test_prune_outbox(session: Session):
+    crud.record_event(session, "old")
+    session.commit()
+    cutoff = session.execute(text("SELECT now() + interval '1 second'")).scalar_one()
+    assert crud.prune_outbox(session, cutoff) == 1
+    assert _events(session) == []
@@ -1,10 +1,12 @@
 import pytest
+import re
+from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session
 from uuid import uuid4
 
 from app.models import User, Hobby, UserHobbyLink, UserHobbyCreate, UserHobbyUpdate
-from app import crud
+from app import crud, ml
 
 
 def _make_user_and_hobby(session: Session) -> tuple[User, Hobby]:
@@ -86,3 +88,132 @@ def test_delete_user_hobby_link_removes_record(session: Session):
     assert session.get(UserHobbyLink, (user.id, hobby.id)) is None
     assert session.get(User, user.id) is not None
     assert session.get(Hobby, hobby.id) is not None
+
+
+def test_user_hobby_link_writes_patch_link_graph(session: Session):
+    user, hobby = _make_user_and_hobby(session)
+    graph = ml.get_link_graph(session)
+    assert graph.hobbies_of(user.id) == []
+
+    link = crud.create_user_hobby_link(
+        session, user.id, UserHobbyCreate(hobby_id=hobby.id))
+    assert graph.hobbies_of(user.id) == [(hobby.id, True, None)]
+
+    crud.update_user_hobby_link(session, link, UserHobbyUpdate(rating=4))
+    assert graph.users_of(hobby.id) == [(user.id, True, 4)]
+
+    crud.delete_user_hobby_link(session, link)
+    assert graph.hobbies_of(user.id) == []
+
+
+def test_get_hobby_user_links_paginates(session: Session):
+    hobby = Hobby(name="Gardening")
+    users = [User(username=f"user{i}", name="User", password_hash="pw12345678")
+             for i in range(3)]
+    links = [UserHobbyLink(user=u, hobby=hobby, interested=i != 1)
+             for i, u in enumerate(users)]
+    session.add_all([hobby, *users, *links])
+    session.commit()
+    user_ids = sorted(u.id for u in users)
+
+    page = crud.get_hobby_user_links(session, hobby.id, limit=2)
+    assert [u.id for u, _ in page] == user_ids[:2]
+
+    page = crud.get_hobby_user_links(
+        session, hobby.id, limit=2, after=user_ids[1])
+    assert [u.id for u, _ in page] == user_ids[2:]
+
+    page = crud.get_hobby_user_links(
+        session, hobby.id, limit=10, interested=False)
+    assert [u.id for u, _ in page] == [users[1].id]
+    assert page[0][1].interested is False
+
+
+def test_get_user_hobbies_pages_in_sql(session: Session, statements: list[str]):
+    user, gardening = _make_user_and_hobby(session)
+    chess, knitting = Hobby(name="Chess"), Hobby(name="Knitting")
+    session.add_all([chess, knitting,
+                     UserHobbyLink(user_id=user.id, hobby_id=gardening.id),
+                     UserHobbyLink(user_id=user.id, hobby_id=chess.id),
+                     UserHobbyLink(user_id=user.id, hobby_id=knitting.id)])
+    session.commit()
+    statements.clear()
+
+    assert crud.get_user_hobbies(session, user.id, limit=10) == [chess, gardening, knitting]
+    assert crud.get_user_hobbies(session, user.id, limit=1, offset=1) == [gardening]
+    queries = [statement for statement in statements if "FROM hobbies" in statement]
+    assert len(queries) == 2
+    assert all("LIMIT" in query for query in queries)
+
+
+def test_get_user_hobby_fields_pages_by_name(session: Session):
+    user, gardening = _make_user_and_hobby(session)
+    chess = Hobby(name="Chess", description="Board game")
+    session.add_all([chess,
+                     UserHobbyLink(user_id=user.id, hobby_id=gardening.id),
+                     UserHobbyLink(user_id=user.id, hobby_id=chess.id)])
+    session.commit()
+
+    assert crud.get_user_hobby_fields(session, user.id, ["name"], limit=10) == [
+        {"name": "Chess"}, {"name": "Gardening"}]
+    assert crud.get_user_hobby_fields(session, user.id, ["id"], limit=1, offset=1) == [
+        {"id": gardening.id}]
+
+
+def test_get_user_hobby_link_fields(session: Session):
+    user, hobby = _make_user_and_hobby(session)
+    session.add(UserHobbyLink(user_id=user.id, hobby_id=hobby.id, rating=4))
+    session.commit()
+
+    assert crud.get_user_hobby_link_fields(
+        session, user.id, hobby.id, ["rating"]) == {"rating": 4}
+    assert crud.get_user_hobby_link_fields(
+        session, user.id, uuid4(), ["rating"]) is None
+
+
+def test_create_user_hobby_links(session: Session):
+    user, gardening = _make_user_and_hobby(session)
+    chess = Hobby(name="Chess")
+    session.add(chess)
+    session.commit()
+
+    links = crud.create_user_hobby_links(session, user.id, [
+        UserHobbyCreate(hobby_id=gardening.id, rating=3),
+        UserHobbyCreate(hobby_id=chess.id, interested=False),
+    ])
+    assert [(link.hobby_id, link.rating) for link in links] == [
+        (gardening.id, 3), (chess.id, None)]
+    assert crud.get_user_hobby_link(session, user.id, chess.id).interested is False  # type: ignore
+
+
+def _partitions_scanned(session: Session, fn) -> list[int]:
+    """How many user_hobbies partitions each user_hobbies statement `fn` runs would scan"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "user_hobbies" in statement and not statement.startswith("EXPLAIN"):
+            executed.append((statement, parameters))
+
+    connection = session.connection()
+    event.listen(connection, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        event.remove(connection, "before_cursor_execute", record)
+    return [len(set(re.findall(r"user_hobbies_p\d+", "\n".join(connection.exec_driver_sql(
+                "EXPLAIN " + statement, parameters).scalars()))))
+            for statement, parameters in executed]
+
+
+def test_user_hobby_queries_prune_partitions(session: Session):
+    user, hobby = _make_user_and_hobby(session)
+    crud.create_user_hobby_link(
+        session, user.id, UserHobbyCreate(hobby_id=hobby.id, rating=1))
+    session.expire_all()
+
+    assert _partitions_scanned(session, lambda: crud.get_user_with_hobbies(
+        session, user.id, 10)) == [1]
+    assert _partitions_scanned(session, lambda: crud.update_user_hobby_ratings(
+        session, {(user.id, hobby.id): 3})) == [1]
+    assert _partitions_scanned(session, lambda: crud.get_user_hobby_fields(
+        session, user.id, ["name"], 10, 0)) == [1]
@@ -4,7 +4,8 @@ from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session
 from uuid import uuid4
 
-from app.models import User, UserCreate, UserUpdate, Hobby, UserHobbyLink
+from app.core.config import settings
+from app.models import User, UserCreate, UserUpdate, Hobby, UserHobbyLink, utcnow
 from app import crud
 
 
@@ -70,6 +71,70 @@ def test_get_user(session: Session):
     assert crud.get_user_by_email(session, "nope@example.com") is None
 
 
+def test_authenticate_user(session: Session):
+    user_in = UserCreate(username="beeyou", name="kiko", password="ultrasecure")
+    user = crud.create_user(session, user_in)
+
+    assert crud.authenticate_user(session, "beeyou", "ultrasecure") == user
+    assert crud.authenticate_user(session, "beeyou", "wrongpassword") is None
+    assert crud.authenticate_user(session, "nobody", "ultrasecure") is None
+
+
+def test_authenticate_user_rehashes_outdated_hash(session: Session, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    user = crud.create_user(session, UserCreate(
+        username="beeyou", name="kiko", password="ultrasecure"))
+    old_hash = user.password_hash
+
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    assert crud.authenticate_user(session, "beeyou", "ultrasecure") == user
+    assert user.password_hash != old_hash
+    assert user.password_hash.startswith("$2b$05$")
+
+    new_hash = user.password_hash
+    crud.authenticate_user(session, "beeyou", "ultrasecure")
+    assert user.password_hash == new_hash
+
+
+def test_get_user_with_hobbies(session: Session, statements: list[str]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    hobbies = [Hobby(name=name) for name in ["Painting", "Chess", "Knitting", "Archery"]]
+    hobbies[2].deleted_at = utcnow()
+    session.add_all([user, *hobbies,
+                     *(UserHobbyLink(user=user, hobby=h) for h in hobbies)])
+    session.commit()
+
+    user_id, chess_id = user.id, hobbies[1].id
+    statements.clear()
+    found = crud.get_user_with_hobbies(session, user_id, limit=2, offset=1)
+    assert len([s for s in statements if s.startswith("SELECT")]) == 1
+    assert found is not None
+    found_user, page = found
+    assert found_user.id == user_id
+    assert [h.name for h in page] == ["Chess", "Painting"]
+    assert page[0].id == chess_id
+
+    _, page = crud.get_user_with_hobbies(session, user.id, limit=10, offset=5)  # type: ignore
+    assert page == []
+    assert crud.get_user_with_hobbies(session, uuid4(), limit=10) is None
+
+    user.deleted_at = utcnow()
+    session.commit()
+    assert crud.get_user_with_hobbies(session, user.id, limit=10) is None
+
+
+def test_get_user_fields_selects_only_those_columns(session: Session, statements: list[str]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    session.add(user)
+    session.commit()
+    user_id = user.id
+
+    statements.clear()
+    assert crud.get_user_fields(session, user_id, ["username"]) == {"username": "beeyou"}
+    assert "password_hash" not in statements[-1]
+    assert crud.get_user_fields(session, uuid4(), ["username"]) is None
+
+
 def test_update_user_changes_fields(session: Session):
     user = User(username="up", name="Old Name",
                 email="old@example.com", password_hash="oldpassword")
@@ -0,0 +1,56 @@
+import hashlib
+import os
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, URL, make_url
+from sqlalchemy.pool import NullPool
+import alembic
+from alembic.config import Config as AlembicConfig
+
+from app.core.config import settings
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
+
+# Serializes template checks and clones across pytest-xdist workers
+PROVISION_LOCK_KEY = 0x686F6262
+
+
+def database_url(name: str) -> URL:
+    return make_url(str(settings.TEST_DATABASE_URL)).set(database=name)
+
+
+def migrations_fingerprint() -> str:
+    """Hash of every migration script, so editing one rebuilds the template"""
+    digest = hashlib.sha256()
+    versions = os.path.join(MIGRATIONS_DIR, "versions")
+    for name in sorted(os.listdir(versions)):
+        if name.endswith(".py"):
+            with open(os.path.join(versions, name), "rb") as f:
+                digest.update(name.encode() + f.read())
+    return digest.hexdigest()
+
+
+def migrate(url: URL, revision: str = "head", downgrade: bool = False):
+    engine = create_engine(url, poolclass=NullPool)
+    alembic_cfg = AlembicConfig("alembic.ini")
+    alembic_cfg.attributes["connection"] = engine
+    if downgrade:
+        alembic.command.downgrade(alembic_cfg, revision)
+    else:
+        alembic.command.upgrade(alembic_cfg, revision)
+    engine.dispose()
+
+
+def ensure_template(conn: Connection, template: str):
+    """Migrate a template database once, until the migrations change"""
+    fingerprint = migrations_fingerprint()
+    current = conn.execute(text(
+        "SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = :name"),
+        {"name": template}).scalar()
+    if current == fingerprint:
+        return
+
+    conn.execute(text(f'DROP DATABASE IF EXISTS "{template}"'))
+    conn.execute(text(f'CREATE DATABASE "{template}"'))
+    migrate(database_url(template))
+    conn.execute(
+        text(f"COMMENT ON DATABASE \"{template}\" IS '{fingerprint}'"))
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session
+from uuid import uuid4
+
+from app.db.database import make_engine, pipeline
+from app.models import Hobby
+from app import crud
+
+
+def test_make_engine_picks_driver(engine: Engine):
+    assert make_engine(engine.url, driver="psycopg2").url.drivername == "postgresql+psycopg2"
+    with pytest.raises(ValueError):
+        make_engine(engine.url, driver="asyncpg")
+
+
+def test_hot_lookups_are_prepared_on_psycopg(engine: Engine):
+    pytest.importorskip("psycopg")
+    psycopg_engine = make_engine(engine.url, driver="psycopg", poolclass=NullPool)
+    try:
+        with Session(psycopg_engine) as other:
+            crud.get_hobby_by_name(other, "Chess")
+            crud.get_user_by_uuid(other, uuid4())
+            prepared = other.connection().exec_driver_sql(
+                "SELECT statement FROM pg_prepared_statements").scalars().all()
+    finally:
+        psycopg_engine.dispose()
+    assert any("hobbies.name = " in statement for statement in prepared)
+    assert any("= ANY" in statement for statement in prepared)
+
+
+def test_pipeline_writes(session: Session):
+    with pipeline(session):
+        session.add_all([Hobby(name="Chess"), Hobby(name="Go")])
+        session.flush()
+    session.commit()
+    assert crud.get_hobby_by_name(session, "Go") is not None
@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Engine
+from sqlmodel import create_engine
+
+from app.tests.databases import database_url, migrate
+
+
+def test_migrations_upgrade_and_downgrade(admin_engine: Engine):
+    name = f"{admin_engine.url.database}_migrations"
+    url = database_url(name)
+    with admin_engine.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    try:
+        migrate(url)
+        migrate(url, "base", downgrade=True)
+        engine = create_engine(url)
+        assert inspect(engine).get_table_names() == ["alembic_version"]
+        engine.dispose()
+        migrate(url)
+    finally:
+        with admin_engine.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+
+
+def test_partition_user_hobbies_keeps_links(admin_engine: Engine):
+    name = f"{admin_engine.url.database}_partitions"
+    url = database_url(name)
+    with admin_engine.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    engine = create_engine(url)
+
+    def links_and_stats():
+        with engine.connect() as conn:
+            partitioned = conn.execute(text(
+                "SELECT count(*) FROM pg_partitioned_table "
+                "WHERE partrelid = 'user_hobbies'::regclass")).scalar_one()
+            links = conn.execute(text(
+                "SELECT user_id::text, rating FROM user_hobbies ORDER BY user_id")).all()
+            stats = conn.execute(text(
+                "SELECT sum(link_count), sum(rating_sum) FROM hobby_stats")).one()
+        return bool(partitioned), links, tuple(stats)
+
+    try:
+        migrate(url, "c9e5a7f3d1b6")
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO users (id, username, name, password_hash)
+                SELECT gen_random_uuid(), 'user' || i, 'User', 'x'
+                FROM generate_series(1, 20) i;
+                INSERT INTO hobbies (id, name) VALUES (gen_random_uuid(), 'Chess');
+                INSERT INTO user_hobbies (interested, rating, user_id, hobby_id)
+                SELECT true, 3, users.id, hobbies.id FROM users, hobbies;
+            """))
+        _, links, stats = links_and_stats()
+
+        migrate(url)
+        assert links_and_stats() == (True, links, stats)
+        with engine.connect() as conn:
+            # Links are spread over partitions, and lookups by user prune
+            # all but one
+            used = conn.execute(text(
+                "SELECT count(DISTINCT tableoid) FROM user_hobbies")).scalar_one()
+            assert used > 1
+            plan = conn.execute(text(
+                "EXPLAIN SELECT * FROM user_hobbies WHERE user_id = :user_id"),
+                {"user_id": links[0][0]}).scalars().all()
+            assert sum("user_hobbies_p" in line for line in plan) == 1
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM hobbies"))
+        assert links_and_stats()[1] == []
+
+        migrate(url, "c9e5a7f3d1b6", downgrade=True)
+        assert links_and_stats()[0] is False
+    finally:
+        engine.dispose()
+        with admin_engine.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+
+
+def test_rating_check_clamps_existing_ratings(admin_engine: Engine):
+    name = f"{admin_engine.url.database}_ratings"
+    url = database_url(name)
+    with admin_engine.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    engine = create_engine(url)
+    try:
+        migrate(url, "a3c9e6f1b2d4")
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO users (id, username, name, password_hash)
+                SELECT gen_random_uuid(), 'user' || i, 'User', 'x'
+                FROM generate_series(1, 3) i;
+                INSERT INTO hobbies (id, name) VALUES (gen_random_uuid(), 'Chess');
+                INSERT INTO user_hobbies (interested, rating, user_id, hobby_id)
+                SELECT true, (ARRAY[-3, 4, 40000])[row_number() OVER (ORDER BY users.id)],
+                       users.id, hobbies.id
+                FROM users, hobbies;
+            """))
+
+        migrate(url)
+        with engine.connect() as conn:
+            ratings = conn.execute(text(
+                "SELECT rating FROM user_hobbies ORDER BY rating")).scalars().all()
+            rating_sum = conn.execute(text(
+                "SELECT rating_sum FROM hobby_stats")).scalar_one()
+        assert (ratings, rating_sum) == ([0, 4, 5], 9)
+        with pytest.raises(IntegrityError):
+            with engine.begin() as conn:
+                conn.execute(text("UPDATE user_hobbies SET rating = 6"))
+    finally:
+        engine.dispose()
+        with admin_engine.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
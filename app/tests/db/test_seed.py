@@ -76,3 +76,12 @@ def test_seed_hobbies_data_duplicates(mock_hobbies_seed_csv: StringIO, session:
     hobby = session.exec(select(Hobby).where(Hobby.name == "Gardening")).one()
     assert hobby.id is not None
     assert hobby.description == "Initial description"
+
+
+def test_seed_hobbies_data_in_batches(mock_hobbies_seed_csv: StringIO, session: Session, statements: list[str]):
+    statements.clear()
+    seed.seed_hobbies_data(mock_hobbies_seed_csv, session, batch_size=2)
+
+    assert len([s for s in statements if s.startswith("INSERT")]) == 2
+    hobby_count = session.exec(select(func.count()).select_from(Hobby)).one()
+    assert hobby_count == 3
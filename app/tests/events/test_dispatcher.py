@@ -0,0 +1,203 @@
+import pytest
+import threading
+import time
+from sqlalchemy import delete, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from uuid import uuid4
+
+from app.core.security import create_access_token, decode_access_token, token_denylist
+from app.models import OutboxEvent, OutboxOffset
+from app import crud, events, ml
+
+
+@pytest.fixture
+def commit_events(engine: Engine):
+    def commit(*types: str, **kwargs) -> None:
+        with Session(engine) as session:
+            for t in types:
+                crud.record_event(session, t, **kwargs)
+            session.commit()
+    yield commit
+    with Session(engine) as session:
+        session.execute(delete(OutboxEvent))
+        session.execute(delete(OutboxOffset))
+        session.commit()
+
+
+def test_position_round_trip():
+    position = events.Position(123, 45)
+    assert str(position) == "123.45"
+    assert events.Position.parse("123.45") == position
+    for invalid in ("", "12", "a.b", "-1.2"):
+        with pytest.raises(ValueError):
+            events.Position.parse(invalid)
+
+
+def test_poll_delivers_new_events_in_batches(engine: Engine, commit_events):
+    commit_events("before")
+    dispatcher = events.EventDispatcher(bind=engine, batch_size=2)
+    with Session(engine) as session:
+        dispatcher.head = events.Position(*crud.get_outbox_head(session))
+    received: list[list[str]] = []
+    unsubscribe = dispatcher.subscribe(
+        lambda batch: received.append([e.type for e in batch]))
+
+    commit_events("a", "b", "c")
+    dispatcher.poll()
+    assert received == [["a", "b"], ["c"]]
+
+    unsubscribe()
+    commit_events("d")
+    dispatcher.poll()
+    assert len(received) == 2
+    assert dispatcher.stats()["delivered"] == 4
+
+
+def test_failing_subscriber_does_not_stop_delivery(engine: Engine, commit_events):
+    dispatcher = events.EventDispatcher(bind=engine)
+    received = []
+
+    def fail(batch):
+        raise RuntimeError
+    dispatcher.subscribe(fail)
+    dispatcher.subscribe(received.extend)
+    commit_events("a")
+    dispatcher.poll()
+    assert [e.type for e in received] == ["a"]
+    assert dispatcher.errors == 1
+
+
+def test_consumer_resumes_from_stored_offset(engine: Engine, commit_events):
+    commit_events("a", "b")
+    received = []
+    dispatcher = events.EventDispatcher(bind=engine)
+    dispatcher.add_consumer("audit", received.extend)
+    dispatcher._listen()
+    try:
+        dispatcher.poll()
+    finally:
+        dispatcher._close_listener()
+    assert [e.type for e in received] == ["a", "b"]
+
+    commit_events("c")
+    # Another worker's dispatcher picks up where the first left off
+    received.clear()
+    other = events.EventDispatcher(bind=engine)
+    other.add_consumer("audit", received.extend)
+    other._listen()
+    try:
+        other.poll()
+        assert other.stats()["consumers"]["audit"] == str(received[-1].position)
+    finally:
+        other._close_listener()
+    assert [e.type for e in received] == ["c"]
+
+
+def test_consumer_runs_in_one_worker_at_a_time(engine: Engine, commit_events):
+    commit_events("a")
+    first, second = events.EventDispatcher(bind=engine), events.EventDispatcher(bind=engine)
+    received = {"first": [], "second": []}
+    first.add_consumer("audit", received["first"].extend)
+    second.add_consumer("audit", received["second"].extend)
+    first._listen()
+    second._listen()
+    try:
+        first.poll()
+        second.poll()
+    finally:
+        first._close_listener()
+        second._close_listener()
+    assert len(received["first"]) == 1
+    assert received["second"] == []
+
+
+def test_dispatcher_thread_wakes_on_notify(engine: Engine, commit_events):
+    dispatcher = events.EventDispatcher(bind=engine, poll_interval=60)
+    delivered = threading.Event()
+    dispatcher.subscribe(lambda batch: delivered.set())
+    dispatcher.start()
+    try:
+        # Written once LISTENing, so the write is notified
+        deadline = time.monotonic() + 5
+        while not dispatcher.stats()["listening"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        commit_events("a")
+        assert delivered.wait(5)
+        # The first poll may have read it ahead of the notification
+        while dispatcher.notifications < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert dispatcher.notifications >= 1
+    finally:
+        dispatcher.stop()
+    assert not dispatcher.stats()["listening"]
+
+
+
+def test_dispatcher_thread_retries_events_held_back(engine: Engine, commit_events):
+    dispatcher = events.EventDispatcher(bind=engine, poll_interval=60)
+    delivered = threading.Event()
+    dispatcher.subscribe(lambda batch: delivered.set())
+    dispatcher.start()
+    try:
+        with Session(engine) as older:
+            older.execute(text("SELECT pg_current_xact_id()"))
+            commit_events("a")
+            assert not delivered.wait(0.2)
+        # Readable once the older transaction ends, which notifies nobody
+        assert delivered.wait(5)
+    finally:
+        dispatcher.stop()
+
+
+def test_apply_to_caches(engine: Engine, commit_events):
+    graph = ml.LinkGraph()
+    user_id, hobby_id = uuid4(), uuid4()
+    with Session(engine) as session:
+        for t, payload in [(crud.LINK_CREATED, {"interested": True, "rating": 2}),
+                           (crud.LINK_UPDATED, {"interested": True, "rating": 4})]:
+            crud.record_event(session, t, user_id, hobby_id, payload)
+        session.commit()
+    ml.suggestion_cache.put(user_id, 1, 10, [hobby_id])
+
+    dispatcher = events.EventDispatcher(bind=engine)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(ml.link_graph, "_link_graph", graph)
+        events.apply_to_caches(dispatcher.read(events.Position(0, 0)))
+        assert graph.hobbies_of(user_id) == [(hobby_id, True, 4)]
+        assert ml.suggestion_cache.get(user_id, 1, 10) is None
+
+        commit_events(crud.LINK_DELETED, user_id=user_id, hobby_id=hobby_id)
+        events.apply_to_caches(dispatcher.read(events.Position(0, 0))[-1:])
+        assert graph.hobbies_of(user_id) == []
+
+
+
+def test_apply_to_caches_indexes_created_hobbies(engine: Engine, commit_events):
+    with Session(engine) as session:
+        index = ml.get_hobby_index(session)
+    hobby_id = uuid4()
+    # As created by another worker
+    commit_events(crud.HOBBY_CREATED, hobby_id=hobby_id,
+                  payload={"name": "Origami", "description": "Paper folding"})
+
+    dispatcher = events.EventDispatcher(bind=engine)
+    events.apply_to_caches(dispatcher.read(events.Position(0, 0)))
+    assert hobby_id in index
+
+
+def test_restore_token_denylist(engine: Engine, commit_events):
+    user_id = uuid4()
+    token = decode_access_token(create_access_token(uuid4()))
+    old = decode_access_token(create_access_token(user_id, now=1000.0), now=1000.0)
+    with Session(engine) as session:
+        crud.revoke_token(session, token)
+        crud.revoke_user_tokens(session, user_id)
+    try:
+        # As in a worker started after the revocations
+        token_denylist.clear()
+        events.restore_token_denylist()
+        assert token_denylist.is_revoked(token)
+        assert token_denylist.is_revoked(old)
+    finally:
+        token_denylist.clear()
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from app import crud, events
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        return lambda: self.subscribers.remove(callback)
+
+
+def _event(type: str, user_id=None, hobby_id=None) -> events.Event:
+    return events.Event(events.Position(1, 1), type, user_id, hobby_id, {},
+                        datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+
+def test_hub_routes_events_to_their_users_listeners():
+    dispatcher = FakeDispatcher()
+    hub = events.UserEventHub(dispatcher)  # type: ignore
+    assert len(dispatcher.subscribers) == 1
+
+    alice, bob, carol = uuid4(), uuid4(), uuid4()
+    received = {alice: [], bob: [], "alice2": []}
+    hub.listen(alice, received[alice].append)
+    hub.listen(alice, received["alice2"].append)
+    unlisten_bob = hub.listen(bob, received[bob].append)
+    assert hub.stats() == {"users": 2, "listeners": 3}
+
+    batch = [_event(crud.LINK_CREATED, alice), _event(crud.LINK_DELETED, carol),
+             _event(crud.LINK_UPDATED, alice)]
+    hub.publish(batch)
+    assert received[alice] == [[batch[0], batch[2]]]
+    assert received["alice2"] == received[alice]
+    assert received[bob] == []
+
+    unlisten_bob()
+    unlisten_bob()
+    assert hub.stats() == {"users": 1, "listeners": 2}
+
+
+def test_hub_broadcasts_hobby_deletes():
+    hub = events.UserEventHub(FakeDispatcher())  # type: ignore
+    alice, bob = uuid4(), uuid4()
+    received = {alice: [], bob: []}
+    for user_id in received:
+        hub.listen(user_id, received[user_id].append)
+
+    link = _event(crud.LINK_CREATED, alice)
+    deleted = _event(crud.HOBBY_DELETED, hobby_id=uuid4())
+    hub.publish([link, deleted])
+    assert received[alice] == [[link, deleted]]
+    assert received[bob] == [[deleted]]
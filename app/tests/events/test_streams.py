@@ -0,0 +1,226 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from sqlalchemy import delete
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from uuid import uuid4
+
+from app.models import Hobby, OutboxEvent, User, UserHobbyLink
+from app import crud, events
+
+
+class FakeDispatcher:
+    batch_size = 2
+
+    def __init__(self, stored: list[events.Event] = []):
+        self.stored = stored
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        return lambda: self.subscribers.remove(callback)
+
+    def read(self, after, limit=None, user_id=None):
+        return [e for e in self.stored if e.position > after and (
+            user_id is None or e.user_id == user_id or e.type in crud.BROADCAST_TYPES)
+        ][:self.batch_size]
+
+    def retains(self, after):
+        return not self.stored or after >= self.stored[0].position
+
+    def publish(self, *batch: events.Event):
+        for callback in self.subscribers:
+            callback(list(batch))
+
+
+def _event(txid: int, type: str = "link.updated", **kwargs) -> events.Event:
+    return events.Event(events.Position(txid, txid), type, kwargs.get("user_id"),
+                        kwargs.get("hobby_id"), {"rating": txid},
+                        datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+
+def _collect(stream: events.EventStream, dispatcher: FakeDispatcher, publish=(), count: int = 1) -> list[bytes]:
+    async def run():
+        frames = []
+        agen = stream.__aiter__()
+        # Started before publishing, so the stream is subscribed by then
+        pending = asyncio.ensure_future(agen.__anext__())
+        await asyncio.sleep(0.05)
+        for batch in publish:
+            dispatcher.publish(*batch)
+        try:
+            while len(frames) < count:
+                frames.append(await asyncio.wait_for(pending, 5))
+                pending = asyncio.ensure_future(agen.__anext__())
+        except StopAsyncIteration:
+            pass
+        pending.cancel()
+        await agen.aclose()
+        return frames
+    return asyncio.run(run())
+
+
+def test_format_event():
+    user_id = uuid4()
+    frame = events.format_event(_event(7, user_id=user_id)).decode()
+    lines = frame.split("\n")
+    assert lines[:2] == ["id: 7.7", "event: link.updated"]
+    assert frame.endswith("\n\n")
+    data = json.loads(lines[2].removeprefix("data: "))
+    assert data["user_id"] == str(user_id)
+    assert data["payload"] == {"rating": 7}
+
+
+def test_stream_replays_backlog_then_goes_live_without_repeats():
+    dispatcher = FakeDispatcher([_event(1), _event(2), _event(3), _event(4)])
+    stream = events.EventStream(dispatcher, after=events.Position(1, 1))  # type: ignore
+    frames = _collect(stream, dispatcher, publish=[[_event(4), _event(5)]], count=4)
+    ids = [f.split(b"\n")[0] for f in frames]
+    assert ids == [b"id: 2.2", b"id: 3.3", b"id: 4.4", b"id: 5.5"]
+    assert dispatcher.subscribers == []
+
+
+def test_stream_filters_events():
+    user_id = uuid4()
+    dispatcher = FakeDispatcher()
+    stream = events.EventStream(dispatcher,  # type: ignore
+                                accept=lambda e: e.user_id == user_id)
+    frames = _collect(stream, dispatcher,
+                      publish=[[_event(1), _event(2, user_id=user_id)]])
+    assert frames[0].startswith(b"id: 2.2")
+
+
+def test_stream_sends_heartbeats_and_closes():
+    closed = []
+    dispatcher = FakeDispatcher()
+    stream = events.EventStream(dispatcher, heartbeat=0.01,  # type: ignore
+                                closed=lambda: bool(closed))
+    frames = _collect(stream, dispatcher)
+    assert frames == [events.HEARTBEAT]
+
+    closed.append(True)
+    assert _collect(stream, dispatcher) == []
+
+
+def test_stream_disconnects_clients_that_fall_behind():
+    dispatcher = FakeDispatcher()
+    stream = events.EventStream(dispatcher, queue_size=1)  # type: ignore
+    frames = _collect(stream, dispatcher, publish=[[_event(1), _event(2)]], count=3)
+    assert stream.overflowed
+    assert frames == []
+
+
+class FakeHub:
+    def __init__(self, dispatcher: FakeDispatcher | None = None):
+        self.dispatcher = dispatcher
+        self.listeners = {}
+
+    def listen(self, user_id, callback):
+        self.listeners[user_id] = callback
+        return lambda: self.listeners.pop(user_id)
+
+    def publish(self, *batch: events.Event):
+        for callback in list(self.listeners.values()):
+            callback(list(batch))
+
+
+def _names(frames: list[bytes]) -> list[str]:
+    return ["heartbeat" if f == events.HEARTBEAT else
+            next(line for line in f.decode().split("\n") if line.startswith("event: "))[7:]
+            for f in frames]
+
+
+def test_user_stream_refreshes_suggestions_after_changes():
+    user_id, suggested = uuid4(), uuid4()
+    loads = []
+
+    def load(uid, limit):
+        loads.append((uid, limit))
+        return {"user_id": str(uid), "suggestions": [{"id": str(suggested)}]}
+
+    def collect(*batch: events.Event, count: int) -> list[str]:
+        hub = FakeHub()
+        stream = events.UserStream(hub, user_id, 5, load=load, heartbeat=0.1)  # type: ignore
+        frames = _names(_collect(stream, hub, publish=[batch], count=count))  # type: ignore
+        assert hub.listeners == {}
+        return frames
+
+    # One refresh for a burst of link events
+    assert collect(_event(1, user_id=user_id), _event(2, user_id=user_id), count=4) == [
+        "suggestions", "link.updated", "link.updated", "suggestions"]
+    assert loads == [(user_id, 5)] * 2
+
+    loads.clear()
+    assert collect(_event(3, crud.HOBBY_DELETED, hobby_id=suggested), count=3) == [
+        "suggestions", "hobby.deleted", "suggestions"]
+    assert len(loads) == 2
+
+    # None for a hobby that wasn't being suggested
+    loads.clear()
+    assert collect(_event(4, crud.HOBBY_DELETED, hobby_id=uuid4()), count=3) == [
+        "suggestions", "hobby.deleted", "heartbeat"]
+    assert len(loads) == 1
+
+
+def test_user_stream_starts_from_initial_suggestions_and_ends_with_user():
+    user_id = uuid4()
+    initial = {"user_id": str(user_id), "suggestions": []}
+    hub = FakeHub()
+    stream = events.UserStream(hub, user_id, initial=initial,  # type: ignore
+                               load=lambda *args: None)
+    frames = _collect(stream, hub, count=5, publish=[
+        [_event(1, crud.USER_DELETED, user_id=user_id), _event(2, user_id=user_id)]])
+    assert _names(frames) == ["suggestions", "user.deleted"]
+    assert json.loads(frames[0].split(b"data: ")[1]) == initial
+
+
+
+def test_user_stream_resumes_from_the_outbox():
+    user_id, suggested = uuid4(), uuid4()
+    stored = [_event(1, user_id=user_id), _event(2, user_id=uuid4()),
+              _event(3, crud.HOBBY_DELETED, hobby_id=suggested),
+              _event(4, crud.HOBBY_CREATED, hobby_id=uuid4()),
+              _event(5, user_id=user_id)]
+    hub = FakeHub(FakeDispatcher(stored))
+    initial = {"user_id": str(user_id), "suggestions": [{"id": str(suggested)}]}
+    loads = []
+    stream = events.UserStream(hub, user_id, initial=initial, after=events.Position(1, 1),  # type: ignore
+                               load=lambda *args: loads.append(args) or initial, heartbeat=0.1)
+    # The live copy of a replayed event is skipped
+    frames = _collect(stream, hub, count=5,  # type: ignore
+                      publish=[[stored[4]], [_event(6, user_id=user_id)]])
+    assert [f.split(b"\n")[0] for f in frames] == [
+        b"event: suggestions", b"id: 3.3", b"id: 5.5", b"id: 6.6", b"event: suggestions"]
+    assert len(loads) == 1
+
+
+def test_user_stream_sends_a_snapshot_for_expired_positions():
+    user_id = uuid4()
+    hub = FakeHub(FakeDispatcher([_event(2, user_id=user_id), _event(3, user_id=user_id)]))
+    initial = {"user_id": str(user_id), "suggestions": []}
+    stream = events.UserStream(hub, user_id, initial=initial, after=events.Position(1, 1),  # type: ignore
+                               load=lambda *args: initial, heartbeat=0.1)
+    frames = _collect(stream, hub, count=2)  # type: ignore
+    assert _names(frames) == ["suggestions", "heartbeat"]
+
+
+def test_load_user_suggestions(engine: Engine):
+    with Session(engine) as session:
+        user = User(username="streamer", name="Streamer", password_hash="x")
+        liked, other = Hobby(name="Rock climbing"), Hobby(name="Bouldering climbing")
+        session.add_all([user, liked, other, UserHobbyLink(user=user, hobby=liked)])
+        session.commit()
+        user_id, other_id = user.id, other.id
+    try:
+        suggestions = events.load_user_suggestions(user_id, 5)
+        assert suggestions["user_id"] == str(user_id)  # type: ignore
+        assert [h["id"] for h in suggestions["suggestions"]] == [str(other_id)]  # type: ignore
+        assert events.load_user_suggestions(uuid4(), 5) is None
+    finally:
+        with Session(engine) as session:
+            session.execute(delete(UserHobbyLink))
+            session.execute(delete(User))
+            session.execute(delete(Hobby))
+            session.execute(delete(OutboxEvent))
+            session.commit()
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from sqlmodel import Session
+
+from app.models import DeletionJob, Hobby, HobbyStats, User, UserHobbyLink, utcnow
+from app import crud, jobs
+
+
+def _make_hobby_with_links(session: Session, n_users: int) -> tuple[Hobby, list[User]]:
+    hobby = Hobby(name="Popular")
+    users = [User(username=f"user{i}", name="User", password_hash="password")
+             for i in range(n_users)]
+    links = [UserHobbyLink(user=u, hobby=hobby) for u in users]
+    session.add_all([hobby, *users, *links])
+    session.commit()
+    return hobby, users
+
+
+def test_mark_hobby_deleted_hides_hobby(session: Session):
+    hobby, _ = _make_hobby_with_links(session, 3)
+
+    job = crud.mark_hobby_deleted(session, hobby)
+    assert job.status == "pending"
+    assert job.target_table == "hobbies"
+    assert job.links_total == 3
+
+    assert crud.get_hobby_by_uuid(session, hobby.id) is None
+    assert crud.get_hobbies_by_uuids(session, [hobby.id]) == []
+    assert session.get(Hobby, hobby.id) is not None
+
+
+def test_run_deletion_job_purges_hobby_in_batches(session: Session):
+    hobby, users = _make_hobby_with_links(session, 5)
+    hobby_id, user_id = hobby.id, users[0].id
+    job = crud.mark_hobby_deleted(session, hobby)
+
+    jobs.run_deletion_job(session.get_bind(), job.id, batch_size=2, pause=0)
+
+    session.expire_all()
+    job = session.get(DeletionJob, job.id)
+    assert job is not None
+    assert job.status == "done"
+    assert job.links_deleted == 5
+    assert session.get(Hobby, hobby_id) is None
+    assert session.get(HobbyStats, hobby_id) is None
+    assert session.get(UserHobbyLink, (user_id, hobby_id)) is None
+    assert session.get(User, user_id) is not None
+
+
+def test_run_deletion_job_purges_user(session: Session):
+    hobby, users = _make_hobby_with_links(session, 2)
+    hobby_id, user_id = hobby.id, users[0].id
+    job = crud.mark_user_deleted(session, users[0])
+    assert crud.get_user_by_uuid(session, user_id) is None
+
+    jobs.run_deletion_job(session.get_bind(), job.id, batch_size=1, pause=0)
+
+    session.expire_all()
+    assert session.get(User, user_id) is None
+    stats = session.get(HobbyStats, hobby_id)
+    assert stats is not None
+    assert stats.link_count == 1
+
+
+def test_claim_deletion_job_skips_jobs_being_run(session: Session):
+    hobby, _ = _make_hobby_with_links(session, 1)
+    job = crud.mark_hobby_deleted(session, hobby)
+    stale_before = utcnow() - timedelta(minutes=5)
+
+    claimed = crud.claim_deletion_job(session, job.id, stale_before)
+    assert claimed is not None and claimed.status == "running"
+    assert crud.claim_deletion_job(session, job.id, stale_before) is None
+    assert crud.get_unfinished_deletion_jobs(session, stale_before) == []
+
+    # Abandoned: no progress since before the lease
+    claimed.updated_at = utcnow() - timedelta(minutes=10)
+    session.add(claimed)
+    session.commit()
+    assert [j.id for j in crud.get_unfinished_deletion_jobs(session, stale_before)] == [job.id]
+    assert crud.claim_deletion_job(session, job.id, stale_before) is not None
+
+
+def test_run_deletion_job_leaves_running_job_alone(session: Session):
+    hobby, _ = _make_hobby_with_links(session, 2)
+    hobby_id = hobby.id
+    job = crud.mark_hobby_deleted(session, hobby)
+    crud.claim_deletion_job(session, job.id, utcnow())
+
+    jobs.run_deletion_job(session.get_bind(), job.id, batch_size=1, pause=0)
+
+    session.expire_all()
+    job = session.get(DeletionJob, job.id)
+    assert job is not None
+    assert job.status == "running"
+    assert job.links_deleted == 0
+    assert session.get(Hobby, hobby_id) is not None
@@ -0,0 +1,100 @@
+import pytest
+import threading
+from sqlmodel import Session
+from unittest.mock import patch
+from uuid import uuid4
+
+from app.models import Hobby, User, UserHobbyLink
+from app import crud, jobs
+
+
+def _make_links(session: Session, n_hobbies: int) -> tuple[User, list[Hobby]]:
+    user = User(username="rater", name="Rater", password_hash="password")
+    hobbies = [Hobby(name=f"Hobby {i}") for i in range(n_hobbies)]
+    session.add_all([user, *hobbies,
+                     *(UserHobbyLink(user=user, hobby=h, rating=1) for h in hobbies)])
+    session.commit()
+    return user, hobbies
+
+
+def test_rating_buffer_coalesces_and_flushes_in_one_update(session: Session, statements: list[str]):
+    user, hobbies = _make_links(session, 3)
+    buffer = jobs.RatingBuffer(bind=session.get_bind())
+
+    for rating in (2, 3, 4):
+        buffer.put(user.id, hobbies[0].id, rating)
+    buffer.put(user.id, hobbies[1].id, None)
+    buffer.put(user.id, uuid4(), 5)
+    assert len(buffer) == 3
+    assert buffer.get(user.id, hobbies[0].id) == (True, 4)
+
+    statements.clear()
+    assert buffer.flush() == 2
+    assert len([s for s in statements if s.startswith("UPDATE")]) == 1
+    assert any("FROM (VALUES" in s for s in statements)
+    assert len(buffer) == 0
+    assert buffer.stats()["accepted"] == 5
+
+    session.expire_all()
+    ratings = [crud.get_user_hobby_link(session, user.id, h.id).rating  # type: ignore
+               for h in hobbies]
+    assert ratings == [4, None, 1]
+
+
+def test_rating_buffer_keeps_batch_when_flush_fails(session: Session):
+    user, hobbies = _make_links(session, 1)
+    buffer = jobs.RatingBuffer(bind=session.get_bind())
+    buffer.put(user.id, hobbies[0].id, 2)
+
+    with patch.object(crud, "update_user_hobby_ratings", side_effect=RuntimeError):
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+    assert buffer.get(user.id, hobbies[0].id) == (True, 2)
+    assert buffer.failures == 1
+
+    buffer.stop()
+    assert len(buffer) == 0
+    session.expire_all()
+    assert crud.get_user_hobby_link(session, user.id, hobbies[0].id).rating == 2  # type: ignore
+
+
+def test_rating_buffer_flushes_when_full():
+    buffer = jobs.RatingBuffer(interval=60, max_pending=2)
+    flushed = threading.Event()
+    with patch.object(buffer, "flush", side_effect=lambda: flushed.set()):
+        buffer.start()
+        buffer.put(uuid4(), uuid4(), 1)
+        assert not flushed.wait(0.05)
+        buffer.put(uuid4(), uuid4(), 1)
+        assert flushed.wait(5)
+        buffer.stop()
+
+
+def test_rating_buffer_pop_waits_for_flush_of_the_link():
+    buffer = jobs.RatingBuffer()
+    user_id, hobby_id, other_id = uuid4(), uuid4(), uuid4()
+    buffer.put(user_id, hobby_id, 2)
+    buffer.put(user_id, other_id, 3)
+    writing, failed = threading.Event(), threading.Event()
+
+    def update(session, batch):
+        writing.set()
+        failed.wait(5)
+        raise RuntimeError
+    popped = []
+    with patch.object(crud, "update_user_hobby_ratings", side_effect=update):
+        flusher = threading.Thread(target=lambda: pytest.raises(RuntimeError, buffer.flush))
+        flusher.start()
+        assert writing.wait(5)
+        popper = threading.Thread(target=lambda: popped.append(buffer.pop(user_id, hobby_id)))
+        popper.start()
+        popper.join(0.05)
+        assert popper.is_alive()
+        failed.set()
+        flusher.join(5)
+        popper.join(5)
+
+    # The popping writer applies the rating; the failed flush doesn't retry it
+    assert popped == [(True, 2)]
+    assert buffer.get(user_id, hobby_id) == (False, None)
+    assert buffer.get(user_id, other_id) == (True, 3)
@@ -0,0 +1,55 @@
+from uuid import uuid4
+
+from app.ml import HobbyIndex
+from app.ml.evaluate import LinkRow, evaluate, ndcg_at_k, recall_at_k, split_links
+from app.models import Hobby
+
+
+def test_split_links_holds_out_interests():
+    user_id = uuid4()
+    hobby_ids = [uuid4() for _ in range(5)]
+    uninterested = uuid4()
+    links = [LinkRow(user_id, h_id, True, None) for h_id in hobby_ids]
+    links.append(LinkRow(user_id, uninterested, False, None))
+
+    split = split_links(links, holdout=0.4)[user_id]
+    assert len(split.held_out) == 2
+    assert len(split.liked) == 3
+    assert split.held_out.isdisjoint(split.liked)
+    assert uninterested in split.seen
+    assert split.held_out.isdisjoint(split.seen)
+
+    assert split_links(links, holdout=0.4) == split_links(links, holdout=0.4)
+
+
+def test_split_links_keeps_single_interest_for_training():
+    user_id, hobby_id = uuid4(), uuid4()
+    split = split_links([LinkRow(user_id, hobby_id, True, 5)])[user_id]
+    assert split.held_out == set()
+    assert list(split.liked) == [hobby_id]
+
+
+def test_recall_and_ndcg():
+    a, b, c = uuid4(), uuid4(), uuid4()
+    assert recall_at_k([a, b, c], {a, c}, k=3) == 1.0
+    assert recall_at_k([b, a], {a, c}, k=1) == 0.0
+    assert ndcg_at_k([a, b], {a}, k=2) == 1.0
+    assert 0 < ndcg_at_k([b, a], {a}, k=2) < 1
+
+
+def test_evaluate_report():
+    chess = Hobby(name="Chess", description="Strategy board game")
+    go = Hobby(name="Go", description="Ancient strategy board game")
+    baking = Hobby(name="Baking", description="Making breads and pastries")
+    index = HobbyIndex.build([chess, go, baking])
+
+    user_id = uuid4()
+    splits = split_links([LinkRow(user_id, chess.id, True, None),
+                          LinkRow(user_id, go.id, True, None)], holdout=0.5)
+
+    report = evaluate(index, splits, k=1)
+    assert report["users_evaluated"] == 1
+    assert report["recall@1"] == 1.0
+    assert report["ndcg@1"] == 1.0
+    assert report["coverage"] == 1 / 3
+    assert report["latency"]["per_query_ms"]["max"] >= 0
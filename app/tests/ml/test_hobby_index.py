@@ -0,0 +1,124 @@
+import threading
+from uuid import uuid4
+
+from app.ml import HobbyIndex, tokenize
+from app.models import Hobby
+
+
+def _make_hobbies() -> list[Hobby]:
+    return [
+        Hobby(name="Chess", description="Strategy board game for two players"),
+        Hobby(name="Go", description="Ancient strategy board game"),
+        Hobby(name="Baking", description="Making breads and pastries"),
+        Hobby(name="Cake decorating",
+              description="Decorating cakes and pastries with icing"),
+    ]
+
+
+def test_tokenize():
+    assert tokenize("The Board-Game of Go") == [
+        "board", "game", "go", "board game", "game go"]
+    assert tokenize(None) == []
+
+
+def test_similar_ranks_related_hobbies_first():
+    chess, go, baking, cake = _make_hobbies()
+    index = HobbyIndex.build([chess, go, baking, cake])
+
+    ranked = index.similar([chess.id], limit=3)
+    assert ranked[0][0] == go.id
+    assert chess.id not in [hobby_id for hobby_id, _ in ranked]
+
+    ranked = index.similar([baking.id], limit=1)
+    assert ranked == [(cake.id, ranked[0][1])]
+
+
+def test_similar_respects_exclude():
+    chess, go, baking, cake = _make_hobbies()
+    index = HobbyIndex.build([chess, go, baking, cake])
+
+    ranked = index.similar([chess.id], limit=3, exclude=[go.id])
+    assert go.id not in [hobby_id for hobby_id, _ in ranked]
+
+
+def test_cold_start_returns_indexed_hobbies():
+    hobbies = _make_hobbies()
+    index = HobbyIndex.build(hobbies)
+
+    ranked = index.cold_start(limit=2)
+    assert len(ranked) == 2
+    assert all(hobby_id in index for hobby_id, _ in ranked)
+
+
+def test_cold_start_follows_add_and_remove():
+    chess, go, baking, cake = _make_hobbies()
+    index = HobbyIndex.build([chess, go])
+    assert {hobby_id for hobby_id, _ in index.cold_start()} == {chess.id, go.id}
+
+    index.add_hobby(baking)
+    assert baking.id in {hobby_id for hobby_id, _ in index.cold_start()}
+
+    index.remove(chess.id)
+    assert chess.id not in {hobby_id for hobby_id, _ in index.cold_start()}
+
+
+def test_concurrent_mutation_and_queries():
+    hobbies = _make_hobbies()
+    index = HobbyIndex.build(hobbies[:2])
+    extra = [Hobby(name=f"Hobby {i}", description=f"Board game number {i}")
+             for i in range(200)]
+    errors: list[Exception] = []
+
+    def mutate():
+        for hobby in extra:
+            index.add_hobby(hobby)
+        for hobby in extra:
+            index.remove(hobby.id)
+
+    def query():
+        try:
+            for _ in range(200):
+                index.similar([hobbies[0].id])
+                index.cold_start()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=mutate)] + [
+        threading.Thread(target=query) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(index) == 2
+
+
+def test_add_and_remove_update_index():
+    chess, go, baking, cake = _make_hobbies()
+    index = HobbyIndex.build([chess, baking])
+    assert index.similar([chess.id]) == []
+
+    index.add_hobby(go)
+    assert len(index) == 3
+    assert index.similar([chess.id], limit=1)[0][0] == go.id
+
+    index.remove(go.id)
+    assert go.id not in index
+    assert index.similar([chess.id]) == []
+    index.remove(uuid4())
+
+
+def test_save_and_load_round_trip(tmp_path):
+    hobbies = _make_hobbies()
+    index = HobbyIndex.build(hobbies)
+    path = str(tmp_path / "index.json")
+    index.save(path)
+
+    loaded = HobbyIndex.load(path)
+    assert loaded is not None
+    assert loaded.hobby_ids() == index.hobby_ids()
+    assert loaded.similar([hobbies[0].id]) == index.similar([hobbies[0].id])
+
+
+def test_load_missing_file(tmp_path):
+    assert HobbyIndex.load(str(tmp_path / "missing.json")) is None
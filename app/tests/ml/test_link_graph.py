@@ -0,0 +1,121 @@
+from uuid import uuid4
+
+from app.ml import link_graph
+from app.ml.link_graph import Edge, LinkGraph
+
+
+def _sorted(rows):
+    return sorted(rows, key=lambda row: str(row[0]))
+
+
+def test_from_edges_both_directions():
+    alice, bob = uuid4(), uuid4()
+    chess, go = uuid4(), uuid4()
+    graph = LinkGraph.from_edges([
+        Edge(alice, chess, True, 5),
+        Edge(bob, chess, False, None),
+        Edge(alice, go, True, None),
+    ])
+
+    assert len(graph) == 3
+    assert _sorted(graph.hobbies_of(alice)) == _sorted(
+        [(chess, True, 5), (go, True, None)])
+    assert _sorted(graph.users_of(chess)) == _sorted(
+        [(alice, True, 5), (bob, False, None)])
+    assert graph.hobbies_of(uuid4()) == []
+
+
+
+def test_ratings_out_of_int16_range_are_clamped():
+    alice, chess, go = uuid4(), uuid4(), uuid4()
+    graph = LinkGraph.from_edges([Edge(alice, chess, True, 40000)])
+    graph.upsert(alice, go, True, -40000)
+    graph.compact()
+    assert _sorted(graph.hobbies_of(alice)) == _sorted(
+        [(chess, True, 32767), (go, True, -32767)])
+
+
+def test_edits_before_and_after_compact():
+    alice, bob = uuid4(), uuid4()
+    chess, go = uuid4(), uuid4()
+    graph = LinkGraph.from_edges([Edge(alice, chess, True, None)])
+
+    graph.upsert(alice, chess, True, 3)
+    graph.upsert(bob, go, True, None)
+    graph.remove(alice, uuid4())
+
+    def check():
+        assert len(graph) == 2
+        assert graph.hobbies_of(alice) == [(chess, True, 3)]
+        assert graph.users_of(go) == [(bob, True, None)]
+
+    check()
+    graph.compact()
+    assert graph.stats()["pending_edits"] == 0
+    check()
+
+    graph.remove(alice, chess)
+    assert graph.hobbies_of(alice) == []
+    assert graph.users_of(chess) == []
+    graph.compact()
+    assert len(graph) == 1
+
+
+def test_remove_user_and_hobby():
+    alice, bob = uuid4(), uuid4()
+    chess, go = uuid4(), uuid4()
+    graph = LinkGraph.from_edges([
+        Edge(alice, chess, True, None),
+        Edge(alice, go, True, None),
+        Edge(bob, chess, True, None),
+    ])
+
+    graph.remove_user(alice)
+    assert graph.hobbies_of(alice) == []
+    assert graph.users_of(chess) == [(bob, True, None)]
+
+    graph.remove_hobby(chess)
+    assert len(graph) == 0
+
+
+def test_auto_compact(monkeypatch):
+    monkeypatch.setattr(link_graph, "COMPACT_MIN_EDITS", 2)
+    graph = LinkGraph()
+    user = uuid4()
+    for _ in range(3):
+        graph.upsert(user, uuid4(), True, None)
+
+    compactor = graph._compactor
+    assert compactor is not None and compactor.name == "link-graph-compact"
+    compactor.join()
+    assert graph.stats()["pending_edits"] == 0
+    assert len(graph.hobbies_of(user)) == 3
+
+
+def test_edits_during_compact_stay_pending(monkeypatch):
+    alice, chess, go = uuid4(), uuid4(), uuid4()
+    graph = LinkGraph.from_edges([Edge(alice, chess, True, 1)])
+    graph.upsert(alice, chess, True, 2)
+    build = LinkGraph._build
+
+    def build_while_writing(*args):
+        graph.upsert(alice, go, False, None)
+        graph.upsert(alice, chess, True, 3)
+        return build(*args)
+
+    monkeypatch.setattr(LinkGraph, "_build", staticmethod(build_while_writing))
+    graph.compact()
+
+    assert graph.stats()["edges"] == 1
+    assert graph.stats()["pending_edits"] == 2
+    assert sorted(graph.hobbies_of(alice), key=lambda h: h[0] == go) == [
+        (chess, True, 3), (go, False, None)]
+
+
+def test_bytes_per_edge():
+    users = [uuid4() for _ in range(100)]
+    hobbies = [uuid4() for _ in range(50)]
+    graph = LinkGraph.from_edges(
+        Edge(u, h, True, 4) for u in users for h in hobbies)
+
+    assert graph.stats()["bytes_per_edge"] < 20
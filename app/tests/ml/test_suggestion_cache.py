@@ -0,0 +1,136 @@
+from sqlalchemy import delete
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from uuid import uuid4
+
+from app.ml import SuggestionCache
+from app.models import User, utcnow
+from app import ml
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_get_or_compute_caches_result():
+    cache = SuggestionCache(maxsize=10, ttl=60)
+    user_id, hobby_id = uuid4(), uuid4()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [hobby_id]
+
+    assert cache.get_or_compute(user_id, 1, 5, compute) == [hobby_id]
+    assert cache.get_or_compute(user_id, 1, 5, compute) == [hobby_id]
+    assert len(calls) == 1
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+    assert stats["recomputes"] == 1
+
+
+def test_model_version_and_limit_miss():
+    cache = SuggestionCache(maxsize=10, ttl=60)
+    user_id = uuid4()
+    hobby_ids = [uuid4(), uuid4(), uuid4()]
+    cache.put(user_id, 1, 3, hobby_ids)
+
+    assert cache.get(user_id, 1, 2) == hobby_ids[:2]
+    assert cache.get(user_id, 1, 4) is None
+    assert cache.get(user_id, 2, 3) is None
+
+
+def test_invalidate():
+    cache = SuggestionCache(maxsize=10, ttl=60)
+    user_id = uuid4()
+    cache.put(user_id, 1, 1, [uuid4()])
+
+    cache.invalidate(user_id)
+    assert cache.get(user_id, 1, 1) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_put_after_invalidate_is_dropped():
+    cache = SuggestionCache(maxsize=10, ttl=60)
+    user_id, other_id = uuid4(), uuid4()
+
+    def compute():
+        # A link write commits while the old links are being ranked
+        cache.invalidate(user_id)
+        return [uuid4()]
+
+    cache.get_or_compute(user_id, 1, 1, compute)
+    assert cache.get(user_id, 1, 1) is None
+    assert cache.stats()["stale_puts"] == 1
+
+    generation = cache.generation()
+    cache.invalidate(other_id)
+    cache.put(user_id, 1, 1, [], generation)
+    assert cache.get(user_id, 1, 1) == []
+
+
+def test_put_older_than_forgotten_invalidations_is_dropped():
+    cache = SuggestionCache(maxsize=2, ttl=60)
+    user_id = uuid4()
+    generation = cache.generation()
+    for _ in range(1025):
+        cache.invalidate(uuid4())
+
+    cache.put(user_id, 1, 1, [], generation)
+    assert cache.get(user_id, 1, 1) is None
+    cache.put(user_id, 1, 1, [], cache.generation())
+    assert cache.get(user_id, 1, 1) == []
+
+
+def test_lru_eviction():
+    cache = SuggestionCache(maxsize=2, ttl=60)
+    first, second, third = uuid4(), uuid4(), uuid4()
+    cache.put(first, 1, 1, [])
+    cache.put(second, 1, 1, [])
+    cache.get(first, 1, 1)
+    cache.put(third, 1, 1, [])
+
+    assert len(cache) == 2
+    assert cache.get(second, 1, 1) is None
+    assert cache.get(first, 1, 1) == []
+
+
+def test_expiry_and_refresh_ahead():
+    clock = FakeClock()
+    cache = SuggestionCache(maxsize=10, ttl=60, refresh_ahead=10, clock=clock)
+    user_id = uuid4()
+    cache.put(user_id, 1, 1, [])
+
+    assert not cache.needs_refresh(user_id)
+    clock.now = 55
+    assert cache.needs_refresh(user_id)
+    assert cache.get(user_id, 1, 1) == []
+    clock.now = 60
+    assert not cache.needs_refresh(user_id)
+    assert cache.get(user_id, 1, 1) is None
+
+
+def test_refresh_skips_users_pending_deletion(engine: Engine):
+    with Session(engine) as session:
+        live = User(username="live", name="Live", password_hash="x")
+        deleted = User(username="gone", name="Gone", password_hash="x", deleted_at=utcnow())
+        session.add_all([live, deleted])
+        session.commit()
+        live_id, deleted_id = live.id, deleted.id
+    try:
+        for user_id in (live_id, deleted_id):
+            ml.refresh_user_suggestions(user_id, 5)
+        version = ml.peek_hobby_index().version  # type: ignore
+        assert ml.suggestion_cache.get(live_id, version, 5) == []
+        assert ml.suggestion_cache.get(deleted_id, version, 5) is None
+    finally:
+        with Session(engine) as session:
+            session.execute(delete(User).where(User.id.in_([live_id, deleted_id])))  # type: ignore
+            session.commit()
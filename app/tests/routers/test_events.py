@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+from uuid import uuid4
+
+from app.main import app
+
+
+@pytest.fixture
+def draining():
+    # Streams end as soon as the app drains, so requests here return
+    app.state.draining = True
+    yield
+    app.state.draining = False
+
+
+def test_get_events_requires_auth(client: TestClient):
+    assert client.get("/events").status_code == 401
+
+
+def test_get_events_streams_server_sent_events(client: TestClient, auth_headers, draining):
+    resp = client.get("/events", headers=auth_headers(uuid4()),
+                      params={"after": "1.1"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert resp.headers["cache-control"] == "no-cache"
+
+
+def test_get_events_rejects_invalid_positions(client: TestClient, auth_headers):
+    headers = {**auth_headers(uuid4()), "Last-Event-ID": "nope"}
+    resp = client.get("/events", headers=headers)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Invalid event position"
+
+
+
+def test_get_events_rejects_expired_positions(client: TestClient, auth_headers, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(app.state.event_dispatcher, "retains", lambda after: False)
+    resp = client.get("/events", headers=auth_headers(uuid4()), params={"after": "1.1"})
+    assert resp.status_code == 410
+
+
+def test_get_events_unavailable_without_dispatcher(client: TestClient, auth_headers, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(app.state, "event_dispatcher", None)
+    resp = client.get("/events", headers=auth_headers(uuid4()))
+    assert resp.status_code == 503
@@ -0,0 +1,42 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, create_engine
+
+from app import ml
+from app.main import app
+from app.routers import health
+
+
+def test_get_liveness(client: TestClient):
+    resp = client.get("/health/live")
+    assert resp.status_code == 200
+    assert resp.json() == {"status": "ok"}
+
+
+def test_get_readiness(client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch):
+    resp = client.get("/health/ready")
+    assert resp.status_code == 503
+    assert resp.json()["checks"] == {
+        "started": False, "draining": False, "database": True, "hobby_index": False}
+
+    monkeypatch.setattr(app.state, "ready", True)
+    ml.get_hobby_index(session)
+    resp = client.get("/health/ready")
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "ready"
+
+    monkeypatch.setattr(app.state, "draining", True)
+    resp = client.get("/health/ready")
+    assert resp.status_code == 503
+    assert resp.json()["status"] == "unavailable"
+
+
+def test_get_readiness_database_down(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    # Nothing listens on port 1
+    down = create_engine("postgresql://nobody@127.0.0.1:1/none")
+    monkeypatch.setattr(health, "get_engine", lambda: down)
+    monkeypatch.setattr(app.state, "ready", True)
+
+    resp = client.get("/health/ready")
+    assert resp.status_code == 503
+    assert resp.json()["checks"]["database"] is False
@@ -1,8 +1,12 @@
+import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, select
+from typing import Callable
 from uuid import UUID, uuid4
 
-from app.models import Hobby
+from app.core.config import settings
+from app.models import Hobby, OutboxEvent, User, UserHobbyLink, utcnow
+from app import crud
 
 
 def test_create_hobby(client: TestClient, session: Session):
@@ -23,6 +27,56 @@ def test_create_hobby(client: TestClient, session: Session):
     assert db_hobby.name == hobby_json["name"]
     assert db_hobby.description == hobby_json["description"]
 
+    event = session.exec(select(OutboxEvent)).one()
+    assert (event.type, event.hobby_id) == (crud.HOBBY_CREATED, db_hobby.id)
+    assert event.payload == hobby_json
+
+
+def test_get_hobbies_by_ids(client: TestClient, session: Session):
+    chess, go = Hobby(name="Chess"), Hobby(name="Go")
+    deleted = Hobby(name="Croquet", deleted_at=utcnow())
+    session.add_all([chess, go, deleted])
+    session.commit()
+    missing = uuid4()
+
+    ids = [go.id, missing, chess.id, deleted.id, go.id]
+    resp = client.get("/hobbies", params={"ids": ",".join(map(str, ids))})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [h["name"] for h in data["hobbies"]] == ["Go", "Chess"]
+    assert data["missing"] == [str(missing), str(deleted.id)]
+
+
+def test_get_hobbies_by_ids_invalid(client: TestClient):
+    resp = client.get("/hobbies", params={"ids": "not-a-uuid"})
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "Invalid id in ids"}
+
+    resp = client.get("/hobbies", params={"ids": ","})
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "No ids given"}
+
+
+def test_get_hobbies_by_ids_too_many(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "MULTI_GET_MAX_IDS", 2)
+    ids = ",".join(str(uuid4()) for _ in range(3))
+    resp = client.get("/hobbies", params={"ids": ids})
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "At most 2 ids are allowed"}
+
+
+def test_get_hobby_sparse_fields(client: TestClient, session: Session):
+    hobby = Hobby(name="Chess", description="Board game")
+    session.add(hobby)
+    session.commit()
+
+    resp = client.get(f"/hobbies/{hobby.id}", params={"fields": "name"})
+    assert resp.status_code == 200
+    assert resp.json() == {"name": "Chess"}
+
+    resp = client.get(f"/hobbies/{uuid4()}", params={"fields": "name"})
+    assert resp.status_code == 404
+
 
 def test_create_hobby_incomplete(client: TestClient):
     hobby_json = {
@@ -75,6 +129,147 @@ def test_get_hobby_not_found(client: TestClient):
     assert resp.json() == {"detail": "Hobby not found"}
 
 
+def test_get_hobby_users(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    hobby = Hobby(name="Chess", description="Board game")
+    users = [User(username=f"user{i}", name="kiko", email=f"user{i}@example.com",
+                  password_hash="ultrasecure")
+             for i in range(3)]
+    links = [UserHobbyLink(user=u, hobby=hobby, rating=i)
+             for i, u in enumerate(users)]
+    session.add_all([hobby, *users, *links])
+    session.commit()
+    user_ids = sorted(str(u.id) for u in users)
+    headers = auth_headers(users[0].id)
+
+    resp = client.get(f"/hobbies/{hobby.id}/users", params={"limit": 2}, headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [u["id"] for u in data["users"]] == user_ids[:2]
+    assert data["next_cursor"] == user_ids[1]
+    assert "password_hash" not in data["users"][0]
+    assert "email" not in data["users"][0]
+
+    resp = client.get(f"/hobbies/{hobby.id}/users",
+                      params={"limit": 2, "cursor": data["next_cursor"]}, headers=headers)
+    data = resp.json()
+    assert [u["id"] for u in data["users"]] == user_ids[2:]
+    assert data["next_cursor"] is None
+
+
+def test_get_hobby_users_requires_token(client: TestClient, session: Session):
+    hobby = Hobby(name="Chess", description="Board game")
+    session.add(hobby)
+    session.commit()
+
+    resp = client.get(f"/hobbies/{hobby.id}/users")
+    assert resp.status_code == 401
+
+
+def test_get_hobby_users_not_found(client: TestClient, auth_headers: Callable[[UUID], dict]):
+    resp = client.get(f"/hobbies/{uuid4()}/users", headers=auth_headers(uuid4()))
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "Hobby not found"}
+
+
+def test_get_similar_hobbies(client: TestClient, session: Session):
+    chess = Hobby(name="Chess", description="Strategy board game")
+    go = Hobby(name="Go", description="Ancient strategy board game")
+    baking = Hobby(name="Baking", description="Making breads and pastries")
+    session.add_all([chess, go, baking])
+    session.commit()
+
+    resp = client.get(f"/hobbies/{chess.id}/similar")
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["hobby_id"] == str(chess.id)
+    assert [h["name"] for h in data["similar"]] == ["Go"]
+
+
+def test_get_similar_hobbies_includes_new_hobby(client: TestClient, session: Session):
+    chess = Hobby(name="Chess", description="Strategy board game")
+    session.add(chess)
+    session.commit()
+
+    resp = client.get(f"/hobbies/{chess.id}/similar")
+    assert resp.json()["similar"] == []
+
+    client.post("/hobbies", json={"name": "Checkers",
+                "description": "Board game with discs"})
+    resp = client.get(f"/hobbies/{chess.id}/similar")
+    assert [h["name"] for h in resp.json()["similar"]] == ["Checkers"]
+
+
+def test_get_similar_hobbies_not_found(client: TestClient):
+    resp = client.get(f"/hobbies/{uuid4()}/similar")
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "Hobby not found"}
+
+
+def test_get_hobby_stats(client: TestClient, session: Session):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    hobby = Hobby(name="Chess", description="Board game")
+    link = UserHobbyLink(user=user, hobby=hobby, interested=True, rating=4)
+    session.add_all([user, hobby, link])
+    session.commit()
+
+    resp = client.get(f"/hobbies/{hobby.id}/stats")
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "hobby_id": str(hobby.id),
+        "link_count": 1,
+        "interested_count": 1,
+        "rating_count": 1,
+        "rating_sum": 4,
+        "rating_average": 4.0,
+        "rating_histogram": {"4": 1},
+    }
+
+
+def test_get_hobby_stats_not_found(client: TestClient):
+    resp = client.get(f"/hobbies/{uuid4()}/stats")
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "Hobby not found"}
+
+
+
+def test_get_hobby_stats_soft_deleted(client: TestClient, session: Session):
+    hobby = Hobby(name="Chess", deleted_at=utcnow())
+    session.add(hobby)
+    session.commit()
+
+    resp = client.get(f"/hobbies/{hobby.id}/stats")
+    assert resp.status_code == 404
+
+
+def test_get_popular_hobbies(client: TestClient, session: Session):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    chess = Hobby(name="Chess", description="Board game")
+    go = Hobby(name="Go", description="Board game")
+    link = UserHobbyLink(user=user, hobby=go, interested=True, rating=5)
+    session.add_all([user, chess, go, link])
+    session.commit()
+
+    resp = client.get("/hobbies/popular", params={"limit": 1})
+    assert resp.status_code == 200
+    assert resp.json() == [{
+        "id": str(go.id),
+        "name": "Go",
+        "description": "Board game",
+        "interested_count": 1,
+        "rating_count": 1,
+        "rating_average": 5.0,
+    }]
+
+
+def test_get_popular_hobbies_breaks_ties_by_name(client: TestClient, session: Session):
+    session.add_all([Hobby(name=name) for name in ("Go", "Chess", "Bridge")])
+    session.commit()
+
+    resp = client.get("/hobbies/popular")
+    assert [h["name"] for h in resp.json()] == ["Bridge", "Chess", "Go"]
+
+
 def test_delete_hobby(client: TestClient, session: Session):
     hobby = Hobby(name="Chess", description="Board game")
     session.add(hobby)
@@ -87,6 +282,30 @@ def test_delete_hobby(client: TestClient, session: Session):
     assert session.get(Hobby, hobby.id) is None
 
 
+def test_delete_hobby_background(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    hobby = Hobby(name="Chess", description="Board game")
+    link = UserHobbyLink(user=user, hobby=hobby)
+    session.add_all([user, hobby, link])
+    session.commit()
+    hobby_id, user_id = hobby.id, user.id
+
+    resp = client.delete(f"/hobbies/{hobby_id}", params={"background": True})
+    assert resp.status_code == 202
+    data = resp.json()
+    assert data["target_id"] == str(hobby_id)
+    assert data["links_total"] == 1
+
+    resp = client.get(f"/deletion-jobs/{data['id']}", headers=auth_headers(user_id))
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "done"
+    assert resp.json()["links_deleted"] == 1
+
+    session.expire_all()
+    assert session.get(Hobby, hobby_id) is None
+    assert session.get(User, user_id) is not None
+
+
 def test_delete_hobby_not_found(client: TestClient):
     resp = client.delete(f"/hobbies/{uuid4()}")
     assert resp.status_code == 404
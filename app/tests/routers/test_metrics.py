@@ -0,0 +1,10 @@
+from fastapi.testclient import TestClient
+
+
+def test_get_metrics(client: TestClient):
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["suggestion_cache"]["hits"] == 0
+    assert data["suggestion_cache"]["hit_ratio"] == 0.0
@@ -1,11 +1,16 @@
+import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session
-from uuid import uuid4
+from typing import Callable
+from uuid import UUID, uuid4
 
+from app.core.config import settings
+from app.main import app
 from app.models import User, Hobby, UserHobbyLink
+from app import events, jobs, ml
 
 
-def test_get_user_hobbies(client: TestClient, session: Session):
+def test_get_user_hobbies(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     hobby1 = Hobby(name="Chess", description="Board game")
     hobby2 = Hobby(name="Painting", description="Art")
@@ -17,7 +22,7 @@ def test_get_user_hobbies(client: TestClient, session: Session):
                     hobby_link2, unused_hobby])
     session.commit()
 
-    resp = client.get(f"/users/{user.id}/hobbies")
+    resp = client.get(f"/users/{user.id}/hobbies", headers=auth_headers(user.id))
     assert resp.status_code == 200
 
     data = resp.json()
@@ -27,13 +32,70 @@ def test_get_user_hobbies(client: TestClient, session: Session):
     assert not any(h["name"] == "Knitting" for h in data)
 
 
-def test_get_user_hobbies_not_found(client: TestClient):
-    resp = client.get(f"/users/{uuid4()}/hobbies")
+def test_get_user_hobbies_fast_json(client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    hobby = Hobby(name="Chess", description="Board game")
+    hobby_link = UserHobbyLink(user=user, hobby=hobby, interested=True)
+    session.add_all([user, hobby, hobby_link])
+    session.commit()
+
+    expected = client.get(f"/users/{user.id}/hobbies", headers=auth_headers(user.id)).json()
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    resp = client.get(f"/users/{user.id}/hobbies", headers=auth_headers(user.id))
+    assert resp.status_code == 200
+    assert resp.json() == expected
+
+
+def test_get_user_hobbies_sparse_fields(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    chess = Hobby(name="Chess", description="Board game")
+    painting = Hobby(name="Painting", description="Art")
+    session.add_all([user, chess, painting,
+                     UserHobbyLink(user=user, hobby=chess, rating=5),
+                     UserHobbyLink(user=user, hobby=painting)])
+    session.commit()
+    headers = auth_headers(user.id)
+
+    resp = client.get(f"/users/{user.id}/hobbies", headers=headers,
+                      params={"fields": "name"})
+    assert resp.status_code == 200
+    assert resp.json() == [{"name": "Chess"}, {"name": "Painting"}]
+
+    resp = client.get(f"/users/{user.id}/hobbies/{chess.id}", headers=headers,
+                      params={"fields": "rating,hobby_id"})
+    assert resp.status_code == 200
+    assert resp.json() == {"hobby_id": str(chess.id), "rating": 5}
+
+    resp = client.get(f"/users/{user.id}/hobbies/{uuid4()}", headers=headers,
+                      params={"fields": "rating"})
+    assert resp.status_code == 404
+
+
+def test_get_user_hobbies_pages_match_with_fields(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    hobbies = [Hobby(name=name) for name in ("Painting", "Chess", "Knitting", "Go")]
+    session.add_all([user, *hobbies,
+                     *(UserHobbyLink(user=user, hobby=hobby) for hobby in hobbies)])
+    session.commit()
+    headers = auth_headers(user.id)
+
+    for offset in range(4):
+        params = {"limit": 1, "offset": offset}
+        full = client.get(f"/users/{user.id}/hobbies", headers=headers, params=params).json()
+        sparse = client.get(f"/users/{user.id}/hobbies", headers=headers,
+                            params={**params, "fields": "id"}).json()
+        assert [h["id"] for h in full] == [h["id"] for h in sparse]
+        assert full[0]["name"] == ["Chess", "Go", "Knitting", "Painting"][offset]
+
+
+def test_get_user_hobbies_not_found(client: TestClient, auth_headers: Callable[[UUID], dict]):
+    user_id = uuid4()
+    resp = client.get(f"/users/{user_id}/hobbies", headers=auth_headers(user_id))
     assert resp.status_code == 404
     assert resp.json() == {"detail": "User not found"}
 
 
-def test_add_user_hobby(client: TestClient, session: Session):
+def test_add_user_hobby(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     hobby = Hobby(name="Chess", description="Board game")
     session.add_all([user, hobby])
@@ -44,7 +106,7 @@ def test_add_user_hobby(client: TestClient, session: Session):
         "interested": True,
         "rating": 5
     }
-    resp = client.post(f"/users/{user.id}/hobbies", json=user_hobby_json)
+    resp = client.post(f"/users/{user.id}/hobbies", json=user_hobby_json, headers=auth_headers(user.id))
     assert resp.status_code == 200
 
     data = resp.json()
@@ -59,7 +121,7 @@ def test_add_user_hobby(client: TestClient, session: Session):
     assert db_user_hobby.rating == 5
 
 
-def test_add_user_hobby_duplicate(client: TestClient, session: Session):
+def test_add_user_hobby_duplicate(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     hobby = Hobby(name="Chess", description="Board game")
     user_hobby = UserHobbyLink(
@@ -72,12 +134,12 @@ def test_add_user_hobby_duplicate(client: TestClient, session: Session):
         "interested": False,
         "rating": 2
     }
-    resp = client.post(f"/users/{user.id}/hobbies", json=user_hobby_json)
+    resp = client.post(f"/users/{user.id}/hobbies", json=user_hobby_json, headers=auth_headers(user.id))
     assert resp.status_code == 400
     assert resp.json() == {"detail": "User already has this hobby"}
 
 
-def test_add_user_hobby_user_not_found(client: TestClient, session: Session):
+def test_add_user_hobby_user_not_found(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     hobby = Hobby(name="Chess", description="Board game")
     session.add(hobby)
     session.commit()
@@ -87,13 +149,14 @@ def test_add_user_hobby_user_not_found(client: TestClient, session: Session):
         "interested": True,
         "rating": 5
     }
+    user_id = uuid4()
     resp = client.post(
-        f"/users/{uuid4()}/hobbies", json=user_hobby_json)
+        f"/users/{user_id}/hobbies", json=user_hobby_json, headers=auth_headers(user_id))
     assert resp.status_code == 404
     assert resp.json() == {"detail": "User not found"}
 
 
-def test_add_user_hobby_hobby_not_found(client: TestClient, session: Session):
+def test_add_user_hobby_hobby_not_found(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     session.add(user)
     session.commit()
@@ -103,12 +166,12 @@ def test_add_user_hobby_hobby_not_found(client: TestClient, session: Session):
         "interested": True,
         "rating": 5
     }
-    resp = client.post(f"/users/{user.id}/hobbies", json=user_hobby_json)
+    resp = client.post(f"/users/{user.id}/hobbies", json=user_hobby_json, headers=auth_headers(user.id))
     assert resp.status_code == 404
     assert resp.json() == {"detail": "Hobby not found"}
 
 
-def test_get_user_hobby(client: TestClient, session: Session):
+def test_get_user_hobby(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     hobby = Hobby(name="Chess", description="Board game")
     user_hobby = UserHobbyLink(user_id=user.id, hobby_id=hobby.id,
@@ -116,7 +179,7 @@ def test_get_user_hobby(client: TestClient, session: Session):
     session.add_all([user, hobby, user_hobby])
     session.commit()
 
-    resp = client.get(f"/users/{user.id}/hobbies/{hobby.id}")
+    resp = client.get(f"/users/{user.id}/hobbies/{hobby.id}", headers=auth_headers(user.id))
     assert resp.status_code == 200
 
     data = resp.json()
@@ -126,18 +189,30 @@ def test_get_user_hobby(client: TestClient, session: Session):
     assert data["rating"] == user_hobby.rating
 
 
-def test_get_user_hobby_not_found(client: TestClient, session: Session):
+def test_get_user_hobby_not_found(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     hobby = Hobby(name="Chess", description="Board game")
     session.add_all([user, hobby])
     session.commit()
 
-    resp = client.get(f"/users/{user.id}/hobbies/{hobby.id}")
+    resp = client.get(f"/users/{user.id}/hobbies/{hobby.id}", headers=auth_headers(user.id))
     assert resp.status_code == 404
     assert resp.json() == {"detail": "User hobby link not found"}
 
 
-def test_update_user_hobby(client: TestClient, session: Session):
+def test_update_user_hobby_rating_out_of_range(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    hobby = Hobby(name="Chess", description="Board game")
+    session.add_all([user, hobby, UserHobbyLink(user=user, hobby=hobby)])
+    session.commit()
+
+    for rating in (-1, 6, 40000):
+        resp = client.patch(f"/users/{user.id}/hobbies/{hobby.id}",
+                            json={"rating": rating}, headers=auth_headers(user.id))
+        assert resp.status_code == 422
+
+
+def test_update_user_hobby(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     hobby = Hobby(name="Chess", description="Board game")
     user_hobby = UserHobbyLink(
@@ -147,7 +222,7 @@ def test_update_user_hobby(client: TestClient, session: Session):
 
     update_json = {"interested": False, "rating": 2}
     resp = client.patch(
-        f"/users/{user.id}/hobbies/{hobby.id}", json=update_json)
+        f"/users/{user.id}/hobbies/{hobby.id}", json=update_json, headers=auth_headers(user.id))
     assert resp.status_code == 200
 
     data = resp.json()
@@ -162,7 +237,7 @@ def test_update_user_hobby(client: TestClient, session: Session):
     assert user_hobby_db.rating == 2
 
 
-def test_update_user_hobby_not_found(client: TestClient, session: Session):
+def test_update_user_hobby_not_found(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     hobby = Hobby(name="Chess", description="Board game")
     session.add_all([user, hobby])
@@ -170,12 +245,12 @@ def test_update_user_hobby_not_found(client: TestClient, session: Session):
 
     update_json = {"interested": False, "rating": 2}
     resp = client.patch(
-        f"/users/{user.id}/hobbies/{hobby.id}", json=update_json)
+        f"/users/{user.id}/hobbies/{hobby.id}", json=update_json, headers=auth_headers(user.id))
     assert resp.status_code == 404
     assert resp.json() == {"detail": "User hobby link not found"}
 
 
-def test_delete_user_hobby(client: TestClient, session: Session):
+def test_delete_user_hobby(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     hobby = Hobby(name="Chess", description="Board game")
     user_hobby = UserHobbyLink(
@@ -183,7 +258,7 @@ def test_delete_user_hobby(client: TestClient, session: Session):
     session.add_all([user, hobby, user_hobby])
     session.commit()
 
-    resp = client.delete(f"/users/{user.id}/hobbies/{hobby.id}")
+    resp = client.delete(f"/users/{user.id}/hobbies/{hobby.id}", headers=auth_headers(user.id))
     assert resp.status_code == 200
     assert resp.json() == {"ok": True}
 
@@ -191,12 +266,158 @@ def test_delete_user_hobby(client: TestClient, session: Session):
     assert user_hobby_db is None
 
 
-def test_delete_user_hobby_not_found(client: TestClient, session: Session):
+def test_delete_user_hobby_not_found(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     hobby = Hobby(name="Chess", description="Board game")
     session.add_all([user, hobby])
     session.commit()
 
-    resp = client.delete(f"/users/{user.id}/hobbies/{hobby.id}")
+    resp = client.delete(f"/users/{user.id}/hobbies/{hobby.id}", headers=auth_headers(user.id))
     assert resp.status_code == 404
     assert resp.json() == {"detail": "User hobby link not found"}
+
+
+def test_get_hobby_suggestions(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    chess = Hobby(name="Chess", description="Strategy board game")
+    go = Hobby(name="Go", description="Ancient strategy board game")
+    baking = Hobby(name="Baking", description="Making breads and pastries")
+    user_hobby = UserHobbyLink(user=user, hobby=chess, interested=True)
+    session.add_all([user, chess, go, baking, user_hobby])
+    session.commit()
+
+    resp = client.get(f"/users/{user.id}/hobbies/suggestions", headers=auth_headers(user.id))
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["user_id"] == str(user.id)
+    assert [h["name"] for h in data["suggestions"]] == ["Go"]
+
+
+def test_get_hobby_suggestions_cold_start(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    chess = Hobby(name="Chess", description="Strategy board game")
+    go = Hobby(name="Go", description="Ancient strategy board game")
+    session.add_all([user, chess, go])
+    session.commit()
+
+    resp = client.get(f"/users/{user.id}/hobbies/suggestions", headers=auth_headers(user.id))
+    assert resp.status_code == 200
+
+    names = {h["name"] for h in resp.json()["suggestions"]}
+    assert names == {"Chess", "Go"}
+
+
+def test_get_hobby_suggestions_not_found(client: TestClient, auth_headers: Callable[[UUID], dict]):
+    user_id = uuid4()
+    resp = client.get(f"/users/{user_id}/hobbies/suggestions", headers=auth_headers(user_id))
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "User not found"}
+
+
+def test_get_hobby_suggestions_invalidated_by_new_link(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    chess = Hobby(name="Chess", description="Strategy board game")
+    go = Hobby(name="Go", description="Ancient strategy board game")
+    session.add_all([user, chess, go])
+    session.commit()
+
+    resp = client.get(f"/users/{user.id}/hobbies/suggestions", headers=auth_headers(user.id))
+    assert {h["name"] for h in resp.json()["suggestions"]} == {"Chess", "Go"}
+
+    client.post(f"/users/{user.id}/hobbies", json={"hobby_id": str(chess.id)}, headers=auth_headers(user.id))
+    resp = client.get(f"/users/{user.id}/hobbies/suggestions", headers=auth_headers(user.id))
+    assert [h["name"] for h in resp.json()["suggestions"]] == ["Go"]
+
+
+def test_get_hobby_suggestions_from_link_graph(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    chess = Hobby(name="Chess", description="Strategy board game")
+    go = Hobby(name="Go", description="Ancient strategy board game")
+    session.add_all([user, chess, go])
+    session.commit()
+    graph = ml.get_link_graph(session)
+    # Only the graph knows of this link, so suggestions must come from it
+    graph.upsert(user.id, chess.id, True, None)
+
+    resp = client.get(f"/users/{user.id}/hobbies/suggestions", headers=auth_headers(user.id))
+    assert [h["name"] for h in resp.json()["suggestions"]] == ["Go"]
+
+
+def test_update_user_hobby_rating_write_behind(client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    hobby = Hobby(name="Chess")
+    session.add_all([user, hobby, UserHobbyLink(user=user, hobby=hobby, rating=1)])
+    session.commit()
+    buffer = jobs.RatingBuffer(bind=session.get_bind())
+    monkeypatch.setattr(app.state, "rating_buffer", buffer)
+    url = f"/users/{user.id}/hobbies/{hobby.id}"
+    headers = auth_headers(user.id)
+
+    for rating in (2, 5):
+        resp = client.patch(url, json={"rating": rating}, headers=headers)
+        assert resp.status_code == 200
+        assert resp.json()["rating"] == rating
+    assert len(buffer) == 1
+
+    session.expire_all()
+    assert session.get(UserHobbyLink, (user.id, hobby.id)).rating == 1  # type: ignore
+    assert client.get(url, headers=headers).json()["rating"] == 5
+    assert client.get(url, headers=headers, params={"fields": "rating"}).json() == {"rating": 5}
+
+    buffer.flush()
+    session.expire_all()
+    assert session.get(UserHobbyLink, (user.id, hobby.id)).rating == 5  # type: ignore
+
+
+def test_update_user_hobby_write_behind_folds_pending_rating(client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    hobby = Hobby(name="Chess")
+    session.add_all([user, hobby, UserHobbyLink(user=user, hobby=hobby, rating=1)])
+    session.commit()
+    buffer = jobs.RatingBuffer(bind=session.get_bind())
+    monkeypatch.setattr(app.state, "rating_buffer", buffer)
+    url = f"/users/{user.id}/hobbies/{hobby.id}"
+    headers = auth_headers(user.id)
+
+    client.patch(url, json={"rating": 4}, headers=headers)
+    resp = client.patch(url, json={"interested": False}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["rating"] == 4
+    assert resp.json()["interested"] is False
+    assert len(buffer) == 0
+
+
+def test_stream_user_hobbies(client: TestClient, monkeypatch: pytest.MonkeyPatch, auth_headers: Callable[[UUID], dict]):
+    user_id = uuid4()
+    suggestions = {"user_id": str(user_id), "suggestions": []}
+    monkeypatch.setattr(events, "load_user_suggestions",
+                        lambda uid, limit: suggestions if uid == user_id else None)
+    # Streams end once the app drains, so the request returns
+    monkeypatch.setattr(app.state, "draining", True)
+
+    resp = client.get(f"/users/{user_id}/hobbies/stream", headers=auth_headers(user_id))
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert resp.text.startswith("event: suggestions\n")
+
+    other_id = uuid4()
+    resp = client.get(f"/users/{other_id}/hobbies/stream", headers=auth_headers(other_id))
+    assert resp.status_code == 404
+    assert client.get(f"/users/{user_id}/hobbies/stream").status_code == 401
+
+
+
+def test_stream_user_hobbies_rejects_invalid_positions(client: TestClient, auth_headers: Callable[[UUID], dict]):
+    user_id = uuid4()
+    headers = {**auth_headers(user_id), "Last-Event-ID": "nope"}
+    resp = client.get(f"/users/{user_id}/hobbies/stream", headers=headers)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Invalid event position"
+
+
+def test_stream_user_hobbies_unavailable_without_dispatcher(client: TestClient, monkeypatch: pytest.MonkeyPatch, auth_headers: Callable[[UUID], dict]):
+    monkeypatch.setattr(app.state, "user_event_hub", None)
+    user_id = uuid4()
+    resp = client.get(f"/users/{user_id}/hobbies/stream", headers=auth_headers(user_id))
+    assert resp.status_code == 503
@@ -1,8 +1,11 @@
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, select
+from typing import Callable
 from uuid import UUID, uuid4
 
-from app.models import User
+from app.core.security import hash_password, token_denylist
+from app.models import Hobby, OutboxEvent, User, UserHobbyLink
+from app import crud, events
 
 
 def test_create_user(client: TestClient, session: Session):
@@ -84,13 +87,13 @@ def test_create_user_existing_empty_email(client: TestClient, session: Session):
     assert resp.status_code == 200
 
 
-def test_get_user(client: TestClient, session: Session):
+def test_get_user(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko",
                 email="kiko@example.com", password_hash="ultrasecure")
     session.add(user)
     session.commit()
 
-    resp = client.get(f"/users/{user.id}")
+    resp = client.get(f"/users/{user.id}", headers=auth_headers(user.id))
     assert resp.status_code == 200
 
     data = resp.json()
@@ -101,13 +104,14 @@ def test_get_user(client: TestClient, session: Session):
     assert "password_hash" not in data
 
 
-def test_get_user_not_found(client: TestClient):
-    resp = client.get(f"/users/{uuid4()}")
+def test_get_user_not_found(client: TestClient, auth_headers: Callable[[UUID], dict]):
+    user_id = uuid4()
+    resp = client.get(f"/users/{user_id}", headers=auth_headers(user_id))
     assert resp.status_code == 404
     assert resp.json() == {"detail": "User not found"}
 
 
-def test_update_user(client: TestClient, session: Session):
+def test_update_user(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko",
                 email="kiko@example.com", password_hash="ultrasecure")
     session.add(user)
@@ -116,7 +120,7 @@ def test_update_user(client: TestClient, session: Session):
     user_json = {"email": None,
                  "username": "newusername",
                  "password": "newpassword"}
-    resp = client.patch(f"/users/{user.id}", json=user_json)
+    resp = client.patch(f"/users/{user.id}", json=user_json, headers=auth_headers(user.id))
     assert resp.status_code == 200
 
     data = resp.json()
@@ -135,25 +139,248 @@ def test_update_user(client: TestClient, session: Session):
     assert db_user.password_hash != user_json["password"]
 
 
-def test_update_user_not_found(client: TestClient):
-    resp = client.patch(f"/users/{uuid4()}", json={})
+def test_update_user_not_found(client: TestClient, auth_headers: Callable[[UUID], dict]):
+    user_id = uuid4()
+    resp = client.patch(f"/users/{user_id}", json={}, headers=auth_headers(user_id))
     assert resp.status_code == 404
     assert resp.json() == {"detail": "User not found"}
 
 
-def test_delete_user(client: TestClient, session: Session):
+def test_delete_user(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
     user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
     session.add(user)
     session.commit()
 
-    resp = client.delete(f"/users/{user.id}")
+    resp = client.delete(f"/users/{user.id}", headers=auth_headers(user.id))
     assert resp.status_code == 200
     assert resp.json() == {"ok": True}
 
     assert session.get(User, user.id) is None
 
 
-def test_delete_user_not_found(client: TestClient):
-    resp = client.delete(f"/users/{uuid4()}")
+def test_delete_user_background(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    session.add(user)
+    session.commit()
+    user_id = user.id
+
+    resp = client.delete(f"/users/{user_id}", params={"background": True}, headers=auth_headers(user_id))
+    assert resp.status_code == 202
+    assert resp.json()["target_table"] == "users"
+
+    job_id = resp.json()["id"]
+    resp = client.get(f"/deletion-jobs/{job_id}", headers=auth_headers(user_id))
+    assert resp.json()["status"] == "done"
+    # Only to its user, and not without a token
+    assert client.get(f"/deletion-jobs/{job_id}", headers=auth_headers(uuid4())).status_code == 403
+    assert client.get(f"/deletion-jobs/{job_id}").status_code == 401
+
+    session.expire_all()
+    assert session.get(User, user_id) is None
+
+
+def test_get_deletion_job_not_found(client: TestClient, auth_headers: Callable[[UUID], dict]):
+    resp = client.get(f"/deletion-jobs/{uuid4()}", headers=auth_headers(uuid4()))
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "Deletion job not found"}
+
+
+def test_delete_user_not_found(client: TestClient, auth_headers: Callable[[UUID], dict]):
+    user_id = uuid4()
+    resp = client.delete(f"/users/{user_id}", headers=auth_headers(user_id))
     assert resp.status_code == 404
     assert resp.json() == {"detail": "User not found"}
+
+
+def test_user_routes_require_token(client: TestClient, session: Session):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    session.add(user)
+    session.commit()
+
+    resp = client.get(f"/users/{user.id}")
+    assert resp.status_code == 401
+    assert resp.headers["WWW-Authenticate"] == "Bearer"
+
+    resp = client.get(f"/users/{user.id}",
+                      headers={"Authorization": "Bearer not.a.token"})
+    assert resp.status_code == 401
+    assert resp.json() == {"detail": "Invalid or expired token"}
+
+
+def test_user_routes_reject_other_users_token(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    session.add(user)
+    session.commit()
+
+    resp = client.delete(f"/users/{user.id}", headers=auth_headers(uuid4()))
+    assert resp.status_code == 403
+    assert resp.json() == {"detail": "Not allowed to access this user"}
+    assert session.get(User, user.id) is not None
+
+
+def test_login_and_logout(client: TestClient, session: Session):
+    user = User(username="beeyou", name="kiko",
+                password_hash=hash_password("ultrasecure"))
+    session.add(user)
+    session.commit()
+
+    resp = client.post(
+        "/token", data={"username": "beeyou", "password": "ultrasecure"})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["token_type"] == "bearer"
+    headers = {"Authorization": f"Bearer {data['access_token']}"}
+
+    resp = client.get(f"/users/{user.id}", headers=headers)
+    assert resp.status_code == 200
+
+    resp = client.post("/logout", headers=headers)
+    assert resp.json() == {"ok": True}
+
+    resp = client.get(f"/users/{user.id}", headers=headers)
+    assert resp.status_code == 401
+
+
+def test_logout_is_applied_by_other_workers(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    session.add(user)
+    session.commit()
+    headers, everywhere = auth_headers(user.id), auth_headers(user.id)
+
+    client.post("/logout", headers=headers)
+    client.post("/logout", headers=everywhere, params={"everywhere": True})
+    rows = session.exec(select(OutboxEvent).where(
+        OutboxEvent.type.in_(crud.TOKEN_REVOCATION_TYPES))).all()  # type: ignore
+    assert [row.user_id for row in rows] == [None, None]
+
+    # Another worker knows nothing until it applies the events
+    token_denylist.clear()
+    events.apply_to_caches([events.Event.from_row(row) for row in rows])
+    for h in (headers, everywhere):
+        resp = client.get(f"/users/{user.id}", headers=h)
+        assert resp.status_code == 401
+
+
+def test_login_wrong_password(client: TestClient, session: Session):
+    user = User(username="beeyou", name="kiko",
+                password_hash=hash_password("ultrasecure"))
+    session.add(user)
+    session.commit()
+
+    for username, password in [("beeyou", "wrongpassword"), ("nobody", "ultrasecure")]:
+        resp = client.post(
+            "/token", data={"username": username, "password": password})
+        assert resp.status_code == 401
+        assert resp.json() == {"detail": "Incorrect username or password"}
+
+
+def test_password_change_revokes_tokens(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    session.add(user)
+    session.commit()
+    headers = auth_headers(user.id)
+
+    resp = client.patch(f"/users/{user.id}",
+                        json={"password": "newpassword"}, headers=headers)
+    assert resp.status_code == 200
+
+    resp = client.get(f"/users/{user.id}", headers=headers)
+    assert resp.status_code == 401
+
+
+def test_get_user_include_hobbies(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    chess, painting = Hobby(name="Chess"), Hobby(name="Painting")
+    session.add_all([user, chess, painting,
+                     UserHobbyLink(user=user, hobby=chess),
+                     UserHobbyLink(user=user, hobby=painting)])
+    session.commit()
+
+    resp = client.get(f"/users/{user.id}", headers=auth_headers(user.id),
+                      params={"include": "hobbies", "hobbies_limit": 1, "hobbies_offset": 1})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["username"] == user.username
+    assert data["hobbies"] == [
+        {"id": str(painting.id), "name": "Painting", "description": None}]
+    assert "suggestions" not in data
+
+
+def test_get_user_include_suggestions(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    chess = Hobby(name="Chess", description="Strategy board game")
+    go = Hobby(name="Go", description="Strategy board game with stones")
+    session.add_all([user, chess, go,
+                     UserHobbyLink(user=user, hobby=chess, interested=True)])
+    session.commit()
+
+    resp = client.get(f"/users/{user.id}", headers=auth_headers(user.id),
+                      params={"include": "hobbies,suggestions"})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [h["name"] for h in data["hobbies"]] == ["Chess"]
+    assert [h["name"] for h in data["suggestions"]] == ["Go"]
+
+
+def test_get_user_include_unknown(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    session.add(user)
+    session.commit()
+
+    resp = client.get(f"/users/{user.id}", headers=auth_headers(user.id),
+                      params={"include": "hobbies,friends"})
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "Unknown include: friends"}
+
+
+def test_get_user_include_not_found(client: TestClient, auth_headers: Callable[[UUID], dict]):
+    user_id = uuid4()
+    resp = client.get(f"/users/{user_id}", headers=auth_headers(user_id),
+                      params={"include": "hobbies"})
+    assert resp.status_code == 404
+    assert resp.json() == {"detail": "User not found"}
+
+
+def test_get_users_by_ids(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    first = User(username="beeyou", name="kiko", email="kiko@example.com",
+                 password_hash="ultrasecure")
+    second = User(username="seeyou", name="lulu", email="lulu@example.com",
+                  password_hash="ultrasecure")
+    session.add_all([first, second])
+    session.commit()
+    missing = uuid4()
+
+    ids = f"{second.id},{missing},{first.id}"
+    resp = client.get("/users", params={"ids": ids}, headers=auth_headers(first.id))
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [u["username"] for u in data["users"]] == ["seeyou", "beeyou"]
+    assert "password_hash" not in data["users"][0]
+    assert all("email" not in u for u in data["users"])
+    assert data["missing"] == [str(missing)]
+
+
+def test_get_users_by_ids_requires_token(client: TestClient):
+    resp = client.get("/users", params={"ids": str(uuid4())})
+    assert resp.status_code == 401
+
+
+def test_get_user_sparse_fields(client: TestClient, session: Session, auth_headers: Callable[[UUID], dict]):
+    user = User(username="beeyou", name="kiko", password_hash="ultrasecure")
+    session.add(user)
+    session.commit()
+    headers = auth_headers(user.id)
+
+    resp = client.get(f"/users/{user.id}", headers=headers,
+                      params={"fields": "name,id"})
+    assert resp.status_code == 200
+    assert resp.json() == {"id": str(user.id), "name": "kiko"}
+
+    resp = client.get(f"/users/{user.id}", headers=headers,
+                      params={"fields": "password_hash"})
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "Unknown field: password_hash"}
+
+    resp = client.get(f"/users/{user.id}", headers=headers,
+                      params={"fields": "name", "include": "hobbies"})
+    assert resp.status_code == 400
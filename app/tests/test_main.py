@@ -0,0 +1,51 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from app import ml
+from app.core.config import settings
+from app.db import database
+from app.main import create_app
+from app.models import Hobby
+
+
+def test_create_app_returns_fresh_apps():
+    first, second = create_app(), create_app()
+    assert first is not second
+    assert first.state.admission_controller is not second.state.admission_controller
+    assert first.state.ready is False
+
+
+def test_lifespan_warms_up_and_shuts_down(engine: Engine, session: Session, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(database, "_engine", engine)
+    session.add(Hobby(name="Chess", description="Board game"))
+    session.commit()
+
+    app = create_app()
+    with TestClient(app):
+        assert app.state.ready is True
+        assert database._engine is engine
+        assert ml.peek_link_graph() is not None
+
+    assert app.state.ready is False
+    assert database._engine is None
+    assert os.path.exists(settings.HOBBY_INDEX_PATH)
+
+
+def test_engine_pool_is_dropped_in_forked_children(engine: Engine, monkeypatch: pytest.MonkeyPatch):
+    engine = database.make_engine(engine.url)
+    monkeypatch.setattr(database, "_engine", engine)
+    with engine.connect():
+        pass
+    assert engine.pool.checkedin() == 1
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_end, str(engine.pool.checkedin()).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 16) == b"0"
+    assert engine.pool.checkedin() == 1
@@ -0,0 +1,25 @@
+import pytest
+
+from app.core.config import settings
+from app.server import check_settings
+
+
+def test_check_settings_needs_secret_key_for_several_workers(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "AUTH_SECRET_KEY", "")
+    check_settings(1)
+    with pytest.raises(SystemExit):
+        check_settings(2)
+
+    monkeypatch.setattr(settings, "AUTH_SECRET_KEY", "secret")
+    check_settings(2)
+
+
+def test_check_settings_needs_dispatcher_for_several_workers(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "AUTH_SECRET_KEY", "secret")
+    monkeypatch.setattr(settings, "OUTBOX_DISPATCHER_ENABLED", False)
+    check_settings(1)
+    with pytest.raises(SystemExit):
+        check_settings(2)
+
+    monkeypatch.setattr(settings, "OUTBOX_DISPATCHER_ENABLED", True)
+    check_settings(2)
@@ -0,0 +1,117 @@
+"""psycopg2 against psycopg 3 on the hot crud lookups and batch writes
+
+For each driver, builds the app's tables in a scratch schema, then times
+the prepared lookups (get_user_by_uuid, get_hobby_by_name,
+get_user_hobby_link), bulk user-hobby link creation and hobby seeding.
+
+    python -m benchmarks.drivers --lookups 2000 --links 200
+"""
+import argparse
+import csv
+import io
+import random
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel
+
+from app import crud
+from app.db.database import make_engine
+from app.db.seed import seed_hobbies_data
+from app.models import Hobby, User, UserHobbyCreate, UserHobbyLink
+
+from .helpers import get_engine, report, scratch_schema, time_call
+
+SCHEMA = "bench_drivers"
+
+
+def driver_engine(base: Engine, driver: str) -> Engine:
+    # Unqualified tables resolve to the scratch schema, DDL included
+    return make_engine(base.url, driver,
+                       execution_options={"schema_translate_map": {None: SCHEMA}})
+
+
+def create_data(session: Session, users: int, hobbies: int) -> tuple[list[User], list[Hobby]]:
+    db_users = [User(username=f"user{i}", name=f"User {i}", password_hash="x")
+                for i in range(users)]
+    db_hobbies = [Hobby(name=f"Hobby {i}") for i in range(hobbies)]
+    session.add_all([*db_users, *db_hobbies])
+    session.flush()
+    session.add_all(UserHobbyLink(user_id=user.id, hobby_id=hobby.id)
+                    for user in db_users for hobby in random.sample(db_hobbies, 5))
+    session.commit()
+    return db_users, db_hobbies
+
+
+def measure(engine: Engine, args: argparse.Namespace) -> dict:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        users, hobbies = create_data(session, args.users, args.hobbies)
+        links = [(link.user_id, link.hobby_id) for user in users
+                 for link in user.hobby_links]
+        user_ids = [user.id for user in users]
+        hobby_names = [hobby.name for hobby in hobbies]
+        hobby_ids = [hobby.id for hobby in hobbies]
+
+        def lookups():
+            for _ in range(args.lookups):
+                # Fresh identity map and loaders, so every lookup hits the DB
+                session.expunge_all()
+                crud.user_loader(session).clear()
+                crud.get_user_by_uuid(session, random.choice(user_ids))
+                crud.get_hobby_by_name(session, random.choice(hobby_names))
+                user_id, hobby_id = random.choice(links)
+                crud.get_user_hobby_link(session, user_id, hobby_id)
+            session.rollback()
+
+        def bulk_links():
+            user = User(username=f"bulk{random.random()}", name="Bulk", password_hash="x")
+            session.add(user)
+            session.commit()
+            crud.create_user_hobby_links(session, user.id, [
+                UserHobbyCreate(hobby_id=hobby_id, rating=random.randint(1, 5))
+                for hobby_id in random.sample(hobby_ids, min(args.links, len(hobby_ids)))])
+
+        def seed():
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(["name", "description"])
+            writer.writerows((f"Seeded {random.random()}", "Synthetic")
+                             for _ in range(args.seed_rows))
+            out.seek(0)
+            seed_hobbies_data(out, session, batch_size=args.seed_batch)
+
+        return {
+            "lookups": time_call(lookups, args.repeat),
+            "bulk_links": time_call(bulk_links, args.repeat),
+            "seed": time_call(seed, args.repeat),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.drivers")
+    parser.add_argument("--drivers", nargs="+", default=["psycopg2", "psycopg"])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--hobbies", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=1000,
+                        help="rounds of the three lookups per timed call")
+    parser.add_argument("--links", type=int, default=200,
+                        help="links per bulk create")
+    parser.add_argument("--seed-rows", type=int, default=10_000)
+    parser.add_argument("--seed-batch", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    base = get_engine()
+    results = {}
+    for driver in args.drivers:
+        engine = driver_engine(base, driver)
+        with base.connect() as conn, scratch_schema(conn, SCHEMA):
+            try:
+                results[driver] = measure(engine, args)
+            finally:
+                engine.dispose()
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
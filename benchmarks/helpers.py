@@ -0,0 +1,47 @@
+import json
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import Connection, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.db.database import make_engine
+
+
+def get_engine(driver: str | None = None) -> Engine:
+    return make_engine(str(settings.DATABASE_URL), driver)
+
+
+def time_call(fn: Callable[[], Any], repeat: int = 5) -> dict[str, float]:
+    """Median and min wall time of `fn` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(timings), "min_ms": min(timings)}
+
+
+@contextmanager
+def scratch_schema(conn: Connection, name: str) -> Iterator[str]:
+    """A throwaway schema first on the search_path, dropped afterwards"""
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {name} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {name}"))
+    conn.execute(text(f"SET search_path TO {name}, public"))
+    conn.commit()
+    try:
+        yield name
+    finally:
+        conn.rollback()
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {name} CASCADE"))
+        conn.execute(text("SET search_path TO public"))
+        conn.commit()
+
+
+def report(results: dict):
+    json.dump(results, sys.stdout, indent=2)
+    print()
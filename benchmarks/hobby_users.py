@@ -0,0 +1,119 @@
+"""Reverse lookup and cascade delete cost with and without the hobby_id index
+
+Builds a synthetic copy of users/hobbies/user_hobbies in a scratch schema,
+times "users of a hobby" and deleting a popular hobby (rolled back), then
+adds ix_user_hobbies_hobby_id_user_id and times them again.
+
+    python -m benchmarks.hobby_users --users 50000 --hobbies 500 --links 20
+"""
+import argparse
+
+from sqlalchemy import Connection, text
+
+from .helpers import get_engine, report, scratch_schema, time_call
+
+SCHEMA = "bench_hobby_users"
+
+
+def create_tables(conn: Connection, users: int, hobbies: int, links: int):
+    conn.execute(text("""
+        CREATE TABLE hobbies (id uuid PRIMARY KEY, num integer NOT NULL);
+        CREATE TABLE users (id uuid PRIMARY KEY, num integer NOT NULL);
+        CREATE TABLE user_hobbies (
+            interested boolean NOT NULL,
+            rating integer,
+            user_id uuid NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            hobby_id uuid NOT NULL REFERENCES hobbies (id) ON DELETE CASCADE,
+            PRIMARY KEY (user_id, hobby_id)
+        );
+        CREATE UNIQUE INDEX ON hobbies (num);
+    """))
+    conn.execute(text("""
+        INSERT INTO hobbies SELECT gen_random_uuid(), i
+        FROM generate_series(0, :hobbies - 1) i
+    """), {"hobbies": hobbies})
+    conn.execute(text("""
+        INSERT INTO users SELECT gen_random_uuid(), i
+        FROM generate_series(1, :users) i
+    """), {"users": users})
+    # Skewed popularity: low-numbered hobbies are picked far more often
+    conn.execute(text("""
+        INSERT INTO user_hobbies (interested, rating, user_id, hobby_id)
+        SELECT random() < 0.8, (random() * 5)::int, picks.user_id, h.id
+        FROM (
+            SELECT DISTINCT u.id AS user_id,
+                   floor(power(random(), 3) * :hobbies)::int AS num
+            FROM users u CROSS JOIN generate_series(1, :links)
+        ) picks
+        JOIN hobbies h ON h.num = picks.num
+    """), {"links": links, "hobbies": hobbies})
+    conn.execute(text("ANALYZE"))
+    conn.commit()
+
+
+def measure(conn: Connection, hobby_ids: dict, repeat: int) -> dict:
+    return {label: measure_hobby(conn, hobby_id, repeat)
+            for label, hobby_id in hobby_ids.items()}
+
+
+def measure_hobby(conn: Connection, hobby_id, repeat: int) -> dict:
+    def reverse_lookup():
+        conn.execute(text("""
+            SELECT user_id FROM user_hobbies
+            WHERE hobby_id = :hobby_id ORDER BY user_id LIMIT 100
+        """), {"hobby_id": hobby_id}).all()
+
+    def cascade_delete():
+        conn.execute(text("DELETE FROM hobbies WHERE id = :hobby_id"),
+                     {"hobby_id": hobby_id})
+        conn.rollback()
+
+    return {
+        "reverse_lookup": time_call(reverse_lookup, repeat),
+        "cascade_delete": time_call(cascade_delete, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.hobby_users")
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--hobbies", type=int, default=200)
+    parser.add_argument("--links", type=int, default=20,
+                        help="links per user before de-duplication")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with get_engine().connect() as conn, scratch_schema(conn, SCHEMA):
+        create_tables(conn, args.users, args.hobbies, args.links)
+        link_count = conn.execute(
+            text("SELECT count(*) FROM user_hobbies")).scalar_one()
+        fan_outs = conn.execute(text("""
+            SELECT hobby_id, count(*) FROM user_hobbies
+            GROUP BY hobby_id ORDER BY count(*) DESC
+        """)).all()
+        conn.commit()
+        # The most popular hobby, and a typical one from the long tail
+        hobby_ids = {"popular_hobby": fan_outs[0][0],
+                     "tail_hobby": fan_outs[len(fan_outs) * 3 // 4][0]}
+        fan_out = {"popular_hobby": fan_outs[0][1],
+                   "tail_hobby": fan_outs[len(fan_outs) * 3 // 4][1]}
+
+        before = measure(conn, hobby_ids, args.repeat)
+        conn.execute(text("""
+            CREATE INDEX ix_user_hobbies_hobby_id_user_id
+            ON user_hobbies (hobby_id, user_id)
+        """))
+        conn.execute(text("ANALYZE user_hobbies"))
+        conn.commit()
+        after = measure(conn, hobby_ids, args.repeat)
+
+    report({
+        "links": link_count,
+        "hobby_fan_out": fan_out,
+        "without_index": before,
+        "with_index": after,
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Insert and lookup throughput of user_hobbies, unpartitioned against hash-partitioned
+
+For each layout, builds a synthetic user_hobbies in a scratch schema (by
+default 5M users x 20 links = 100M rows; pass --users to scale down), then
+times batched inserts of new users' links, point lookups by
+(user_id, hobby_id), a user's links, and a page of a hobby's users.
+Foreign keys are left out, as they cost the same in both layouts.
+
+At the default size each layout needs about 15 GB of disk and the load
+takes a while; the table is dropped before the next layout is built.
+
+    python -m benchmarks.partitioning --users 5000000 --partitions 16
+"""
+import argparse
+import hashlib
+import random
+import time
+from uuid import UUID
+
+from sqlalchemy import Connection, text
+
+from .helpers import get_engine, report, scratch_schema, time_call
+
+SCHEMA = "bench_partitioning"
+
+
+def user_uuid(n: int) -> UUID:
+    # Same as md5(n::text)::uuid in the generating SQL
+    return UUID(hashlib.md5(str(n).encode()).hexdigest())
+
+
+def hobby_uuid(n: int) -> UUID:
+    return UUID(hashlib.md5(f"h{n}".encode()).hexdigest())
+
+
+def create_table(conn: Connection, partitions: int):
+    partition_by = "PARTITION BY HASH (user_id)" if partitions else ""
+    conn.execute(text(f"""
+        CREATE TABLE user_hobbies (
+            interested boolean NOT NULL,
+            rating integer,
+            user_id uuid NOT NULL,
+            hobby_id uuid NOT NULL
+        ) {partition_by}
+    """))
+    for remainder in range(partitions):
+        conn.execute(text(f"""
+            CREATE TABLE user_hobbies_p{remainder} PARTITION OF user_hobbies
+            FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})
+        """))
+    conn.commit()
+
+
+def load(conn: Connection, users: int, links: int, hobbies: int, chunk: int) -> dict:
+    """Bulk load, then build the keys; user n links hobbies n .. n+links-1"""
+    start = time.perf_counter()
+    for low in range(0, users, chunk):
+        conn.execute(text("""
+            INSERT INTO user_hobbies (interested, rating, user_id, hobby_id)
+            SELECT random() < 0.8, (random() * 5)::int, md5(u::text)::uuid,
+                   md5('h' || ((u + k) % :hobbies))::uuid
+            FROM generate_series(:low, :high - 1) u,
+                 generate_series(0, :links - 1) k
+        """), {"low": low, "high": min(low + chunk, users),
+               "links": links, "hobbies": hobbies})
+        conn.commit()
+    loaded = time.perf_counter()
+    conn.execute(text(
+        "ALTER TABLE user_hobbies ADD PRIMARY KEY (user_id, hobby_id)"))
+    conn.execute(text("""
+        CREATE INDEX ix_user_hobbies_hobby_id_user_id
+        ON user_hobbies (hobby_id, user_id)
+    """))
+    conn.commit()
+    indexed = time.perf_counter()
+    conn.execute(text("ANALYZE user_hobbies"))
+    conn.commit()
+    return {"load_s": loaded - start, "index_s": indexed - loaded}
+
+
+def sizes(conn: Connection) -> dict:
+    # A partitioned table's own size is zero; its partitions hold the rows
+    row = conn.execute(text("""
+        SELECT sum(pg_table_size(relid)), sum(pg_indexes_size(relid))
+        FROM (SELECT relid FROM pg_partition_tree('user_hobbies')
+              UNION SELECT 'user_hobbies'::regclass) tables
+    """)).one()
+    return {"table_mb": int(row[0]) / 2**20, "indexes_mb": int(row[1]) / 2**20}
+
+
+def measure(conn: Connection, args: argparse.Namespace) -> dict:
+    next_user = iter(range(args.users, args.users * 2))
+
+    def insert_batch():
+        # A batch of brand new users' links, as sign-ups would add them
+        rows = [{"user_id": user_uuid(u), "hobby_id": hobby_uuid((u + k) % args.hobbies)}
+                for u in (next(next_user) for _ in range(args.insert_batch // args.links))
+                for k in range(args.links)]
+        conn.execute(text("""
+            INSERT INTO user_hobbies (interested, rating, user_id, hobby_id)
+            VALUES (true, 3, :user_id, :hobby_id)
+        """), rows)
+        conn.commit()
+
+    def point_lookups():
+        for _ in range(args.lookups):
+            u = random.randrange(args.users)
+            conn.execute(text("""
+                SELECT rating FROM user_hobbies
+                WHERE user_id = :user_id AND hobby_id = :hobby_id
+            """), {"user_id": user_uuid(u),
+                   "hobby_id": hobby_uuid((u + random.randrange(args.links)) % args.hobbies)}).all()
+        conn.commit()
+
+    def user_links():
+        for _ in range(args.lookups):
+            conn.execute(text("""
+                SELECT hobby_id, rating FROM user_hobbies WHERE user_id = :user_id
+            """), {"user_id": user_uuid(random.randrange(args.users))}).all()
+        conn.commit()
+
+    def hobby_users():
+        for _ in range(args.lookups):
+            conn.execute(text("""
+                SELECT user_id FROM user_hobbies
+                WHERE hobby_id = :hobby_id ORDER BY user_id LIMIT 100
+            """), {"hobby_id": hobby_uuid(random.randrange(args.hobbies))}).all()
+        conn.commit()
+
+    def per_second(timing: dict, count: int) -> dict:
+        return {**timing, "per_second": count / (timing["median_ms"] / 1000)}
+
+    return {
+        "insert_rows": per_second(time_call(insert_batch, args.repeat),
+                                  args.insert_batch // args.links * args.links),
+        "point_lookups": per_second(time_call(point_lookups, args.repeat), args.lookups),
+        "user_links": per_second(time_call(user_links, args.repeat), args.lookups),
+        "hobby_users": per_second(time_call(hobby_users, args.repeat), args.lookups),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.partitioning")
+    parser.add_argument("--users", type=int, default=5_000_000)
+    parser.add_argument("--links", type=int, default=20, help="links per user")
+    parser.add_argument("--hobbies", type=int, default=1000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--chunk", type=int, default=100_000,
+                        help="users per bulk-load statement")
+    parser.add_argument("--insert-batch", type=int, default=1000,
+                        help="rows per timed insert")
+    parser.add_argument("--lookups", type=int, default=1000,
+                        help="queries per timed lookup run")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = get_engine()
+    results = {"rows": args.users * args.links}
+    for layout, partitions in (("unpartitioned", 0), ("hash_partitioned", args.partitions)):
+        with engine.connect() as conn, scratch_schema(conn, SCHEMA):
+            create_table(conn, partitions)
+            results[layout] = {
+                **load(conn, args.users, args.links, args.hobbies, args.chunk),
+                **sizes(conn),
+                **measure(conn, args),
+            }
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Per-item cost of serializing ORM objects for list responses
+
+Compares FastAPI's default path (response_model validation from attributes,
+jsonable_encoder, stdlib json) with the FAST_JSON_RESPONSES path (direct
+field projection, orjson). Needs no database.
+
+    python -m benchmarks.serialization --items 1000
+"""
+import argparse
+import json
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from uuid import uuid4
+
+from app.core.responses import FastJSONResponse, project
+from app.models import Hobby, HobbyPublic, User, UserHobbyLink, UserHobbyPublic, UserPublic
+from .helpers import report, time_call
+
+
+def make_objects(items: int) -> dict[type, list]:
+    return {
+        HobbyPublic: [Hobby(id=uuid4(), name=f"Hobby {i}", description="Something to do " * 4)
+                      for i in range(items)],
+        UserPublic: [User(id=uuid4(), username=f"user{i}", email=f"user{i}@example.com",
+                          name="Some User", password_hash="x" * 60)
+                     for i in range(items)],
+        UserHobbyPublic: [UserHobbyLink(user_id=uuid4(), hobby_id=uuid4(), rating=i % 5)
+                          for i in range(items)],
+    }
+
+
+def default_path(adapter: TypeAdapter, objects: list) -> bytes:
+    validated = adapter.validate_python(objects, from_attributes=True)
+    content = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(model: type, objects: list) -> bytes:
+    return FastJSONResponse([project(model, obj) for obj in objects]).body
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {}
+    for model, objects in make_objects(args.items).items():
+        adapter = TypeAdapter(list[model])
+        default = time_call(lambda: default_path(
+            adapter, objects), args.repeat)
+        fast = time_call(lambda: fast_path(model, objects), args.repeat)
+        results[model.__name__] = {
+            "default_us_per_item": default["median_ms"] * 1000 / args.items,
+            "fast_us_per_item": fast["median_ms"] * 1000 / args.items,
+            "speedup": default["median_ms"] / fast["median_ms"],
+        }
+
+    report({"items": args.items, "models": results})
+
+
+if __name__ == "__main__":
+    main()
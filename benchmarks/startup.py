@@ -0,0 +1,73 @@
+"""Import time, app construction time and time to ready for the API
+
+Each run happens in a fresh interpreter, so nothing is cached between
+phases. Reports the slowest modules from `python -X importtime` too.
+Startup runs the real lifespan warm-up against the configured database.
+
+    python -m benchmarks.startup --repeat 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+from .helpers import report
+
+# Prints seconds for each phase, run in a child interpreter
+PHASES_SCRIPT = """
+import asyncio, time
+start = time.perf_counter()
+import app.routers, app.crud, app.ml
+modules = time.perf_counter()
+from app.main import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+
+async def start_up():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(start_up())
+print(modules - start, imported - modules, created - imported, ready - created)
+"""
+
+
+def run_phases(repeat: int) -> dict[str, float]:
+    names = ["import_modules_ms", "import_main_ms", "create_app_ms", "lifespan_ready_ms"]
+    timings: dict[str, list[float]] = {name: [] for name in names}
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PHASES_SCRIPT], check=True,
+                                capture_output=True, text=True).stdout
+        for name, seconds in zip(names, output.split()):
+            timings[name].append(float(seconds) * 1000)
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def slowest_imports(top: int) -> list[dict]:
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # import time:  self [us] | cumulative | imported package
+        self_us, cumulative_us, module = line.split(":", 1)[1].split("|")
+        rows.append({"module": module.strip(), "self_ms": int(self_us) / 1000,
+                     "cumulative_ms": int(cumulative_us) / 1000})
+    rows.sort(key=lambda row: row["self_ms"], reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    report({"phases": run_phases(args.repeat),
+            "slowest_imports": slowest_imports(args.top)})
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,11 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 from alembic import context
 
 from app.core.config import settings
 from app.models import get_metadata
-from app.db.database import engine
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -71,8 +71,18 @@ def run_migrations_online() -> None:
         )
 
     with connectable.connect() as connection:
+        # Partitions aren't in the metadata, only the tables they belong to
+        partitions = set(connection.execute(text(
+            "SELECT relname FROM pg_class WHERE relispartition")).scalars())
+        # Leave alembic to begin (and commit) the migration transaction
+        connection.rollback()
+
+        def include_object(object, name, type_, reflected, compare_to):
+            return not (type_ == "table" and reflected and name in partitions)
+
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,130 @@
+"""hobby stats
+
+Revision ID: 8c41e5b2a7d9
+Revises: d3f2c17e19ae
+Create Date: 2026-10-19 10:13:20.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41e5b2a7d9'
+down_revision: Union[str, Sequence[str], None] = 'd3f2c17e19ae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('hobby_stats',
+                    sa.Column('link_count', sa.Integer(), nullable=False),
+                    sa.Column('rating_count', sa.Integer(), nullable=False),
+                    sa.Column('rating_sum', sa.Integer(), nullable=False),
+                    sa.Column('hobby_id', sa.Uuid(), nullable=False),
+                    sa.Column('interested_count',
+                              sa.Integer(), nullable=False),
+                    sa.Column('rating_histogram', postgresql.JSONB(astext_type=sa.Text()),
+                              server_default=sa.text("'{}'::jsonb"), nullable=False),
+                    sa.ForeignKeyConstraint(
+                        ['hobby_id'], ['hobbies.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('hobby_id')
+                    )
+    op.create_index(op.f('ix_hobby_stats_interested_count'),
+                    'hobby_stats', ['interested_count'], unique=False)
+
+    # Backfill from existing links
+    op.execute("""
+        INSERT INTO hobby_stats (hobby_id, link_count, interested_count,
+                                 rating_count, rating_sum, rating_histogram)
+        SELECT h.id,
+               count(uh.hobby_id),
+               count(*) FILTER (WHERE uh.interested),
+               count(uh.rating),
+               coalesce(sum(uh.rating), 0),
+               coalesce((SELECT jsonb_object_agg(r.rating::text, r.n)
+                         FROM (SELECT rating, count(*) AS n
+                               FROM user_hobbies
+                               WHERE hobby_id = h.id AND rating IS NOT NULL
+                               GROUP BY rating) r), '{}'::jsonb)
+        FROM hobbies h
+        LEFT JOIN user_hobbies uh ON uh.hobby_id = h.id
+        GROUP BY h.id
+    """)
+
+    # Every hobby gets a stats row, so link triggers only ever UPDATE. If the
+    # hobby is being deleted the row is already gone and the UPDATE is a no-op.
+    op.execute("""
+        CREATE FUNCTION hobby_stats_create() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO hobby_stats (hobby_id, link_count, interested_count,
+                                     rating_count, rating_sum)
+            VALUES (NEW.id, 0, 0, 0, 0)
+            ON CONFLICT (hobby_id) DO NOTHING;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER hobbies_create_stats
+        AFTER INSERT ON hobbies
+        FOR EACH ROW EXECUTE FUNCTION hobby_stats_create()
+    """)
+
+    op.execute("""
+        CREATE FUNCTION hobby_stats_apply(p_hobby_id uuid, p_interested boolean,
+                                          p_rating integer, p_sign integer)
+        RETURNS void AS $$
+        BEGIN
+            UPDATE hobby_stats SET
+                link_count = link_count + p_sign,
+                interested_count = interested_count
+                    + CASE WHEN p_interested THEN p_sign ELSE 0 END,
+                rating_count = rating_count
+                    + CASE WHEN p_rating IS NULL THEN 0 ELSE p_sign END,
+                rating_sum = rating_sum + coalesce(p_rating, 0) * p_sign,
+                rating_histogram = CASE WHEN p_rating IS NULL THEN rating_histogram
+                    ELSE jsonb_set(rating_histogram, ARRAY[p_rating::text],
+                        to_jsonb(coalesce((rating_histogram->>p_rating::text)::integer, 0)
+                                 + p_sign))
+                    END
+            WHERE hobby_id = p_hobby_id;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION hobby_stats_track_link() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM hobby_stats_apply(OLD.hobby_id, OLD.interested, OLD.rating, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM hobby_stats_apply(NEW.hobby_id, NEW.interested, NEW.rating, 1);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER user_hobbies_track_stats
+        AFTER INSERT OR DELETE OR UPDATE OF hobby_id, interested, rating
+        ON user_hobbies
+        FOR EACH ROW EXECUTE FUNCTION hobby_stats_track_link()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER user_hobbies_track_stats ON user_hobbies")
+    op.execute("DROP FUNCTION hobby_stats_track_link()")
+    op.execute("DROP FUNCTION hobby_stats_apply(uuid, boolean, integer, integer)")
+    op.execute("DROP TRIGGER hobbies_create_stats ON hobbies")
+    op.execute("DROP FUNCTION hobby_stats_create()")
+    op.drop_index(op.f('ix_hobby_stats_interested_count'),
+                  table_name='hobby_stats')
+    op.drop_table('hobby_stats')
@@ -0,0 +1,36 @@
+"""user_hobbies hobby_id index
+
+Revision ID: 4e7b9d1c3f02
+Revises: 8c41e5b2a7d9
+Create Date: 2026-10-19 10:23:20.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e7b9d1c3f02'
+down_revision: Union[str, Sequence[str], None] = '8c41e5b2a7d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction, but avoids blocking
+    # writes to user_hobbies while the index builds
+    with op.get_context().autocommit_block():
+        op.create_index('ix_user_hobbies_hobby_id_user_id', 'user_hobbies',
+                        ['hobby_id', 'user_id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_hobbies_hobby_id_user_id', table_name='user_hobbies',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,74 @@
+"""outbox
+
+Revision ID: c9e5a7f3d1b6
+Revises: b6a3d2e8f914
+Create Date: 2026-10-19 10:43:20.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e5a7f3d1b6'
+down_revision: Union[str, Sequence[str], None] = 'b6a3d2e8f914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox_events',
+                    sa.Column('id', sa.BigInteger(), nullable=False),
+                    sa.Column('txid', sa.BigInteger(), server_default=sa.text(
+                        'pg_current_xact_id()::text::bigint'), nullable=False),
+                    sa.Column(
+                        'type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+                    sa.Column('user_id', sa.Uuid(), nullable=True),
+                    sa.Column('hobby_id', sa.Uuid(), nullable=True),
+                    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()),
+                              server_default=sa.text("'{}'::jsonb"), nullable=False),
+                    sa.Column('created_at', sa.DateTime(
+                        timezone=True), nullable=False),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('ix_outbox_events_txid_id', 'outbox_events',
+                    ['txid', 'id'], unique=False)
+    op.create_table('outbox_offsets',
+                    sa.Column(
+                        'consumer', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+                    sa.Column('txid', sa.BigInteger(), nullable=False),
+                    sa.Column('event_id', sa.BigInteger(), nullable=False),
+                    sa.Column('updated_at', sa.DateTime(
+                        timezone=True), nullable=False),
+                    sa.PrimaryKeyConstraint('consumer')
+                    )
+
+    # One wake-up per writing statement; notifications are only sent on
+    # commit, and repeats within a transaction are folded into one
+    op.execute("""
+        CREATE FUNCTION outbox_events_notify() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('outbox_events', '');
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER outbox_events_notify
+        AFTER INSERT ON outbox_events
+        FOR EACH STATEMENT EXECUTE FUNCTION outbox_events_notify()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER outbox_events_notify ON outbox_events")
+    op.execute("DROP FUNCTION outbox_events_notify()")
+    op.drop_table('outbox_offsets')
+    op.drop_index('ix_outbox_events_txid_id', table_name='outbox_events')
+    op.drop_table('outbox_events')
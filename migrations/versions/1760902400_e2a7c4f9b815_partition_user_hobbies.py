@@ -0,0 +1,94 @@
+"""partition user_hobbies
+
+Revision ID: e2a7c4f9b815
+Revises: c9e5a7f3d1b6
+Create Date: 2026-10-19 10:53:20.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c4f9b815'
+down_revision: Union[str, Sequence[str], None] = 'c9e5a7f3d1b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Matches USER_HOBBIES_PARTITIONS in app.models as of this revision
+PARTITIONS = 16
+
+
+def _replace_user_hobbies(partitioned: bool):
+    """Rebuild user_hobbies, with or without partitions, keeping its links
+
+    The new table is built as user_hobbies_new and swapped in at the end.
+    Writers wait on the EXCLUSIVE lock from the start, but readers carry on
+    until the swap, whose ACCESS EXCLUSIVE lock is held from there until
+    the migration commits. The links are copied before the keys and
+    indexes are built, which is much faster than maintaining them row by
+    row, and before the stats trigger exists, since hobby_stats already
+    counts them.
+    """
+    op.execute("LOCK TABLE user_hobbies IN EXCLUSIVE MODE")
+
+    op.create_table('user_hobbies_new',
+                    sa.Column('interested', sa.Boolean(), nullable=False),
+                    sa.Column('rating', sa.Integer(), nullable=True),
+                    sa.Column('user_id', sa.Uuid(), nullable=False),
+                    sa.Column('hobby_id', sa.Uuid(), nullable=False),
+                    **({'postgresql_partition_by': 'HASH (user_id)'}
+                       if partitioned else {})
+                    )
+    if partitioned:
+        # Only a plain table is replaced by partitions, so their names are free
+        for remainder in range(PARTITIONS):
+            op.execute(f"""
+                CREATE TABLE user_hobbies_p{remainder} PARTITION OF user_hobbies_new
+                FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})
+            """)
+
+    op.execute("""
+        INSERT INTO user_hobbies_new (interested, rating, user_id, hobby_id)
+        SELECT interested, rating, user_id, hobby_id FROM user_hobbies
+    """)
+
+    # On a partitioned table these are partitioned too: each partition gets
+    # its own key and index, and the parent's only tie them together
+    op.create_primary_key('user_hobbies_new_pkey', 'user_hobbies_new',
+                          ['user_id', 'hobby_id'])
+    # Foreign key names are per table, and free already
+    op.create_foreign_key('user_hobbies_user_id_fkey', 'user_hobbies_new', 'users',
+                          ['user_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('user_hobbies_hobby_id_fkey', 'user_hobbies_new', 'hobbies',
+                          ['hobby_id'], ['id'], ondelete='CASCADE')
+    op.create_index('ix_user_hobbies_new_hobby_id_user_id', 'user_hobbies_new',
+                    ['hobby_id', 'user_id'], unique=False)
+    op.execute("""
+        CREATE TRIGGER user_hobbies_track_stats
+        AFTER INSERT OR DELETE OR UPDATE OF hobby_id, interested, rating
+        ON user_hobbies_new
+        FOR EACH ROW EXECUTE FUNCTION hobby_stats_track_link()
+    """)
+    op.execute("ANALYZE user_hobbies_new")
+
+    # The swap: only catalog changes from here on
+    op.drop_table('user_hobbies')
+    op.rename_table('user_hobbies_new', 'user_hobbies')
+    op.execute("ALTER TABLE user_hobbies RENAME CONSTRAINT "
+               "user_hobbies_new_pkey TO user_hobbies_pkey")
+    op.execute("ALTER INDEX ix_user_hobbies_new_hobby_id_user_id "
+               "RENAME TO ix_user_hobbies_hobby_id_user_id")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_user_hobbies(partitioned=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_user_hobbies(partitioned=False)
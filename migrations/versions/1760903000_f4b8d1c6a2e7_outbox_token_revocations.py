@@ -0,0 +1,31 @@
+"""outbox token revocations
+
+Revision ID: f4b8d1c6a2e7
+Revises: e2a7c4f9b815
+Create Date: 2026-10-19 11:03:20.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b8d1c6a2e7'
+down_revision: Union[str, Sequence[str], None] = 'e2a7c4f9b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_outbox_events_token_revocations', 'outbox_events', ['created_at'], unique=False,
+                    postgresql_where=sa.text("type IN ('token.revoked', 'user.tokens_revoked')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_events_token_revocations', table_name='outbox_events',
+                  postgresql_where=sa.text("type IN ('token.revoked', 'user.tokens_revoked')"))
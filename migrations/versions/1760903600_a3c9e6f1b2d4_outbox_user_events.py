@@ -0,0 +1,34 @@
+"""outbox user events
+
+Revision ID: a3c9e6f1b2d4
+Revises: f4b8d1c6a2e7
+Create Date: 2026-10-19 11:13:20.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e6f1b2d4'
+down_revision: Union[str, Sequence[str], None] = 'f4b8d1c6a2e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_outbox_events_user_id_txid_id', 'outbox_events',
+                    ['user_id', 'txid', 'id'], unique=False)
+    op.create_index('ix_outbox_events_broadcasts', 'outbox_events', ['txid', 'id'], unique=False,
+                    postgresql_where=sa.text("type IN ('hobby.deleted')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_events_broadcasts', table_name='outbox_events',
+                  postgresql_where=sa.text("type IN ('hobby.deleted')"))
+    op.drop_index('ix_outbox_events_user_id_txid_id', table_name='outbox_events')
@@ -0,0 +1,36 @@
+"""user_hobbies rating check
+
+Revision ID: b7d2f5a9c1e3
+Revises: a3c9e6f1b2d4
+Create Date: 2026-10-19 11:23:20.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f5a9c1e3'
+down_revision: Union[str, Sequence[str], None] = 'a3c9e6f1b2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Ratings from before the API bounded them are clamped into range; the
+    # stats trigger keeps hobby_stats' rating sums in step
+    op.execute("""
+        UPDATE user_hobbies SET rating = LEAST(GREATEST(rating, 0), 5)
+        WHERE rating NOT BETWEEN 0 AND 5
+    """)
+    op.create_check_constraint('ck_user_hobbies_rating', 'user_hobbies',
+                               'rating BETWEEN 0 AND 5')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('ck_user_hobbies_rating', 'user_hobbies', type_='check')